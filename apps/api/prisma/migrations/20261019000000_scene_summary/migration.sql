@@ -0,0 +1,3 @@
+-- AlterTable
+ALTER TABLE "scenes" ADD COLUMN     "summary" TEXT,
+ADD COLUMN     "summary_through" INTEGER;
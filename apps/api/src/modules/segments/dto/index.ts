@@ -1,4 +1,4 @@
-import { IsString, IsNotEmpty, IsInt, IsOptional, Min, MaxLength, IsUUID } from 'class-validator';
+import { IsString, IsNotEmpty, IsInt, IsOptional, IsBoolean, Min, MaxLength, IsUUID } from 'class-validator';
 import { ApiProperty, ApiPropertyOptional } from '@nestjs/swagger';
 
 export class SubmitSegmentDto {
@@ -57,6 +57,15 @@ export class GenerateVideoDto {
   @IsInt()
   @Min(5)
   durationSeconds?: number;
+
+  @ApiPropertyOptional({
+    description: 'Regenerate instead of reusing a cached script and video for the same request',
+    example: false,
+    default: false,
+  })
+  @IsOptional()
+  @IsBoolean()
+  reroll?: boolean;
 }
 
 export class SegmentResponseDto {
@@ -145,6 +145,7 @@ export class SegmentsService {
         segmentId: dto.segmentId,
         aspectRatio: dto.aspectRatio || '16:9',
         durationSeconds: dto.durationSeconds || 8,
+        reroll: dto.reroll ?? false,
       },
       {
         attempts: 3,
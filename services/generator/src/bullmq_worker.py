@@ -8,23 +8,61 @@ and processes video generation jobs.
 import asyncio
 import json
 import os
+import random
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
-from bullmq import Worker, Job
+from bullmq import Job, Queue, Worker
 import structlog
 
 # Add src to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.config import get_settings
+from src.metrics import JOBS_PARKED
+from src.services import clients
 from src.services.database import DatabaseService
 from src.services.storage import StorageService
-from src.services.script_expander import ScriptExpander, PreviousSegment
+from src.services.script_expander import ExpandedScript, ScriptExpander, PreviousSegment
 from src.services.video_generator import VideoGenerator
+from src.services.expansion_cache import ExpansionCache
+from src.services.generation_cache import GenerationCache
+from src.services.circuit_breaker import CircuitOpenError, require_any
+from src.services.workspace import WorkspaceManager
+from src.worker import app as celery_app
 
 logger = structlog.get_logger()
 settings = get_settings()
 
+QUEUE_NAME = "generation"  # matches the NestJS BullMQ queue
+
+
+def redis_connection() -> dict:
+    """BullMQ connection options parsed from ``redis_url``."""
+    # Format: redis://localhost:6379
+    redis_host = "localhost"
+    redis_port = 6379
+
+    if settings.redis_url:
+        parts = settings.redis_url.replace("redis://", "").split(":")
+        redis_host = parts[0] if parts else "localhost"
+        redis_port = int(parts[1].split("/")[0]) if len(parts) > 1 else 6379
+    return {"host": redis_host, "port": redis_port}
+
+
+async def park_job(job: Job, parks: int, delay: float) -> None:
+    """Re-add a job to the queue, to be picked up again after ``delay`` seconds."""
+    queue = Queue(QUEUE_NAME, {"connection": redis_connection()})
+    try:
+        await queue.add(job.name, {**job.data, "parks": parks}, {
+            "delay": int(delay * 1000),
+            "removeOnComplete": 100,
+            "removeOnFail": 50,
+        })
+    finally:
+        await queue.close()
+
 
 def update_progress(db: DatabaseService, job_id: str, progress: int, stage: str):
     """Update job progress in database."""
@@ -44,6 +82,10 @@ async def process_generation_job(job: Job, token: str) -> dict:
     3. Generate video via Google Veo 3
     4. Upload to S3
     5. Update database
+
+    While OpenAI or every video provider has an open circuit the job is
+    parked: re-added to the queue with a delay, at most ``circuit_max_parks``
+    times (counted in the job data's ``parks``), after which it fails.
     """
     data = job.data
     job_id = data.get("jobId")
@@ -52,14 +94,31 @@ async def process_generation_job(job: Job, token: str) -> dict:
     user_prompt = data.get("prompt", "")
     aspect_ratio = data.get("aspectRatio", "16:9")
     duration_seconds = data.get("durationSeconds", 10)
+    reroll = bool(data.get("reroll", False))  # fresh take: bypass the caches
+    parks = int(data.get("parks", 0))
 
     log = logger.bind(job_id=job_id, scene_id=scene_id, segment_id=segment_id)
     log.info("Processing video generation job")
 
     db = DatabaseService()
     storage = StorageService()
+    workspaces = WorkspaceManager()
+    workspace = None
+    # Video generation runs here so it can start mid-expansion
+    video_pool = ThreadPoolExecutor(max_workers=1)
+    video_cancel = threading.Event()  # stops it if the job fails first
 
     try:
+        expander = ScriptExpander(
+            cache=ExpansionCache(db.redis) if settings.expansion_cache_enabled else None
+        )
+        generation_cache = (
+            GenerationCache(storage, db.redis) if settings.generation_cache_enabled else None
+        )
+        video_generator = VideoGenerator(cache=generation_cache)
+        require_any([expander.breaker])
+        require_any(list(video_generator.router.breakers.values()))
+
         # Update job status to PROCESSING
         db.update_job(job_id, {"status": "PROCESSING"})
         db.update_segment(segment_id, {"status": "PROCESSING"})
@@ -73,6 +132,9 @@ async def process_generation_job(job: Job, token: str) -> dict:
 
         user_prompt = segment.get("prompt", user_prompt)
 
+        # Scratch space for the video and thumbnail, removed when the job ends
+        workspace = workspaces.create(job_id)
+
         # Get scene bible for continuity
         scene_bible = db.get_scene_bible(scene_id)
 
@@ -93,19 +155,40 @@ async def process_generation_job(job: Job, token: str) -> dict:
             "title": scene.get("title", ""),
             "description": scene.get("description", ""),
             "topic": scene.get("topic", {}).get("title", "") if scene.get("topic") else "",
+            "summary": scene.get("summary"),
+            "summary_through": scene.get("summary_through"),
         }
 
         # Stage 1: Script Expansion via OpenAI ChatGPT
         log.info("Stage 1: Script expansion via OpenAI")
         update_progress(db, job_id, 10, "script_expanding")
 
-        expander = ScriptExpander()
-        expanded = expander.expand(
-            user_prompt=user_prompt,
-            scene_context=scene_context,
-            scene_bible=scene_bible,
-            previous_segments=prev_segment_objs,
-        )
+        video_job: dict = {}  # the running generation
+
+        def start_video(script: ExpandedScript) -> None:
+            video_job["future"] = video_pool.submit(
+                video_generator.generate,
+                video_prompt=script.video_prompt,
+                scene_bible=scene_bible,
+                aspect_ratio=aspect_ratio,
+                duration_seconds=duration_seconds,
+                work_dir=workspace.path,
+                reroll=reroll,
+                cancel=video_cancel,
+            )
+
+        expansion_args = {
+            "user_prompt": user_prompt,
+            "scene_context": scene_context,
+            "scene_bible": scene_bible,
+            "previous_segments": prev_segment_objs,
+            "refresh": reroll,
+        }
+        if settings.script_streaming_enabled:
+            # The video starts as soon as its fields have streamed in
+            expanded = expander.expand_streaming(**expansion_args, on_early=start_video)
+        else:
+            expanded = expander.expand(**expansion_args)
 
         # Save expanded script
         db.update_segment(segment_id, {
@@ -122,13 +205,11 @@ async def process_generation_job(job: Job, token: str) -> dict:
         log.info("Stage 2: Video generation via Google Veo 3")
         update_progress(db, job_id, 30, "video_generating")
 
-        video_generator = VideoGenerator()
-        video_result = video_generator.generate(
-            video_prompt=expanded.video_prompt,
-            scene_bible=scene_bible,
-            aspect_ratio=aspect_ratio,
-            duration_seconds=duration_seconds,
-        )
+        if "future" in video_job:
+            log.info("Video generation started during script expansion")
+        else:
+            start_video(expanded)
+        video_result = video_job["future"].result()
 
         update_progress(db, job_id, 70, "video_generated")
         log.info("Video generated", video_path=video_result.video_path)
@@ -137,7 +218,8 @@ async def process_generation_job(job: Job, token: str) -> dict:
         log.info("Stage 3: Uploading to S3")
         update_progress(db, job_id, 80, "uploading")
 
-        video_key = f"segments/{segment_id}/video.mp4"
+        # Where the scene export reads segment sources from
+        video_key = storage.segment_source_key(scene_id, segment_id)
         thumbnail_key = f"segments/{segment_id}/thumbnail.jpg"
 
         video_url = storage.upload_file(video_result.video_path, video_key)
@@ -159,6 +241,17 @@ async def process_generation_job(job: Job, token: str) -> dict:
             "duration": video_result.duration,
         })
 
+        if settings.scene_export_on_complete:
+            try:
+                celery_app.send_task("src.tasks.export.export_scene", args=(scene_id,))
+            except Exception as e:
+                log.warning("Could not queue scene export", error=str(e))
+        if settings.scene_summary_enabled:
+            try:
+                celery_app.send_task("src.tasks.generation.update_scene_summary", args=(scene_id,))
+            except Exception as e:
+                log.warning("Could not queue scene summary update", error=str(e))
+
         # Update job as completed
         db.update_job(job_id, {
             "status": "COMPLETED",
@@ -180,6 +273,31 @@ async def process_generation_job(job: Job, token: str) -> dict:
             "duration": video_result.duration,
         }
 
+    except CircuitOpenError as e:
+        if parks >= settings.circuit_max_parks:
+            log.error("Provider still unavailable, giving up", provider=e.provider, parks=parks)
+            db.update_job(job_id, {"status": "FAILED", "error": str(e)})
+            db.update_segment(segment_id, {"status": "FAILED"})
+            raise
+
+        # Jitter so parked jobs don't all probe the provider at once
+        delay = e.retry_after + random.uniform(0, settings.circuit_reset_seconds / 4)
+        log.warning(
+            "Provider circuit open, parking job",
+            provider=e.provider,
+            delay=round(delay),
+            parks=parks + 1,
+        )
+        db.update_job(job_id, {"status": "QUEUED", "progress": 0, "stage": "waiting_for_provider"})
+        db.update_segment(segment_id, {"status": "QUEUED"})
+        await park_job(job, parks + 1, delay)
+        JOBS_PARKED.inc()
+        return {
+            "success": False,
+            "parked": True,
+            "retry_after": round(delay),
+        }
+
     except Exception as e:
         log.error("Job failed", error=str(e))
         
@@ -194,20 +312,24 @@ async def process_generation_job(job: Job, token: str) -> dict:
         
         raise
 
+    finally:
+        # A generation still running after a failure would keep billing and
+        # write into the workspace; stop it and wait before releasing that
+        video_cancel.set()
+        video_pool.shutdown(wait=True, cancel_futures=True)
+        if workspace:
+            workspaces.release(workspace)
+
 
 async def main():
     """Start the BullMQ worker."""
     logger.info("Starting BullMQ worker for video generation", redis_url=settings.redis_url)
 
-    # Parse Redis URL for connection
-    # Format: redis://localhost:6379
-    redis_host = "localhost"
-    redis_port = 6379
-    
-    if settings.redis_url:
-        parts = settings.redis_url.replace("redis://", "").split(":")
-        redis_host = parts[0] if parts else "localhost"
-        redis_port = int(parts[1].split("/")[0]) if len(parts) > 1 else 6379
+    connection = redis_connection()
+
+    # Open provider connections before the first job
+    if settings.client_warmup_enabled:
+        clients.warm_up()
 
     # Track processed job IDs to prevent reprocessing
     processed_jobs = set()
@@ -231,20 +353,18 @@ async def main():
         
         try:
             result = await process_generation_job(job, token)
-            processed_jobs.add(job_id)
+            if not result.get("parked"):
+                processed_jobs.add(job_id)  # a parked job comes back under the same ID
             return result
         except Exception as e:
             processed_jobs.add(job_id)  # Don't retry failed jobs either
             raise
 
     worker = Worker(
-        "generation",  # Queue name - matches NestJS BullMQ queue
+        QUEUE_NAME,
         process_job_wrapper,
         {
-            "connection": {
-                "host": redis_host,
-                "port": redis_port,
-            },
+            "connection": connection,
             "concurrency": 1,  # Process one at a time to avoid rate limits
             "autorun": True,
             "removeOnComplete": {"count": 0},  # Remove completed jobs
@@ -252,7 +372,10 @@ async def main():
         },
     )
 
-    logger.info(f"Worker started, listening on queue 'generation' at {redis_host}:{redis_port}")
+    logger.info(
+        f"Worker started, listening on queue '{QUEUE_NAME}'"
+        f" at {connection['host']}:{connection['port']}"
+    )
 
     # Keep worker running
     try:
@@ -261,6 +384,8 @@ async def main():
     except KeyboardInterrupt:
         logger.info("Shutting down worker...")
         await worker.close()
+    finally:
+        clients.close_all()
 
 
 if __name__ == "__main__":
@@ -26,6 +26,16 @@ class Settings(BaseSettings):
     # AI Providers
     openai_api_key: str = ""
     openai_model: str = "gpt-4-turbo-preview"
+    script_streaming_enabled: bool = True  # start video before the script finishes
+    expansion_cache_enabled: bool = True
+    expansion_cache_ttl_hours: int = 24
+    expansion_cache_max_entries: int = 10000
+    expansion_context_max_tokens: int = 1200  # scene summary + recent scripts
+    expansion_batch_size: int = 4  # prompts per request in expand_batch, at most
+    openai_max_output_tokens: int = 0  # completion-token limit; 0 = known limit of openai_model
+    scene_summary_enabled: bool = True
+    scene_summary_max_tokens: int = 400
+    scene_summary_script_tokens: int = 1500  # of each new script folded in
     
     # Google AI Studio (Veo 3)
     google_ai_api_key: str = ""
@@ -37,6 +47,112 @@ class Settings(BaseSettings):
     max_retries: int = 3
     retry_delay: int = 60
 
+    # Transcoding
+    transcode_threads: int = 0  # threads per job; 0 = cores / worker_concurrency
+    transcode_pin_cpus: bool = True
+    ffmpeg_stall_timeout: int = 60  # seconds without progress before killing ffmpeg
+    ffmpeg_stderr_tail_lines: int = 50
+    hls_placeholder_on_failure: bool = False  # development only: dummy playlist if ffmpeg fails
+    progress_update_interval: float = 2.0  # min seconds between job progress updates
+    encoding_sla_seconds: int = 300  # target time from enqueue to completion
+    encoding_job_seconds: int = 180  # typical end-to-end time of one job
+
+    # Quality gate (luma values are 0-255)
+    quality_gate_enabled: bool = True
+    quality_analysis_width: int = 64
+    quality_black_luma: float = 16.0
+    quality_freeze_delta: float = 0.5  # mean abs frame change below this is frozen
+    quality_flicker_delta: float = 12.0  # global luma jump counted as flicker
+    quality_cut_delta: float = 30.0  # structural change counted as a scene cut
+    quality_max_black_ratio: float = 0.5
+    quality_max_freeze_seconds: float = 2.0
+    quality_max_flicker_ratio: float = 0.1
+
+    # Visual continuity between consecutive segments
+    visual_continuity_enabled: bool = True
+    visual_continuity_min_score: float = 0.0  # 0 records the score without gating
+
+    # Posters and trickplay sprites emitted by the HLS encode
+    poster_widths: list[int] = [320, 640, 1280]
+    poster_formats: list[str] = ["webp", "avif"]  # formats ffmpeg cannot encode are skipped
+    trickplay_interval: float = 1.0  # seconds between sprite tiles; 0 disables
+    trickplay_width: int = 160
+    trickplay_columns: int = 10
+    trickplay_rows: int = 10
+
+    # Publish a low-res rendition before the full ladder is encoded
+    progressive_publish_enabled: bool = True
+
+    # Job scratch space
+    workspace_dir: str = "/tmp/storyforge/work"
+    workspace_tmpfs_dir: str = ""  # e.g. /dev/shm/storyforge; used while it fits a whole job
+    workspace_job_max_bytes: int = 2 * 1024**3
+    workspace_max_bytes: int = 20 * 1024**3
+    workspace_orphan_age_hours: int = 6
+
+    # Transcode cache
+    transcode_cache_enabled: bool = True
+    transcode_cache_dir: str = "/tmp/storyforge/transcode-cache"
+    transcode_cache_max_bytes: int = 5 * 1024**3  # local tier
+    transcode_cache_remote_max_bytes: int = 200 * 1024**3
+    transcode_cache_max_age_days: int = 30
+
+    # Video providers, in preference order (kind:name[?options])
+    video_providers: list[str] = [
+        "veo:veo-3.1-generate-preview",
+        "veo:veo-3.1-fast-generate-preview",
+    ]
+    provider_latency_slo_seconds: float = 240.0  # p95; slower providers drop a tier
+    provider_max_error_rate: float = 0.5
+    provider_stats_window: int = 50
+    provider_stats_max_age_seconds: int = 1800  # older samples no longer count
+    provider_probe_rate: float = 0.05  # share of requests sent first to a demoted provider
+    provider_hedge_after_seconds: float = 0.0  # 0 disables hedging
+
+    # Circuit breakers (per provider, per process)
+    circuit_failure_threshold: int = 5  # consecutive failures before opening
+    circuit_reset_seconds: float = 60.0  # open time before a probe call
+    circuit_max_parks: int = 10  # times a job is re-queued before it fails
+
+    # Full-scene export
+    scene_export_on_complete: bool = True  # refresh the export as segments complete
+    scene_export_lock_seconds: int = 900  # one export per scene at a time
+    scene_export_busy_delay: int = 30  # seconds before retrying a busy scene
+
+    # Multi-shot segments
+    max_segment_seconds: int = 32
+    max_parallel_shots: int = 4
+
+    # Reuse of Veo output for identical requests
+    generation_cache_enabled: bool = True
+    generation_cache_ttl_hours: int = 72
+    generation_cache_max_bytes: int = 50 * 1024**3
+
+    # Generated video download
+    download_chunk_bytes: int = 1024 * 1024
+    download_max_resumes: int = 5
+    download_timeout: float = 60.0  # per read, not for the whole transfer
+
+    # Boundary-frame cache for image-conditioned generation
+    frame_cache_enabled: bool = True
+    frame_cache_dir: str = "/tmp/storyforge/frame-cache"
+    frame_cache_max_bytes: int = 512 * 1024**2
+    frame_cache_keyframes: int = 0  # leading keyframes kept as reference images (Veo takes up to 3)
+
+    # Shared API clients
+    http_max_connections: int = 32  # per provider
+    http_max_keepalive: int = 16
+    http_keepalive_seconds: float = 90.0
+    http_connect_timeout: float = 10.0
+    http_timeout: float = 120.0
+    http2_enabled: bool = True  # needs h2, installed with httpx[http2]
+    s3_max_pool_connections: int = 32
+    redis_max_connections: int = 64
+    client_warmup_enabled: bool = True
+
+    # Metrics
+    metrics_port: int = 9400  # 0 disables; pool process N listens on port + N
+
     class Config:
         env_file = str(Path(__file__).parent.parent / ".env")
         env_file_encoding = "utf-8"
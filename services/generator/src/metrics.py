@@ -0,0 +1,163 @@
+"""
+Prometheus metrics for the generator worker.
+"""
+
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Transcode cache
+TRANSCODE_CACHE_LOOKUPS = Counter(
+    "storyforge_transcode_cache_lookups_total",
+    "Transcode cache lookups by outcome",
+    ["result"],  # hit_local, hit_remote, miss
+)
+TRANSCODE_CACHE_EVICTIONS = Counter(
+    "storyforge_transcode_cache_evictions_total",
+    "Transcode cache entries evicted",
+    ["tier", "reason"],  # tier: local, remote; reason: size, age
+)
+TRANSCODE_CACHE_LOCAL_BYTES = Gauge(
+    "storyforge_transcode_cache_local_bytes",
+    "Bytes held by the local transcode cache tier",
+)
+
+# Generation cache
+GENERATION_CACHE_LOOKUPS = Counter(
+    "storyforge_generation_cache_lookups_total",
+    "Veo generation cache lookups by outcome",
+    ["result"],  # hit, miss
+)
+
+# Script expansion
+EXPANSION_TOKENS = Counter(
+    "storyforge_expansion_tokens_total",
+    "OpenAI tokens used by script expansion",
+    ["kind"],  # prompt_cached, prompt_uncached, completion
+)
+EXPANSION_CACHE_LOOKUPS = Counter(
+    "storyforge_expansion_cache_lookups_total",
+    "Script expansion cache lookups by outcome",
+    ["result"],  # hit, miss
+)
+
+# Video providers
+PROVIDER_REQUESTS = Counter(
+    "storyforge_provider_requests_total",
+    "Video generation requests by provider and outcome",
+    ["provider", "outcome"],  # success, error, cancelled
+)
+PROVIDER_LATENCY = Histogram(
+    "storyforge_provider_latency_seconds",
+    "Wall time of video generation requests",
+    ["provider"],
+    buckets=(15, 30, 60, 90, 120, 180, 240, 360, 600),
+)
+PROVIDER_HEDGES = Counter(
+    "storyforge_provider_hedges_total",
+    "Hedged duplicate requests sent to a provider",
+    ["provider"],
+)
+
+# Circuit breakers
+CIRCUIT_STATE = Gauge(
+    "storyforge_circuit_state",
+    "Provider circuit breaker state (0 closed, 1 half-open, 2 open)",
+    ["breaker"],
+)
+CIRCUIT_REJECTIONS = Counter(
+    "storyforge_circuit_rejections_total",
+    "Calls rejected without reaching the provider because its circuit was open",
+    ["breaker"],
+)
+JOBS_PARKED = Counter(
+    "storyforge_jobs_parked_total",
+    "Jobs re-queued with a delay while a provider's circuit was open",
+)
+
+# FFmpeg
+FFMPEG_SPEED = Histogram(
+    "storyforge_ffmpeg_speed_ratio",
+    "Final ffmpeg encode speed as a multiple of realtime",
+    ["operation"],
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 16, 32),
+)
+FFMPEG_FPS = Histogram(
+    "storyforge_ffmpeg_fps",
+    "Final ffmpeg encode frames per second",
+    ["operation"],
+    buckets=(5, 10, 25, 50, 100, 200, 400, 800),
+)
+FFMPEG_STALLS = Counter(
+    "storyforge_ffmpeg_stalls_total",
+    "ffmpeg processes killed for making no progress",
+    ["operation"],
+)
+
+# Downloads
+VIDEO_DOWNLOAD_THROUGHPUT = Histogram(
+    "storyforge_video_download_bytes_per_second",
+    "Throughput of generated video downloads",
+    buckets=(2.5e5, 1e6, 4e6, 1.6e7, 6.4e7, 2.56e8),
+)
+VIDEO_DOWNLOAD_RESUMES = Counter(
+    "storyforge_video_download_resumes_total",
+    "Interrupted video downloads resumed with a range request",
+)
+
+# Pipeline
+PIPELINE_STAGE_SECONDS = Histogram(
+    "storyforge_pipeline_stage_seconds",
+    "Wall time spent in each generation pipeline stage",
+    ["stage"],
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+
+SEGMENT_TIME_TO_PLAYABLE = Histogram(
+    "storyforge_segment_time_to_playable_seconds",
+    "Seconds from a generated video to its first playable hls_url",
+    buckets=(1, 2.5, 5, 10, 20, 30, 60, 120, 300),
+)
+
+# Scratch workspaces
+WORKSPACE_BYTES = Gauge(
+    "storyforge_workspace_bytes",
+    "Bytes held in job scratch directories",
+    ["root"],
+)
+WORKSPACE_FREE_BYTES = Gauge(
+    "storyforge_workspace_free_bytes",
+    "Free bytes on the filesystem holding scratch directories",
+    ["root"],
+)
+WORKSPACE_ACTIVE = Gauge(
+    "storyforge_workspace_active",
+    "Job scratch directories currently allocated by this process",
+)
+WORKSPACE_ORPHANS_REMOVED = Counter(
+    "storyforge_workspace_orphans_removed_total",
+    "Scratch directories removed after their owning process died",
+)
+
+
+class StageTimer:
+    """Times successive pipeline stages for metrics and the job result."""
+
+    def __init__(self):
+        self.timings: dict[str, float] = {}
+        self._stage: str | None = None
+        self._started = 0.0
+
+    def start(self, stage: str) -> None:
+        """Finish the current stage (if any) and start timing a new one."""
+        self.stop()
+        self._stage = stage
+        self._started = time.monotonic()
+
+    def stop(self) -> None:
+        if self._stage is None:
+            return
+        elapsed = time.monotonic() - self._started
+        self.timings[self._stage] = round(elapsed, 3)
+        PIPELINE_STAGE_SECONDS.labels(stage=self._stage).observe(elapsed)
+        self._stage = None
@@ -5,6 +5,7 @@ from .database import DatabaseService
 from .storage import StorageService
 from .continuity import ContinuityValidator
 from .hls_builder import HLSBuilder
+from .scene_exporter import SceneExporter, ExportResult
 
 __all__ = [
     "ScriptExpander",
@@ -18,4 +19,6 @@ __all__ = [
     "StorageService",
     "ContinuityValidator",
     "HLSBuilder",
+    "SceneExporter",
+    "ExportResult",
 ]
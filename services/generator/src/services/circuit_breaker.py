@@ -0,0 +1,164 @@
+"""
+Circuit Breaker - Stops calling a provider that keeps failing.
+
+One breaker per provider is shared by everything in the process. After
+``failure_threshold`` consecutive failures the breaker opens and calls are
+rejected immediately with CircuitOpenError, so jobs can fail fast or be
+parked instead of waiting out timeouts. Once ``reset_timeout`` has passed a
+single probe call is let through (half-open); its outcome closes or reopens
+the breaker.
+"""
+
+from contextlib import contextmanager
+from typing import Iterator
+import threading
+import time
+import structlog
+
+from src.config import get_settings
+from src.metrics import CIRCUIT_REJECTIONS, CIRCUIT_STATE
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """A call was rejected because the provider's breaker is open."""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"Circuit open for {provider}; retry in {retry_after:.0f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for one provider."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int | None = None,
+        reset_timeout: float | None = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.circuit_failure_threshold
+        self.reset_timeout = reset_timeout or settings.circuit_reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.labels(breaker=name).set(STATE_VALUES[CLOSED])
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker will admit a probe (0 if it admits calls now)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return 0.0
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == OPEN and remaining > 0:
+                return remaining
+            return 0.0 if not self._probing else self.reset_timeout
+
+    def allows(self) -> bool:
+        """Whether a call would currently be admitted, without admitting it."""
+        return self.retry_after() == 0.0
+
+    def before_call(self) -> None:
+        """
+        Admit a call or reject it.
+
+        Raises:
+            CircuitOpenError: Breaker open, or half-open with a probe in flight
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._set_state(HALF_OPEN)
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            remaining = max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+        CIRCUIT_REJECTIONS.labels(breaker=self.name).inc()
+        raise CircuitOpenError(self.name, remaining or self.reset_timeout)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def release(self) -> None:
+        """Give back a probe slot without an outcome (e.g. cancelled call)."""
+        with self._lock:
+            self._probing = False
+
+    @contextmanager
+    def guard(self, failures: tuple[type[BaseException], ...] = (Exception,)) -> Iterator[None]:
+        """
+        Run a block as one call through the breaker.
+
+        Exceptions of the ``failures`` types count against the provider; any
+        other exception means the provider answered and counts as success.
+        """
+        self.before_call()
+        try:
+            yield
+        except failures:
+            self.record_failure()
+            raise
+        except Exception:
+            self.record_success()
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.record_success()
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            logger.warning(
+                "Circuit breaker state change", breaker=self.name, old=self.state, new=state
+            )
+        self.state = state
+        CIRCUIT_STATE.labels(breaker=self.name).set(STATE_VALUES[state])
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker for a provider, created on first use."""
+    with _registry_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def require_any(breakers: list[CircuitBreaker]) -> None:
+    """
+    Check that at least one of several interchangeable providers is usable.
+
+    Raises:
+        CircuitOpenError: Every breaker is open; retry_after is the soonest probe
+    """
+    if not breakers or any(breaker.allows() for breaker in breakers):
+        return
+    soonest = min(breakers, key=lambda breaker: breaker.retry_after())
+    raise CircuitOpenError(soonest.name, soonest.retry_after())
@@ -0,0 +1,186 @@
+"""
+Clients - Process-wide registry of long-lived API clients.
+
+Services used to build a new OpenAI, GenAI, boto3 or Redis client per job,
+paying DNS, TCP and TLS setup on the first call of every job. The registry
+creates each client once per process with explicit connection-pool limits,
+keep-alive and timeouts, and services borrow them. HTTP/2 is used for the
+httpx-based clients when the ``h2`` package (from ``httpx[http2]``) is
+importable. ``warm_up`` opens the connections at worker start, in both the
+Celery and the BullMQ worker, so the first job doesn't pay for them.
+
+Clients are rebuilt after a fork, since sockets must not be shared between
+a parent and its pool processes.
+"""
+
+from functools import lru_cache
+from typing import Any, Callable, TypeVar
+import importlib.util
+import os
+import threading
+import boto3
+from botocore.config import Config
+import httpx
+import openai
+import redis
+import structlog
+
+from google import genai
+from google.genai import types
+
+from src.config import get_settings
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+T = TypeVar("T")
+
+_clients: dict[str, Any] = {}
+_clients_pid = os.getpid()
+_lock = threading.Lock()
+
+
+@lru_cache
+def http2_available() -> bool:
+    """Whether httpx can negotiate HTTP/2 (needs the optional h2 package)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def _shared(name: str, factory: Callable[[], T]) -> T:
+    """The process's client called name, created on first use."""
+    global _clients_pid
+    with _lock:
+        if _clients_pid != os.getpid():
+            _clients.clear()  # inherited from the parent; sockets aren't ours
+            _clients_pid = os.getpid()
+        if name not in _clients:
+            _clients[name] = factory()
+            logger.debug("Created shared client", client=name)
+        return _clients[name]
+
+
+def _httpx_options(timeout: float | None = None) -> dict[str, Any]:
+    return {
+        "limits": httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive,
+            keepalive_expiry=settings.http_keepalive_seconds,
+        ),
+        "timeout": httpx.Timeout(
+            timeout or settings.http_timeout,
+            connect=settings.http_connect_timeout,
+        ),
+        "http2": settings.http2_enabled and http2_available(),
+    }
+
+
+def http_client() -> httpx.Client:
+    """General-purpose HTTP client, e.g. for downloading generated media."""
+    return _shared("http", lambda: httpx.Client(follow_redirects=True, **_httpx_options()))
+
+
+def async_http_client() -> httpx.AsyncClient:
+    return _shared(
+        "http_async",
+        lambda: httpx.AsyncClient(follow_redirects=True, **_httpx_options()),
+    )
+
+
+def openai_client() -> openai.OpenAI:
+    return _shared(
+        "openai",
+        lambda: openai.OpenAI(
+            api_key=settings.openai_api_key,
+            http_client=httpx.Client(**_httpx_options()),
+        ),
+    )
+
+
+def async_openai_client() -> openai.AsyncOpenAI:
+    return _shared(
+        "openai_async",
+        lambda: openai.AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            http_client=httpx.AsyncClient(**_httpx_options()),
+        ),
+    )
+
+
+def genai_client() -> genai.Client:
+    """Google GenAI client; ``.aio`` on it is the async counterpart."""
+    return _shared(
+        "genai",
+        lambda: genai.Client(
+            api_key=settings.google_ai_api_key,
+            http_options=types.HttpOptions(
+                httpx_client=httpx.Client(**_httpx_options()),
+                httpx_async_client=httpx.AsyncClient(**_httpx_options()),
+            ),
+        ),
+    )
+
+
+def s3_client() -> Any:
+    """boto3 S3 client; boto3 clients are safe to share between threads."""
+    return _shared(
+        "s3",
+        lambda: boto3.session.Session().client(
+            "s3",
+            endpoint_url=settings.s3_endpoint,
+            aws_access_key_id=settings.s3_access_key,
+            aws_secret_access_key=settings.s3_secret_key,
+            region_name=settings.s3_region,
+            config=Config(
+                signature_version="s3v4",
+                max_pool_connections=settings.s3_max_pool_connections,
+                tcp_keepalive=True,
+                connect_timeout=settings.http_connect_timeout,
+                read_timeout=settings.http_timeout,
+                retries={"max_attempts": 3, "mode": "adaptive"},
+            ),
+        ),
+    )
+
+
+def redis_client() -> redis.Redis:
+    return _shared(
+        "redis",
+        lambda: redis.Redis(
+            connection_pool=redis.ConnectionPool.from_url(
+                settings.redis_url,
+                max_connections=settings.redis_max_connections,
+                socket_keepalive=True,
+                health_check_interval=30,
+            )
+        ),
+    )
+
+
+def warm_up() -> None:
+    """Create every client and open its connections with a cheap request."""
+    checks: dict[str, Callable[[], Any]] = {
+        "redis": lambda: redis_client().ping(),
+        "s3": lambda: s3_client().head_bucket(Bucket=settings.s3_bucket_videos),
+        "openai": lambda: openai_client().models.retrieve(settings.openai_model),
+        "genai": lambda: next(iter(genai_client().models.list(config={"page_size": 1})), None),
+    }
+    for name, check in checks.items():
+        try:
+            check()
+        except Exception as e:
+            # The connection may still be usable; the first job will tell
+            logger.warning("Client warm-up failed", client=name, error=str(e))
+    logger.info("Clients warmed up", http2=settings.http2_enabled and http2_available())
+
+
+def close_all() -> None:
+    """Close the process's clients (sync ones only; async ones die with the loop)."""
+    with _lock:
+        for name, client in _clients.items():
+            close = getattr(client, "close", None)
+            if close and not name.endswith("_async"):
+                try:
+                    close()
+                except Exception as e:
+                    logger.warning("Error closing client", client=name, error=str(e))
+        _clients.clear()
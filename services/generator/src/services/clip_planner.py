@@ -0,0 +1,123 @@
+"""
+Clip Planner - Splits long segments into Veo-sized shots and stitches them.
+
+Veo renders at most 8 seconds per request, while expanded scripts target
+15-30 second segments. The planner divides the script's estimated duration
+into shots of 4, 6 or 8 seconds, distributing its actions and camera
+directions across them, so the shots can be generated concurrently and
+joined with a stream-copy concat (clips from one model share codec
+parameters, so nothing is re-encoded).
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+import math
+import structlog
+
+from src.config import get_settings
+from src.services.ffmpeg_progress import concat_quote, run_ffmpeg
+from src.services.script_expander import ExpandedScript
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+SHOT_DURATIONS = (4, 6, 8)  # seconds Veo can render
+
+
+@dataclass
+class Shot:
+    """One Veo request within a segment."""
+    index: int
+    prompt: str
+    duration: int
+    actions: list[str] = field(default_factory=list)
+    camera: str | None = None
+
+
+class ClipPlanner:
+    """Plans the shots of a segment from its expanded script."""
+
+    def __init__(self):
+        self.max_seconds = settings.max_segment_seconds
+
+    def plan(self, expanded: ExpandedScript) -> list[Shot]:
+        """
+        Shots covering the script's duration estimate.
+
+        Args:
+            expanded: Expanded script of the segment
+
+        Returns:
+            Shots in playback order; a single shot for short segments
+        """
+        base_prompt = expanded.video_prompt or expanded.full_script[:500]
+        target = min(max(expanded.duration_estimate or 0, SHOT_DURATIONS[0]), self.max_seconds)
+        durations = self._durations(target)
+
+        if len(durations) == 1:
+            return [Shot(index=0, prompt=base_prompt, duration=durations[0])]
+
+        count = len(durations)
+        actions = self._split(expanded.actions, count)
+        cameras = self._split(expanded.camera_directions, count)
+        shots = []
+        for i, duration in enumerate(durations):
+            camera = cameras[i][0] if cameras[i] else None
+            details = [f"Shot {i + 1} of {count}"]
+            if camera:
+                details.append(f"Camera: {camera}")
+            if actions[i]:
+                details.append(f"Action: {' '.join(actions[i])}")
+            shots.append(Shot(
+                index=i,
+                prompt=f"{base_prompt}\n\n{'. '.join(details)}",
+                duration=duration,
+                actions=actions[i],
+                camera=camera,
+            ))
+
+        logger.info("Segment split into shots", target=target, durations=durations)
+        return shots
+
+    @staticmethod
+    def _durations(target: float) -> list[int]:
+        """Fewest shots covering target; the last is the shortest that fits."""
+        longest = SHOT_DURATIONS[-1]
+        count = math.ceil(target / longest)
+        remainder = target - longest * (count - 1)
+        last = next(d for d in SHOT_DURATIONS if d >= remainder)
+        return [longest] * (count - 1) + [last]
+
+    @staticmethod
+    def _split(items: list[str], parts: int) -> list[list[str]]:
+        """Distribute items over parts in order, as evenly as possible."""
+        bounds = [math.ceil(i * len(items) / parts) for i in range(parts + 1)]
+        return [items[bounds[i]:bounds[i + 1]] for i in range(parts)]
+
+
+def stitch_clips(clips: list[Path], output_path: Path) -> Path:
+    """
+    Join clips with the concat demuxer, copying streams.
+
+    Args:
+        clips: Local clips in playback order, all with the same codecs
+        output_path: File to write
+
+    Returns:
+        output_path
+    """
+    list_path = output_path.with_suffix(".txt")
+    list_path.write_text("".join(f"file {concat_quote(str(clip))}\n" for clip in clips))
+    run_ffmpeg(
+        [
+            "ffmpeg", "-y", "-v", "error",
+            "-f", "concat", "-safe", "0",
+            "-i", str(list_path),
+            "-c", "copy",
+            "-movflags", "+faststart",
+            str(output_path),
+        ],
+        operation="stitch",
+    )
+    list_path.unlink(missing_ok=True)
+    return output_path
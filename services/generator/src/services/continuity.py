@@ -1,13 +1,69 @@
 """
 Continuity Validator - Ensures consistency with Scene Bible.
+
+The script is tokenized once into a ``ScriptIndex``. Attribute rules (hair,
+eyes, clothing) find their value words next to a cue word ("blonde hair",
+"eyes were green", "red jacket") with lookups over that index, and each
+finding is attributed to the nearest character mention. Status and object
+ownership checks read the words right after each mention.
 """
 
+from bisect import bisect_left
+from collections import defaultdict
 from dataclasses import dataclass, field
-import re
+from typing import Any
 import structlog
 
+from src.services.entity_matcher import (
+    WORD,
+    EntityMention,
+    entity_names,
+    get_matcher,
+    iter_entities,
+)
+from src.services.script_index import ScriptIndex
+
 logger = structlog.get_logger()
 
+# Descriptions in a later sentence than a mention bind to it up to this many words
+MENTION_WINDOW = 12
+
+HAIR_COLORS = {
+    "blonde": "blonde", "blond": "blonde", "brunette": "brunette", "red": "red",
+    "ginger": "red", "auburn": "auburn", "black": "black", "brown": "brown",
+    "gray": "gray", "grey": "gray", "white": "white", "silver": "silver",
+}
+EYE_COLORS = {
+    "blue": "blue", "green": "green", "brown": "brown", "hazel": "hazel",
+    "gray": "gray", "grey": "gray", "amber": "amber",
+}
+CLOTHING_COLORS = {
+    "black": "black", "white": "white", "red": "red", "blue": "blue",
+    "green": "green", "yellow": "yellow", "brown": "brown", "gray": "gray",
+    "grey": "gray", "purple": "purple", "pink": "pink", "orange": "orange",
+    "navy": "navy",
+}
+GARMENTS = frozenset({
+    "jacket", "coat", "dress", "shirt", "suit", "uniform", "hoodie", "cloak",
+    "robe", "sweater", "scarf", "hat", "cap", "boots", "trousers", "pants",
+    "jeans", "skirt", "armor", "armour", "vest", "gown",
+})
+
+# Verbs right after a character's name that mean they are alive and acting
+LIVING_ACTIONS = frozenset({
+    "walks", "walked", "says", "said", "runs", "ran", "speaks", "spoke",
+    "moves", "moved", "looks", "looked", "goes", "went", "smiles", "smiled",
+    "turns", "turned", "stands", "stood", "enters", "entered",
+})
+# Verbs between a character and an object that mean the character has it
+POSSESSION_VERBS = frozenset({
+    "holds", "holding", "held", "grabs", "grabbed", "wields", "wielding",
+    "carries", "carrying", "carried", "clutches", "clutching", "draws", "drew",
+    "uses", "used", "takes", "took", "picks", "picked",
+})
+# Words allowed between a possession verb and the object ("holds up the old key")
+POSSESSION_GAP = 4
+
 
 @dataclass
 class Violation:
@@ -26,6 +82,59 @@ class AutoCorrection:
     original: str
     corrected: str
     reason: str
+    start: int | None = None  # offset of original in the script, if known
+
+
+@dataclass(frozen=True)
+class AttributeRule:
+    """A physical attribute the script may describe next to a cue word."""
+    field: str  # reported in AutoCorrection.field
+    path: tuple[str, ...]  # into the character's bible entry
+    cues: frozenset[str]  # e.g. hair, haired
+    values: dict[str, str]  # word -> canonical value
+    message: str  # formatted with name, expected, found
+    reach: int = 3  # max words between value and cue
+    per_cue: bool = False  # expected values depend on the cue (clothing)
+    severity: str = "error"
+    correctable: bool = True
+
+
+@dataclass(frozen=True)
+class AttributeHit:
+    """An attribute value found next to a cue word."""
+    rule: AttributeRule
+    position: int  # word index of the value
+    value: str  # canonical
+    cue: str
+
+
+ATTRIBUTE_RULES = (
+    AttributeRule(
+        field="hair_color",
+        path=("physicalDescription", "hairColor"),
+        cues=frozenset({"hair", "haired"}),
+        values=HAIR_COLORS,
+        message="{name}'s hair is {expected}, but script mentions {found}",
+    ),
+    AttributeRule(
+        field="eye_color",
+        path=("physicalDescription", "eyeColor"),
+        cues=frozenset({"eye", "eyes", "eyed"}),
+        values=EYE_COLORS,
+        message="{name}'s eyes are {expected}, but script mentions {found}",
+    ),
+    AttributeRule(
+        field="clothing",
+        path=("physicalDescription", "clothing"),
+        cues=GARMENTS,
+        values=CLOTHING_COLORS,
+        message="{name} wears {expected}, but script mentions {found}",
+        reach=2,
+        per_cue=True,
+        severity="warning",  # outfits legitimately change between segments
+        correctable=False,
+    ),
+)
 
 
 @dataclass
@@ -56,13 +165,21 @@ class ContinuityValidator:
         violations = []
         auto_corrections = []
 
+        # Tokenize once; entity matching and every rule read the same index
+        index = ScriptIndex(script)
+        mentions: dict[str, dict[str, list[EntityMention]]] = defaultdict(lambda: defaultdict(list))
+        for mention in get_matcher(bible).find(script, index.matches, index.words):
+            mentions[mention.kind][mention.entity_id].append(mention)
+
         # Check character continuity
-        char_violations, char_corrections = self._check_characters(script, bible)
+        char_violations, char_corrections = self._check_characters(
+            index, bible, mentions["characters"]
+        )
         violations.extend(char_violations)
         auto_corrections.extend(char_corrections)
 
         # Check location continuity
-        loc_violations = self._check_locations(script, bible)
+        loc_violations = self._check_locations(script, bible, mentions["locations"])
         violations.extend(loc_violations)
 
         # Check timeline continuity
@@ -70,7 +187,7 @@ class ContinuityValidator:
         violations.extend(timeline_violations)
 
         # Check object continuity
-        obj_violations = self._check_objects(script, bible)
+        obj_violations = self._check_objects(index, bible, mentions)
         violations.extend(obj_violations)
 
         # Determine if valid (no errors, warnings are ok)
@@ -90,8 +207,20 @@ class ContinuityValidator:
     ) -> str:
         """Apply automatic corrections to a script."""
         corrected = script
+        # Positioned corrections replace only their own occurrence, last first
+        # so earlier offsets stay valid
+        positioned = sorted(
+            (c for c in corrections if c.start is not None),
+            key=lambda c: c.start,
+            reverse=True,
+        )
+        for correction in positioned:
+            end = correction.start + len(correction.original)
+            if corrected[correction.start:end] == correction.original:
+                corrected = corrected[:correction.start] + correction.corrected + corrected[end:]
         for correction in corrections:
-            corrected = corrected.replace(correction.original, correction.corrected)
+            if correction.start is None:
+                corrected = corrected.replace(correction.original, correction.corrected)
         return corrected
 
     def extract_bible_updates(self, script: str) -> dict | None:
@@ -114,69 +243,89 @@ class ContinuityValidator:
 
     def _check_characters(
         self,
-        script: str,
+        index: ScriptIndex,
         bible: dict,
+        mentions: dict[str, list[EntityMention]],
     ) -> tuple[list[Violation], list[AutoCorrection]]:
-        """Check character consistency."""
+        """Check consistency of the characters mentioned in the script."""
         violations = []
         corrections = []
-        characters = bible.get("characters", {})
-
-        for entity_id, char in characters.items():
-            name = char.get("name", "")
-            
-            # Check if character is mentioned
-            if name.lower() in script.lower():
-                # Check for description consistency
-                physical = char.get("physicalDescription", {})
-                
-                # Check hair color
-                hair_color = physical.get("hairColor", "")
-                if hair_color:
-                    wrong_colors = self._find_wrong_attribute(
-                        script, name, "hair", hair_color, ["blonde", "brunette", "red", "black", "gray", "white"]
-                    )
-                    if wrong_colors:
-                        violations.append(Violation(
-                            type="error",
-                            category="character",
-                            message=f"{name}'s hair is {hair_color}, but script mentions {wrong_colors}",
-                            entity_id=entity_id,
-                            suggestion=f"Change to {hair_color}",
-                        ))
-                        corrections.append(AutoCorrection(
-                            field="hair_color",
-                            original=wrong_colors,
-                            corrected=hair_color,
-                            reason=f"Maintaining character consistency for {name}",
-                        ))
-
-                # Check status (alive/deceased)
-                status = char.get("status", "alive")
-                if status == "deceased" and self._character_acts_alive(script, name):
+        if not mentions:
+            return violations, corrections
+
+        # Every attribute finding goes to the character mentioned nearest to it
+        spans = sorted(
+            (*index.span(mention), entity_id)
+            for entity_id, char_mentions in mentions.items()
+            for mention in char_mentions
+        )
+        hits_by_char: dict[str, list[AttributeHit]] = defaultdict(list)
+        for hit in self._attribute_hits(index):
+            owner = self._nearest_mention(index, spans, hit.position)
+            if owner is not None:
+                hits_by_char[owner].append(hit)
+
+        characters = dict(iter_entities(bible, "characters"))
+        for entity_id, char_mentions in mentions.items():
+            char = characters[entity_id]
+            name = char.get("name") or char.get("canonicalName") or entity_id
+
+            # Check described attributes against the bible
+            reported = set()
+            for hit in hits_by_char.get(entity_id, []):
+                expected = self._bible_text(char, hit.rule.path)
+                if not expected:
+                    continue
+                allowed = self._expected_values(hit, expected)
+                if not allowed or hit.value in allowed:
+                    continue
+
+                found = index.text(hit.position)
+                if hit.rule.per_cue:
+                    found = f"{found} {hit.cue}"
+                if (hit.rule.field, hit.value) not in reported:
+                    reported.add((hit.rule.field, hit.value))
                     violations.append(Violation(
-                        type="error",
+                        type=hit.rule.severity,
                         category="character",
-                        message=f"{name} is deceased but appears active in the script",
+                        message=hit.rule.message.format(name=name, expected=expected, found=found),
                         entity_id=entity_id,
+                        suggestion=f"Change to {expected}" if hit.rule.correctable else None,
+                    ))
+                if hit.rule.correctable:
+                    corrections.append(AutoCorrection(
+                        field=hit.rule.field,
+                        original=index.text(hit.position),
+                        corrected=expected,
+                        reason=f"Maintaining character consistency for {name}",
+                        start=index.starts[hit.position],
                     ))
 
-        return violations, corrections
+            # Check status (alive/deceased)
+            status = char.get("status", "alive")
+            if status == "deceased" and self._character_acts_alive(index, char_mentions):
+                violations.append(Violation(
+                    type="error",
+                    category="character",
+                    message=f"{name} is deceased but appears active in the script",
+                    entity_id=entity_id,
+                ))
 
-    def _check_locations(self, script: str, bible: dict) -> list[Violation]:
-        """Check location consistency."""
-        violations = []
-        locations = bible.get("locations", {})
+        return violations, corrections
 
-        for entity_id, loc in locations.items():
-            name = loc.get("name", "")
-            if name.lower() in script.lower():
-                # Check for feature consistency
-                features = loc.get("features", [])
-                # Could check if contradictory features are mentioned
-                pass
+    def _check_locations(
+        self,
+        script: str,
+        bible: dict,
+        mentions: dict[str, list[EntityMention]],
+    ) -> list[Violation]:
+        """
+        Check consistency of the locations mentioned in the script.
 
-        return violations
+        Location features aren't checked yet, so this finds nothing; it
+        takes the location mentions so a check can be added here.
+        """
+        return []
 
     def _check_timeline(self, script: str, bible: dict) -> list[Violation]:
         """Check timeline consistency."""
@@ -191,63 +340,176 @@ class ContinuityValidator:
         
         return violations
 
-    def _check_objects(self, script: str, bible: dict) -> list[Violation]:
-        """Check object consistency."""
+    def _check_objects(
+        self,
+        index: ScriptIndex,
+        bible: dict,
+        mentions: dict[str, dict[str, list[EntityMention]]],
+    ) -> list[Violation]:
+        """Check that objects mentioned in the script are held by their owners."""
         violations = []
-        objects = bible.get("objects", {})
+        object_mentions = mentions["objects"]
+        if not object_mentions or not mentions["characters"]:
+            return violations
 
-        for entity_id, obj in objects.items():
-            name = obj.get("name", "")
-            if name.lower() in script.lower():
-                # Check current owner/location
-                current_owner = obj.get("currentOwner")
-                if current_owner:
-                    # Could check if object is used by wrong character
-                    pass
+        characters = dict(iter_entities(bible, "characters"))
+        holders = sorted(
+            (*index.span(mention), entity_id)
+            for entity_id, char_mentions in mentions["characters"].items()
+            for mention in char_mentions
+        )
 
-        return violations
+        for entity_id, obj in iter_entities(bible, "objects"):
+            if entity_id not in object_mentions:
+                continue
+            # Check current owner
+            current_owner = obj.get("currentOwner")
+            if not current_owner:
+                continue
+            owner_ids = self._resolve_character(current_owner, characters)
+
+            for mention in object_mentions[entity_id]:
+                holder = self._holder(index, holders, index.span(mention)[0])
+                if holder is None or holder in owner_ids:
+                    continue
+                holder_name = characters[holder].get("name") or holder
+                violations.append(Violation(
+                    type="warning",
+                    category="object",
+                    message=(
+                        f"{obj.get('name') or entity_id} belongs to {current_owner}, "
+                        f"but the script shows {holder_name} with it"
+                    ),
+                    entity_id=entity_id,
+                    suggestion=f"Give it to {current_owner} or update the Scene Bible",
+                ))
+                break
 
-    def _find_wrong_attribute(
-        self,
-        script: str,
-        character_name: str,
-        attribute_type: str,
-        correct_value: str,
-        possible_values: list[str],
-    ) -> str | None:
-        """Find incorrect attribute mentions near character name."""
-        script_lower = script.lower()
-        char_lower = character_name.lower()
+        return violations
 
-        # Look for character name
-        char_pos = script_lower.find(char_lower)
-        if char_pos == -1:
-            return None
+    def _attribute_hits(self, index: ScriptIndex) -> list[AttributeHit]:
+        """Attribute values next to a cue word, each bound to its closest cue."""
+        best: dict[int, tuple[tuple[int, int], AttributeHit]] = {}
+        for rule in ATTRIBUTE_RULES:
+            for cue_position in index.find(rule.cues, 0, len(index)):
+                nearby = index.find(
+                    rule.values,
+                    cue_position - rule.reach,
+                    cue_position + rule.reach + 1,
+                )
+                for position in nearby:
+                    # Closer cues win; on a tie the cue after the value does
+                    # ("brown hair, blue eyes": blue belongs to eyes)
+                    rank = (abs(cue_position - position), int(position > cue_position))
+                    if position not in best or rank < best[position][0]:
+                        best[position] = (rank, AttributeHit(
+                            rule=rule,
+                            position=position,
+                            value=rule.values[index.words[position]],
+                            cue=index.words[cue_position],
+                        ))
+        return [hit for _, hit in sorted(best.values(), key=lambda item: item[1].position)]
 
-        # Check surrounding context (100 chars before and after)
-        context_start = max(0, char_pos - 100)
-        context_end = min(len(script), char_pos + len(character_name) + 100)
-        context = script_lower[context_start:context_end]
+    @staticmethod
+    def _nearest_mention(
+        index: ScriptIndex,
+        spans: list[tuple[int, int, str]],
+        position: int,
+    ) -> str | None:
+        """
+        Entity a description at a word belongs to.
 
-        # Look for wrong values
-        for value in possible_values:
-            if value.lower() != correct_value.lower() and value.lower() in context:
-                if attribute_type in context:
-                    return value
+        The closest mention in the same sentence wins; failing that, the last
+        mention before it ("Maya enters. Her hair is grey."), if within
+        MENTION_WINDOW words.
+        """
+        i = bisect_left(spans, (position + 1,))  # first mention starting after position
+        sentence = index.sentence(position)
+        candidates = []
+        earlier = None  # previous mention in an earlier sentence
+        if i > 0:
+            _, last, entity_id = spans[i - 1]
+            if index.sentence(last) == sentence:
+                candidates.append((max(0, position - last), 0, entity_id))
+            elif position - last <= MENTION_WINDOW:
+                earlier = entity_id
+        if i < len(spans):
+            first, _, entity_id = spans[i]
+            if index.sentence(first) == sentence:
+                candidates.append((first - position, 1, entity_id))
+        return min(candidates)[2] if candidates else earlier
+
+    @staticmethod
+    def _bible_text(char: dict, path: tuple[str, ...]) -> str:
+        """A character attribute as text; for clothing, the latest outfit."""
+        value: Any = char
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        if isinstance(value, list):
+            states = [
+                state for state in value
+                if isinstance(state, dict) and state.get("description")
+            ]
+            if not states:
+                return ""
+            latest = max(states, key=lambda state: (state.get("segmentRange") or [0, 0])[-1])
+            return latest["description"]
+        return value if isinstance(value, str) else ""
+
+    @staticmethod
+    def _expected_values(hit: AttributeHit, expected: str) -> set[str]:
+        """Canonical values the bible text allows for a hit."""
+        words = WORD.findall(expected.lower())
+        if hit.rule.per_cue:
+            if hit.cue not in words:
+                return set()  # the bible doesn't describe this garment
+            cue_position = words.index(hit.cue)
+            words = words[max(0, cue_position - hit.rule.reach):cue_position]
+        return {hit.rule.values[word] for word in words if word in hit.rule.values}
+
+    @staticmethod
+    def _resolve_character(reference: str, characters: dict[str, dict]) -> set[str]:
+        """Character ids an owner reference (id or name) may mean."""
+        if reference in characters:
+            return {reference}
+        lowered = reference.lower()
+        return {
+            entity_id for entity_id, char in characters.items()
+            if lowered in (name.lower() for name in entity_names(char))
+        }
+
+    @staticmethod
+    def _holder(
+        index: ScriptIndex, holders: list[tuple[int, int, str]], position: int
+    ) -> str | None:
+        """
+        Character shown holding the object mentioned at a word, if any.
 
-        return None
+        Matches "Maya's key" and "Maya grabs the key": a possession verb
+        between the character and the object, at most POSSESSION_GAP other
+        words apart.
+        """
+        i = bisect_left(holders, (position,)) - 1
+        if i < 0:
+            return None
+        _, last, entity_id = holders[i]
+        if position - last - 1 > POSSESSION_GAP + 1:
+            return None
+        between = index.words[last + 1:position]
+        if between[:1] == ["s"] and index.script[index.starts[last + 1] - 1] in "'’":
+            return entity_id
+        return entity_id if POSSESSION_VERBS.intersection(between) else None
 
-    def _character_acts_alive(self, script: str, character_name: str) -> bool:
+    def _character_acts_alive(self, index: ScriptIndex, mentions: list[EntityMention]) -> bool:
         """Check if a character performs living actions in script."""
-        action_words = ["walks", "says", "runs", "speaks", "moves", "looks", "goes"]
-        script_lower = script.lower()
-        char_lower = character_name.lower()
-
-        for action in action_words:
-            pattern = f"{char_lower}\\s+{action}"
-            if re.search(pattern, script_lower):
+        for mention in mentions:
+            last = index.span(mention)[1]
+            following = index.words[last + 1:last + 3]
+            # Allow one adverb: "Maya slowly walks"
+            if following[:1] and following[0].endswith("ly"):
+                following = following[1:]
+            if following[:1] and following[0] in LIVING_ACTIONS:
                 return True
-
         return False
 
     def _extract_new_characters(self, script: str) -> dict:
@@ -7,12 +7,12 @@ Uses PostgreSQL for data storage and Redis for pub/sub notifications.
 import json
 from datetime import datetime
 from typing import Optional
-import redis
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import structlog
 
 from src.config import get_settings
+from src.services.clients import redis_client
 
 logger = structlog.get_logger()
 settings = get_settings()
@@ -22,7 +22,7 @@ class DatabaseService:
     """Database operations using PostgreSQL + Redis pub/sub."""
 
     def __init__(self):
-        self.redis = redis.from_url(settings.redis_url)
+        self.redis = redis_client()
         
         # Parse database URL for psycopg2
         db_url = settings.database_url
@@ -107,7 +107,7 @@ class DatabaseService:
                 with conn.cursor() as cur:
                     cur.execute("""
                         SELECT s.id, s.title, s.description, s.status, s.topic_id,
-                               t.title as topic_title
+                               s.summary, s.summary_through, t.title as topic_title
                         FROM scenes s
                         LEFT JOIN topics t ON s.topic_id = t.id
                         WHERE s.id = %s
@@ -156,6 +156,42 @@ class DatabaseService:
             logger.error("Failed to get previous segments", scene_id=scene_id, error=str(e))
             return []
 
+    def get_scene_segments(self, scene_id: str) -> list[dict]:
+        """Get all segments of a scene, whatever their status, in playback order."""
+        try:
+            with self._get_conn() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT id, scene_id, order_index, prompt, expanded_script,
+                               status, video_url, duration
+                        FROM segments
+                        WHERE scene_id = %s
+                        ORDER BY order_index ASC
+                    """, (scene_id,))
+                    rows = cur.fetchall()
+                    return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error("Failed to get scene segments", scene_id=scene_id, error=str(e))
+            return []
+
+    def get_completed_segments(self, scene_id: str) -> list[dict]:
+        """Get all completed segments of a scene in playback order."""
+        try:
+            with self._get_conn() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT id, scene_id, order_index, prompt, expanded_script,
+                               video_url, duration
+                        FROM segments
+                        WHERE scene_id = %s AND status = 'COMPLETED'
+                        ORDER BY order_index ASC
+                    """, (scene_id,))
+                    rows = cur.fetchall()
+                    return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error("Failed to get completed segments", scene_id=scene_id, error=str(e))
+            return []
+
     def update_segment(self, segment_id: str, updates: dict) -> None:
         """Update segment data in PostgreSQL."""
         try:
@@ -200,6 +236,45 @@ class DatabaseService:
             logger.error("Failed to update segment", segment_id=segment_id, error=str(e))
             raise
 
+    def update_scene_summary(self, scene_id: str, summary: str, through: int) -> bool:
+        """
+        Store a scene's rolling summary covering segments up to ``through``.
+
+        Returns:
+            False if a summary covering as much or more was already stored
+        """
+        try:
+            with self._get_conn() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        UPDATE scenes SET summary = %s, summary_through = %s, updated_at = %s
+                        WHERE id = %s AND (summary_through IS NULL OR summary_through < %s)
+                    """, (summary, through, datetime.utcnow(), scene_id, through))
+                    updated = cur.rowcount > 0
+                conn.commit()
+            logger.info("Updated scene summary", scene_id=scene_id, through=through, stored=updated)
+            return updated
+        except Exception as e:
+            logger.error("Failed to update scene summary", scene_id=scene_id, error=str(e))
+            raise
+
+    def update_scene_stats(self, scene_id: str) -> None:
+        """Recompute a scene's total duration from its completed segments."""
+        try:
+            with self._get_conn() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        UPDATE scenes SET total_duration = (
+                            SELECT COALESCE(SUM(duration), 0) FROM segments
+                            WHERE scene_id = %s AND status = 'COMPLETED'
+                        ), updated_at = %s
+                        WHERE id = %s
+                    """, (scene_id, datetime.utcnow(), scene_id))
+                conn.commit()
+            logger.info("Updated scene stats", scene_id=scene_id)
+        except Exception as e:
+            logger.error("Failed to update scene stats", scene_id=scene_id, error=str(e))
+
     def update_job(self, job_id: str, updates: dict) -> None:
         """Update job data in PostgreSQL."""
         try:
@@ -0,0 +1,109 @@
+"""
+Encoding Policy - Picks x264 preset/CRF per job from queue pressure.
+
+When the generation queue is idle we spend CPU on smaller files (slower
+presets); as the backlog grows toward the completion SLA we trade bits for
+speed. High-priority jobs are pushed one tier faster.
+"""
+
+from dataclasses import dataclass, asdict
+import structlog
+
+from src.config import get_settings
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+# Redis keys holding pending jobs for the Celery and BullMQ generation queues
+QUEUE_KEYS = ("generation", "bull:generation:wait")
+
+# Ordered slowest/smallest to fastest/largest
+PRESET_TIERS = [
+    ("slow", 21),
+    ("medium", 22),
+    ("fast", 23),
+    ("veryfast", 24),
+    ("superfast", 26),
+]
+
+
+@dataclass
+class EncodingPolicy:
+    """x264 settings chosen for a job, plus the inputs behind the choice."""
+    preset: str = "fast"
+    crf: int = 23
+    tier: int = 2  # index into PRESET_TIERS; lower is slower and better
+    queue_depth: int = 0
+    priority: int = 0
+    pressure: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class EncodingPolicyEngine:
+    """Chooses an EncodingPolicy from backlog, priority and SLA."""
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client
+        self.sla_seconds = settings.encoding_sla_seconds
+        self.job_seconds = settings.encoding_job_seconds
+        self.concurrency = max(1, settings.worker_concurrency)
+
+    def queue_depth(self) -> int:
+        """Number of jobs waiting in the generation queues."""
+        if self.redis is None:
+            return 0
+        depth = 0
+        for key in QUEUE_KEYS:
+            try:
+                if self.redis.type(key) in (b"list", "list"):
+                    depth += self.redis.llen(key)
+            except Exception as e:
+                logger.warning("Failed to read queue depth", key=key, error=str(e))
+        return depth
+
+    def choose(self, priority: int = 0, queue_depth: int | None = None) -> EncodingPolicy:
+        """
+        Choose preset and CRF for a job.
+
+        Args:
+            priority: Job priority (higher is more urgent)
+            queue_depth: Pending job count; read from Redis if omitted
+
+        Returns:
+            EncodingPolicy to apply to every rendition of the job
+        """
+        if queue_depth is None:
+            queue_depth = self.queue_depth()
+
+        # Expected wait for the last queued job relative to the SLA
+        expected_wait = queue_depth * self.job_seconds / self.concurrency
+        pressure = expected_wait / self.sla_seconds if self.sla_seconds > 0 else 1.0
+
+        if queue_depth == 0:
+            tier = 0
+        elif pressure < 0.25:
+            tier = 1
+        elif pressure < 0.5:
+            tier = 2
+        elif pressure < 1.0:
+            tier = 3
+        else:
+            tier = 4
+
+        if priority > 0:
+            tier += 1
+        tier = min(tier, len(PRESET_TIERS) - 1)
+
+        preset, crf = PRESET_TIERS[tier]
+        policy = EncodingPolicy(
+            preset=preset,
+            crf=crf,
+            tier=tier,
+            queue_depth=queue_depth,
+            priority=priority,
+            pressure=round(pressure, 3),
+        )
+        logger.info("Encoding policy chosen", **policy.to_dict())
+        return policy
@@ -0,0 +1,145 @@
+"""
+Entity Matcher - Finds every Scene Bible entity mention in one scan.
+
+The bible's characters, locations and objects (their names, canonical names
+and aliases) are compiled into a trie over lowercased words. One pass over
+the script's words walks the trie from each word, taking the longest name
+that matches there, so "Captain Chen" wins over "Captain" and names only
+match whole words. The cost is linear in the script and independent of the
+number of entities (a regex alternation of all names would instead try
+every name at every position). Compiled matchers are memoized per
+(scene_id, bible version), so a bible is compiled once per process rather
+than once per validation.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Iterator
+import re
+import threading
+import structlog
+
+logger = structlog.get_logger()
+
+ENTITY_KINDS = ("characters", "locations", "objects")
+WORD = re.compile(r"\w+")
+OWNERS = ""  # trie key holding (kind, entity_id) pairs; never a word
+MATCHER_CACHE_SIZE = 128
+_matchers: OrderedDict[tuple[str, Any], "EntityMatcher"] = OrderedDict()
+_matchers_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class EntityMention:
+    """One occurrence of an entity name in a script."""
+    kind: str  # characters, locations, objects
+    entity_id: str
+    text: str  # as written in the script
+    start: int
+    end: int
+
+
+def iter_entities(bible: dict, kind: str) -> Iterator[tuple[str, dict]]:
+    """(entity_id, entity) pairs of a bible section stored as a dict or a list."""
+    section = bible.get(kind) or {}
+    if isinstance(section, dict):
+        yield from section.items()
+    else:
+        for i, entity in enumerate(section):
+            yield entity.get("entityId") or entity.get("id") or str(i), entity
+
+
+def entity_names(entity: dict) -> list[str]:
+    """Every name an entity may be referred to by."""
+    names = [entity.get("name"), entity.get("canonicalName"), *entity.get("aliases", [])]
+    return [name.strip() for name in names if name and name.strip()]
+
+
+class EntityMatcher:
+    """Compiled multi-pattern matcher over a bible's entity names."""
+
+    def __init__(self, bible: dict):
+        # Nested dicts keyed by word; OWNERS marks the end of a name
+        self.trie: dict = {}
+        ambiguous = []
+        for kind in ENTITY_KINDS:
+            for entity_id, entity in iter_entities(bible, kind):
+                for name in entity_names(entity):
+                    words = WORD.findall(name.lower())
+                    if not words:
+                        continue
+                    node = self.trie
+                    for word in words:
+                        node = node.setdefault(word, {})
+                    owners = node.setdefault(OWNERS, [])
+                    if (kind, entity_id) not in owners:
+                        owners.append((kind, entity_id))
+                        if len(owners) == 2:
+                            ambiguous.append(name)
+        if ambiguous:
+            logger.debug("Ambiguous entity names", names=ambiguous)
+
+    def find(
+        self,
+        script: str,
+        words: list[re.Match] | None = None,
+        lowered: list[str] | None = None,
+    ) -> list[EntityMention]:
+        """
+        Every entity mention in the script, in order of position.
+
+        Args:
+            script: Text to scan
+            words: ``WORD`` matches of the script, if the caller already has them
+            lowered: The lowercased text of those matches
+        """
+        if not self.trie:
+            return []
+        if words is None:
+            words = list(WORD.finditer(script))
+        if lowered is None:
+            lowered = [word.group().lower() for word in words]
+
+        mentions = []
+        i = 0
+        while i < len(words):
+            node = self.trie.get(lowered[i])
+            longest = None
+            j = i
+            while node is not None:
+                if OWNERS in node:
+                    longest = (j, node[OWNERS])
+                j += 1
+                node = node.get(lowered[j]) if j < len(words) else None
+            if longest is None:
+                i += 1
+                continue
+            last, owners = longest
+            start, end = words[i].start(), words[last].end()
+            for kind, entity_id in owners:
+                mentions.append(EntityMention(
+                    kind=kind,
+                    entity_id=entity_id,
+                    text=script[start:end],
+                    start=start,
+                    end=end,
+                ))
+            i = last + 1
+        return mentions
+
+
+def get_matcher(bible: dict) -> EntityMatcher:
+    """Compiled matcher for a bible, memoized per (scene_id, version)."""
+    if "scene_id" not in bible or "version" not in bible:
+        return EntityMatcher(bible)
+    key = (bible["scene_id"], bible["version"])
+    with _matchers_lock:
+        if key in _matchers:
+            _matchers.move_to_end(key)
+            return _matchers[key]
+    matcher = EntityMatcher(bible)
+    with _matchers_lock:
+        _matchers[key] = matcher
+        while len(_matchers) > MATCHER_CACHE_SIZE:
+            _matchers.popitem(last=False)
+    return matcher
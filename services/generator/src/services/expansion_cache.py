@@ -0,0 +1,85 @@
+"""
+Expansion Cache - Reuses script expansions for identical requests.
+
+Retried jobs and duplicate continuations send OpenAI exactly the same
+request again. Entries are keyed by a hash of the model, temperature and
+the complete chat messages, which already carry the user prompt, scene
+context, scene bible and previous-segment window. The parsed script fields
+are stored in Redis with a TTL; a sorted set indexes entries by age so the
+number of entries stays bounded.
+"""
+
+from typing import Any
+import hashlib
+import json
+import time
+import redis
+import structlog
+
+from src.config import get_settings
+from src.metrics import EXPANSION_CACHE_LOOKUPS
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+CACHE_PREFIX = "expansion-cache"
+INDEX_KEY = "expansion-cache:index"  # key -> stored timestamp
+
+
+class ExpansionCache:
+    """Maps expansion request fingerprints to parsed scripts."""
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+        self.ttl_seconds = settings.expansion_cache_ttl_hours * 3600
+        self.max_entries = settings.expansion_cache_max_entries
+
+    def key(self, model: str, temperature: float, messages: list[dict[str, str]]) -> str:
+        """Fingerprint of everything sent to the model."""
+        payload = json.dumps(
+            {"model": model, "temperature": temperature, "messages": messages},
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Stored script fields, or None on a miss."""
+        raw = self.redis.get(self._entry_key(key))
+        if raw is None:
+            EXPANSION_CACHE_LOOKUPS.labels(result="miss").inc()
+            return None
+        EXPANSION_CACHE_LOOKUPS.labels(result="hit").inc()
+        logger.info("Expansion cache hit", key=key)
+        return json.loads(raw)
+
+    def store(self, key: str, fields: dict[str, Any]) -> None:
+        self.redis.set(
+            self._entry_key(key),
+            json.dumps(fields),
+            ex=self.ttl_seconds,
+        )
+        self.redis.zadd(INDEX_KEY, {key: time.time()})
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Drop index entries past the TTL, then the oldest beyond the size cap.
+
+        Returns:
+            Number of entries removed
+        """
+        stale = self.redis.zrangebyscore(INDEX_KEY, "-inf", time.time() - self.ttl_seconds)
+        excess = max(0, self.redis.zcard(INDEX_KEY) - len(stale) - self.max_entries)
+        if excess:
+            stale += self.redis.zrange(INDEX_KEY, len(stale), len(stale) + excess - 1)
+        if not stale:
+            return 0
+        keys = [key.decode() if isinstance(key, bytes) else key for key in stale]
+        self.redis.delete(*[self._entry_key(key) for key in keys])
+        self.redis.zrem(INDEX_KEY, *keys)
+        return len(keys)
+
+    @staticmethod
+    def _entry_key(key: str) -> str:
+        return f"{CACHE_PREFIX}:entry:{key}"
@@ -0,0 +1,235 @@
+"""
+FFmpeg Progress - Runs ffmpeg with incremental progress parsing.
+
+ffmpeg is driven with ``-progress pipe:1`` so its key=value progress blocks
+can be parsed as they arrive. That gives fine-grained job progress, encode
+speed and fps metrics, and lets a watchdog kill encodes that stop making
+progress. Only a bounded tail of stderr is kept in memory.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+import os
+import signal
+import subprocess
+import threading
+import time
+import structlog
+
+from src.config import get_settings
+from src.metrics import FFMPEG_FPS, FFMPEG_SPEED, FFMPEG_STALLS
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+
+@dataclass
+class FFmpegProgress:
+    """One progress block reported by ffmpeg."""
+    frame: int = 0
+    fps: float = 0.0
+    out_time: float = 0.0  # seconds of output written
+    speed: float = 0.0  # x realtime
+    done: bool = False
+
+    def fraction(self, duration: float | None) -> float | None:
+        """Completed fraction of an input of the given duration."""
+        if self.done:
+            return 1.0
+        if not duration:
+            return None
+        return min(1.0, self.out_time / duration)
+
+
+class FFmpegStalledError(subprocess.CalledProcessError):
+    """ffmpeg was killed after making no progress for too long."""
+    pass
+
+
+class ThrottledProgress:
+    """
+    Forwards progress fractions at most once per interval.
+
+    Safe to share between the threads of concurrently running encodes, each
+    reporting under its own key; the forwarded value is their mean.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[float], None],
+        interval: float | None = None,
+        keys: list[str] | None = None,
+    ):
+        self.callback = callback
+        self.interval = settings.progress_update_interval if interval is None else interval
+        self.fractions = {key: 0.0 for key in keys or ["default"]}
+        self._last_sent = 0.0
+        self._last_value = -1.0
+        self._lock = threading.Lock()
+
+    def update(self, fraction: float, key: str = "default") -> None:
+        with self._lock:
+            self.fractions[key] = fraction
+            value = sum(self.fractions.values()) / len(self.fractions)
+            now = time.monotonic()
+            if value <= self._last_value:
+                return
+            if value < 1.0 and now - self._last_sent < self.interval:
+                return
+            self._last_sent, self._last_value = now, value
+        try:
+            self.callback(value)
+        except Exception as e:
+            logger.warning("Progress callback failed", error=str(e))
+
+
+def _parse_block(fields: dict[str, str]) -> FFmpegProgress:
+    def number(key: str, cast=float, default=0):
+        try:
+            return cast(fields.get(key, "").rstrip("x"))
+        except ValueError:
+            return default
+
+    return FFmpegProgress(
+        frame=number("frame", int),
+        fps=number("fps"),
+        out_time=number("out_time_us", int) / 1_000_000,
+        speed=number("speed"),
+        done=fields.get("progress") == "end",
+    )
+
+
+def _kill(process: subprocess.Popen) -> None:
+    """Kill ffmpeg and anything it spawned, so its pipes close."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (OSError, AttributeError):
+        process.kill()
+
+
+def run_ffmpeg(
+    cmd: list[str],
+    duration: float | None = None,
+    on_progress: Callable[[FFmpegProgress], None] | None = None,
+    stall_timeout: float | None = None,
+    cpus: list[int] | None = None,
+    operation: str = "ffmpeg",
+) -> FFmpegProgress:
+    """
+    Run an ffmpeg command, parsing progress as it runs.
+
+    Args:
+        cmd: ffmpeg command line (``cmd[0]`` is the binary)
+        duration: Input duration in seconds, for logging completion fraction
+        on_progress: Called with each parsed progress block
+        stall_timeout: Seconds without progress before the process is killed
+        cpus: CPUs to pin the process to, where supported
+        operation: Metric label describing the encode
+
+    Returns:
+        The final progress block
+
+    Raises:
+        FFmpegStalledError: No progress within stall_timeout
+        subprocess.CalledProcessError: ffmpeg exited non-zero; ``stderr``
+            holds only the tail of its output
+    """
+    if stall_timeout is None:
+        stall_timeout = settings.ffmpeg_stall_timeout
+    full_cmd = [cmd[0], "-nostats", "-progress", "pipe:1", *cmd[1:]]
+
+    pin_cpus = None
+    if cpus and hasattr(os, "sched_setaffinity"):
+        def pin_cpus() -> None:
+            # Runs in the child before exec, so ffmpeg's threads start pinned
+            try:
+                os.sched_setaffinity(0, cpus)
+            except OSError:
+                pass  # unpinned is better than failing the encode
+
+    process = subprocess.Popen(
+        full_cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        start_new_session=True,
+        preexec_fn=pin_cpus,
+    )
+
+    stderr_tail: deque[str] = deque(maxlen=settings.ffmpeg_stderr_tail_lines)
+    stderr_thread = threading.Thread(
+        target=lambda: stderr_tail.extend(process.stderr), daemon=True
+    )
+    stderr_thread.start()
+
+    last_activity = time.monotonic()
+    stalled = threading.Event()
+    finished = threading.Event()
+
+    def watchdog() -> None:
+        while not finished.wait(min(5.0, stall_timeout)):
+            if time.monotonic() - last_activity > stall_timeout:
+                stalled.set()
+                _kill(process)
+                return
+
+    if stall_timeout > 0:
+        threading.Thread(target=watchdog, daemon=True).start()
+
+    latest = FFmpegProgress()
+    last_out_time = -1.0
+    fields: dict[str, str] = {}
+    try:
+        for line in process.stdout:
+            key, _, value = line.strip().partition("=")
+            fields[key] = value
+            if key != "progress":
+                continue
+            latest = _parse_block(fields)
+            fields = {}
+            # Activity means output advanced, not just that ffmpeg is alive
+            if latest.out_time > last_out_time or latest.done:
+                last_out_time = latest.out_time
+                last_activity = time.monotonic()
+            if on_progress:
+                on_progress(latest)
+        process.wait()
+    finally:
+        finished.set()
+        if process.poll() is None:
+            _kill(process)
+            process.wait()
+        stderr_thread.join(timeout=5)
+
+    stderr = "".join(stderr_tail).encode()
+    if stalled.is_set():
+        FFMPEG_STALLS.labels(operation=operation).inc()
+        logger.error(
+            "FFmpeg stalled and was killed",
+            operation=operation,
+            stall_timeout=stall_timeout,
+            out_time=latest.out_time,
+        )
+        raise FFmpegStalledError(process.returncode, full_cmd, None, stderr)
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, full_cmd, None, stderr)
+
+    if latest.speed:
+        FFMPEG_SPEED.labels(operation=operation).observe(latest.speed)
+    if latest.fps:
+        FFMPEG_FPS.labels(operation=operation).observe(latest.fps)
+    logger.debug(
+        "FFmpeg finished",
+        operation=operation,
+        speed=latest.speed,
+        fps=latest.fps,
+        fraction=latest.fraction(duration),
+    )
+    return latest
+
+
+def concat_quote(value: str) -> str:
+    """Quote a path or URL as an entry of a concat demuxer list."""
+    return "'" + value.replace("'", "'\\''") + "'"
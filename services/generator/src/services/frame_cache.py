@@ -0,0 +1,152 @@
+"""
+Frame Cache - Boundary frames of completed segments for image conditioning.
+
+When a segment is finalized, its last frame (and optionally its first few
+keyframes) is extracted from the local video that is already on disk and
+stored in the internal bucket. The next segment in the scene conditions its
+Veo generation on those images without downloading or decoding the previous
+video. A local LRU directory serves repeat reads on the same worker.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+import os
+import shutil
+import subprocess
+import structlog
+
+from src.config import get_settings
+from src.services.storage import StorageService
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+LAST_FRAME = "last.jpg"
+
+
+@dataclass
+class BoundaryFrames:
+    """Locally cached conditioning frames of one segment."""
+    last_frame: Path
+    keyframes: list[Path] = field(default_factory=list)
+
+
+class FrameCacheError(Exception):
+    """Error extracting boundary frames."""
+    pass
+
+
+class BoundaryFrameCache:
+    """Extracts, stores and serves boundary frames per segment."""
+
+    def __init__(self, storage: StorageService | None = None):
+        self.storage = storage or StorageService()
+        self.bucket = self.storage.internal_bucket
+        self.local_dir = Path(settings.frame_cache_dir)
+        self.local_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = settings.frame_cache_max_bytes
+        self.keyframe_count = settings.frame_cache_keyframes
+
+    def store(self, scene_id: str, segment_id: str, video_source: str | Path) -> BoundaryFrames:
+        """Extract a finished segment's frames and publish them to the shared tier."""
+        entry_dir = self.local_dir / segment_id
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        self._extract(video_source, entry_dir)
+
+        frames = self._frames_in(entry_dir)
+        if frames is None:
+            raise FrameCacheError(f"No frames extracted for segment {segment_id}")
+
+        for path in [frames.last_frame, *frames.keyframes]:
+            self.storage.upload_private_file(
+                path, f"{self._prefix(scene_id, segment_id)}{path.name}", self.bucket
+            )
+        self._evict()
+        logger.info(
+            "Boundary frames cached", segment_id=segment_id, keyframes=len(frames.keyframes)
+        )
+        return frames
+
+    def get(self, scene_id: str, segment_id: str) -> BoundaryFrames | None:
+        """
+        Conditioning frames of a completed segment.
+
+        Served from the local tier, then the internal bucket. Segments
+        finalized before the cache existed are extracted once from their
+        source video. Returns None if no frames can be produced.
+        """
+        entry_dir = self.local_dir / segment_id
+        frames = self._frames_in(entry_dir)
+        if frames:
+            os.utime(entry_dir)  # mark as recently used
+            return frames
+
+        prefix = self._prefix(scene_id, segment_id)
+        objects = list(self.storage.list_objects(prefix, self.bucket))
+        if objects:
+            entry_dir.mkdir(parents=True, exist_ok=True)
+            for obj in objects:
+                name = obj["Key"][len(prefix):]
+                self.storage.download_file(obj["Key"], entry_dir / name, self.bucket)
+            self._evict()
+            return self._frames_in(entry_dir)
+
+        try:
+            source = self.storage.get_signed_url(
+                self.storage.segment_source_key(scene_id, segment_id)
+            )
+            return self.store(scene_id, segment_id, source)
+        except FrameCacheError as e:
+            logger.warning("Boundary frames unavailable", segment_id=segment_id, error=str(e))
+            return None
+
+    def _extract(self, video_source: str | Path, entry_dir: Path) -> None:
+        """Write the last frame, and the first keyframes, in one ffmpeg run."""
+        cmd = [
+            "ffmpeg", "-y", "-v", "error",
+            "-sseof", "-1", "-i", str(video_source),
+        ]
+        if self.keyframe_count:
+            cmd += ["-skip_frame", "nokey", "-i", str(video_source)]
+        cmd += ["-map", "0:v:0", "-update", "1", "-q:v", "2", str(entry_dir / LAST_FRAME)]
+        if self.keyframe_count:
+            cmd += [
+                "-map", "1:v:0",
+                "-fps_mode", "vfr",
+                "-frames:v", str(self.keyframe_count),
+                "-q:v", "2",
+                str(entry_dir / "key_%02d.jpg"),
+            ]
+
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise FrameCacheError(f"ffmpeg failed: {result.stderr[-500:]}")
+
+    @staticmethod
+    def _frames_in(entry_dir: Path) -> BoundaryFrames | None:
+        last_frame = entry_dir / LAST_FRAME
+        if not last_frame.exists():
+            return None
+        return BoundaryFrames(
+            last_frame=last_frame,
+            keyframes=sorted(entry_dir.glob("key_*.jpg")),
+        )
+
+    @staticmethod
+    def _prefix(scene_id: str, segment_id: str) -> str:
+        return f"scenes/{scene_id}/segments/{segment_id}/frames/"
+
+    def _evict(self) -> None:
+        """Drop least recently used segments while over the size cap."""
+        entries = []
+        for entry_dir in self.local_dir.iterdir():
+            if entry_dir.is_dir():
+                size = sum(p.stat().st_size for p in entry_dir.iterdir() if p.is_file())
+                entries.append((entry_dir.stat().st_mtime, size, entry_dir))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
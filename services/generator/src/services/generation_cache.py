@@ -0,0 +1,146 @@
+"""
+Generation Cache - Reuses Veo output for identical generation requests.
+
+Retries, duplicate submissions and unchanged re-submissions ask Veo for the
+same clip again. Requests are keyed by a hash of the model, the normalized
+enhanced prompt, aspect ratio, duration and the bytes of any conditioning
+images. The generated video is kept in the internal bucket; a Redis sorted
+set indexes entries by age so the cache can be trimmed by TTL and total size
+on every store and from the periodic maintenance sweep.
+"""
+
+from pathlib import Path
+import hashlib
+import json
+import time
+import redis
+import structlog
+
+from src.config import get_settings
+from src.metrics import GENERATION_CACHE_LOOKUPS
+from src.services.storage import StorageService
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+CACHE_PREFIX = "generation-cache"
+INDEX_KEY = "generation-cache:index"  # key -> created timestamp
+BYTES_KEY = "generation-cache:bytes"
+
+
+class GenerationCache:
+    """Maps generation request fingerprints to stored source videos."""
+
+    def __init__(self, storage: StorageService, redis_client: redis.Redis):
+        self.storage = storage
+        self.redis = redis_client
+        self.bucket = storage.internal_bucket
+        self.ttl_seconds = settings.generation_cache_ttl_hours * 3600
+        self.max_bytes = settings.generation_cache_max_bytes
+
+    def key(
+        self,
+        model: str,
+        prompt: str,
+        aspect_ratio: str,
+        duration_seconds: int,
+        conditioning: list[Path] | None = None,
+    ) -> str:
+        """Fingerprint of everything that determines Veo's output."""
+        payload = json.dumps(
+            {
+                "model": model,
+                "prompt": " ".join(prompt.split()),
+                "aspect_ratio": aspect_ratio,
+                "duration": duration_seconds,
+                "conditioning": [
+                    hashlib.sha256(path.read_bytes()).hexdigest() for path in conditioning or []
+                ],
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def fetch(self, key: str, video_path: Path) -> dict | None:
+        """
+        Download a cached video to video_path.
+
+        Returns:
+            The entry's metadata, or None on a miss
+        """
+        raw = self.redis.get(self._entry_key(key))
+        entry = json.loads(raw) if raw else None
+        if entry is None or time.time() - entry["created"] > self.ttl_seconds:
+            GENERATION_CACHE_LOOKUPS.labels(result="miss").inc()
+            return None
+
+        try:
+            self.storage.download_file(self._object_key(key), video_path, self.bucket)
+        except Exception as e:
+            # Index outlived the object; drop it and regenerate
+            logger.warning("Generation cache object missing", key=key, error=str(e))
+            self.invalidate(key)
+            GENERATION_CACHE_LOOKUPS.labels(result="miss").inc()
+            return None
+
+        GENERATION_CACHE_LOOKUPS.labels(result="hit").inc()
+        logger.info("Generation cache hit", key=key)
+        return entry
+
+    def store(self, key: str, video_path: Path, metadata: dict) -> None:
+        """Keep a freshly generated video for identical future requests."""
+        size = video_path.stat().st_size
+        self.invalidate(key)  # re-rolls replace the previous entry
+        self.storage.upload_private_file(video_path, self._object_key(key), self.bucket)
+        self.redis.set(
+            self._entry_key(key),
+            json.dumps({**metadata, "size": size, "created": time.time()}),
+        )
+        self.redis.zadd(INDEX_KEY, {key: time.time()})
+        self.redis.incrby(BYTES_KEY, size)
+        self.evict()
+
+    def invalidate(self, key: str) -> None:
+        """Forget an entry, e.g. when its video failed downstream checks."""
+        raw = self.redis.get(self._entry_key(key))
+        removed = self.redis.zrem(INDEX_KEY, key)
+        self.redis.delete(self._entry_key(key))
+        if removed:
+            size = json.loads(raw).get("size", 0) if raw else 0
+            self.redis.decrby(BYTES_KEY, size)
+            self.storage.delete_object(self._object_key(key), self.bucket)
+
+    def evict(self) -> int:
+        """
+        Drop expired entries, then the oldest while over the size cap.
+
+        Returns:
+            Number of entries removed
+        """
+        removed = 0
+        cutoff = time.time() - self.ttl_seconds
+        for key in self.redis.zrangebyscore(INDEX_KEY, "-inf", cutoff):
+            self.invalidate(key.decode() if isinstance(key, bytes) else key)
+            removed += 1
+
+        while int(self.redis.get(BYTES_KEY) or 0) > self.max_bytes:
+            oldest = self.redis.zrange(INDEX_KEY, 0, 0)
+            if not oldest:
+                self.redis.set(BYTES_KEY, 0)
+                break
+            key = oldest[0].decode() if isinstance(oldest[0], bytes) else oldest[0]
+            self.invalidate(key)
+            removed += 1
+
+        if removed:
+            logger.info("Generation cache evicted", count=removed)
+        return removed
+
+    @staticmethod
+    def _entry_key(key: str) -> str:
+        return f"{CACHE_PREFIX}:entry:{key}"
+
+    @staticmethod
+    def _object_key(key: str) -> str:
+        return f"{CACHE_PREFIX}/{key}.mp4"
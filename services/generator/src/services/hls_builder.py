@@ -2,12 +2,26 @@
 HLS Builder - Transcodes video to HLS format for streaming.
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Callable
 import subprocess
+import time
 import structlog
 
+from src.config import get_settings
+from src.services.encoding_policy import EncodingPolicy
+from src.services.ffmpeg_progress import FFmpegProgress, FFmpegStalledError, ThrottledProgress
+from src.services.media_probe import MediaInfo
+from src.services.still_images import StillImageSet
+from src.services.transcode_cache import TranscodeCache
+from src.services.transcode_scheduler import TranscodeScheduler, ThreadBudget
+
 logger = structlog.get_logger()
+settings = get_settings()
+
+# Bump when ffmpeg arguments change in a way that alters output
+ENCODER_VERSION = 4
 
 
 @dataclass
@@ -17,56 +31,248 @@ class HLSResult:
     master_playlist: Path
     variants: list[dict]
     segment_count: int
+    encoding: dict = field(default_factory=dict)
+    thumbnail_path: Path | None = None
+    images_dir: Path | None = None  # posters, sprite sheets, trickplay index
+
+
+class HLSEncodeError(Exception):
+    """ffmpeg failed while encoding a rendition."""
+    pass
 
 
 class HLSBuilder:
     """Builds HLS playlists from video files."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        scheduler: TranscodeScheduler | None = None,
+        cache: TranscodeCache | None = None,
+    ):
+        self.scheduler = scheduler or TranscodeScheduler()
+        self.cache = cache
+        if self.cache is None and settings.transcode_cache_enabled:
+            self.cache = TranscodeCache()
         self.segment_duration = 4  # seconds
         self.variants = [
+            {"name": "360p", "width": 640, "height": 360, "bitrate": "800k"},
             {"name": "720p", "width": 1280, "height": 720, "bitrate": "2500k"},
             {"name": "1080p", "width": 1920, "height": 1080, "bitrate": "5000k"},
         ]
 
-    def process(self, video_path: Path, segment_id: str) -> HLSResult:
+    def process(
+        self,
+        video_path: Path,
+        segment_id: str,
+        policy: EncodingPolicy | None = None,
+        media: MediaInfo | None = None,
+        on_progress: Callable[[float], None] | None = None,
+        thumbnail_time: float = 0.0,
+        on_preview: Callable[["HLSResult"], None] | None = None,
+    ) -> HLSResult:
         """
         Process video into HLS format.
         
         Args:
             video_path: Path to source video
             segment_id: Segment ID for output naming
+            policy: x264 preset/CRF to encode with (defaults to fast/23)
+            media: Probe of the source, needed for progress reporting
+            on_progress: Called (throttled) with the completed fraction 0..1
+            thumbnail_time: Timestamp of the frame to use as thumbnail
+            on_preview: If given, the smallest rendition is encoded first
+                with all threads and this is called with a playable result
+                (master playlist listing only that rendition) before the
+                remaining renditions are encoded. Not called on cache hits.
             
         Returns:
             HLSResult with output paths
         """
-        logger.info("Processing video to HLS", video_path=str(video_path))
+        policy = policy or EncodingPolicy()
+        logger.info(
+            "Processing video to HLS",
+            video_path=str(video_path),
+            preset=policy.preset,
+            crf=policy.crf,
+        )
+        started = time.monotonic()
 
-        output_dir = video_path.parent / "hls"
+        work_dir = video_path.parent
+        output_dir = work_dir / "hls"
         output_dir.mkdir(exist_ok=True)
+        images_dir = work_dir / "images"
+        images_dir.mkdir(exist_ok=True)
 
-        # Generate each variant
-        variant_playlists = []
-        for variant in self.variants:
-            playlist = self._generate_variant(video_path, output_dir, variant)
-            variant_playlists.append({
-                "name": variant["name"],
-                "playlist": playlist,
-                "bandwidth": int(variant["bitrate"].replace("k", "000")),
-                "resolution": f"{variant['width']}x{variant['height']}",
-            })
+        largest = self._largest_variant()
+        aspect_ratio = (
+            media.width / media.height if media and media.width and media.height
+            else largest["width"] / largest["height"]
+        )
+        images = StillImageSet(images_dir, aspect_ratio)
+
+        cache_key = None
+        if self.cache:
+            config = {
+                **self.encoding_config(),
+                "images": images.config(),
+                "thumbnail_time": thumbnail_time,
+            }
+            cache_key = self.cache.key(video_path, config)
+            manifest = self.cache.fetch(cache_key, work_dir, max_tier=policy.tier)
+            if manifest:
+                return self._result_from_cache(work_dir, manifest)
+
+        duration = media.duration if media else None
+        progress = None
+        if on_progress and duration:
+            progress = ThrottledProgress(on_progress, keys=[v["name"] for v in self.variants])
+
+        # Still images ride along on the largest rendition's decode
+        thumbnail_path = images.thumbnail_path
+        image_outputs = {largest["name"]: images.ffmpeg_outputs(thumbnail_time)}
+
+        def encode(variant: dict, budget: ThreadBudget) -> Path:
+            return self._generate_variant(
+                video_path,
+                output_dir,
+                variant,
+                budget,
+                policy,
+                duration,
+                progress,
+                image_outputs.get(variant["name"], []),
+            )
+
+        playlists: dict[str, Path] = {}
+        remaining = self.variants
+        encoding: dict = {}
+        if on_preview:
+            preview = min(self.variants, key=lambda v: v["width"] * v["height"])
+            playlists[preview["name"]] = encode(preview, self.scheduler.plan([preview])[0])
+            remaining = [v for v in self.variants if v is not preview]
+            encoding["preview_seconds"] = round(time.monotonic() - started, 2)
+            self._publish_preview(output_dir, preview, playlists[preview["name"]], on_preview)
+
+        # Generate the remaining variants concurrently, each within its thread budget
+        budgets = self.scheduler.plan(remaining)
+        for variant, playlist in zip(
+            remaining,
+            self.scheduler.map(lambda job: encode(*job), zip(remaining, budgets)),
+        ):
+            playlists[variant["name"]] = playlist
+        if not thumbnail_path.exists():
+            thumbnail_path = None
+        images.write_trickplay_index(duration)
+
+        variant_playlists = [
+            self._variant_entry(variant, playlists[variant["name"]])
+            for variant in self.variants
+        ]
 
         # Generate master playlist
         master_playlist = self._generate_master_playlist(output_dir, variant_playlists)
 
         # Count segments
-        segment_count = len(list(output_dir.glob("*.ts")))
+        segments = list(output_dir.glob("*.ts"))
+
+        # Recorded with the job result for size/speed analysis
+        encoding = {
+            **policy.to_dict(),
+            **encoding,
+            "encode_seconds": round(time.monotonic() - started, 2),
+            "output_bytes": sum(p.stat().st_size for p in segments),
+        }
+
+        # Never cache placeholder output from a failed encode
+        if cache_key and all(
+            any(output_dir.glob(f"{v['name']}_*.ts")) for v in self.variants
+        ):
+            files = [
+                str(p.relative_to(work_dir))
+                for directory in (output_dir, images_dir)
+                for p in sorted(directory.iterdir())
+                if p.is_file()
+            ]
+            self.cache.store(cache_key, policy.tier, work_dir, files, {
+                "variants": [
+                    {**v, "playlist": v["playlist"].name} for v in variant_playlists
+                ],
+                "segment_count": len(segments),
+                "encoding": encoding,
+                "thumbnail": thumbnail_path.name if thumbnail_path else None,
+            })
 
         return HLSResult(
             output_dir=output_dir,
             master_playlist=master_playlist,
             variants=variant_playlists,
-            segment_count=segment_count,
+            segment_count=len(segments),
+            encoding=encoding,
+            thumbnail_path=thumbnail_path,
+            images_dir=images_dir,
+        )
+
+    def encoding_config(self) -> dict:
+        """
+        What determines transcode output, for cache keying.
+
+        The preset/CRF tier is left out; the cache matches it separately so
+        a better-quality entry can serve a request made under load.
+        """
+        return {
+            "version": ENCODER_VERSION,
+            "variants": self.variants,
+            "segment_duration": self.segment_duration,
+            "audio": {"codec": "aac", "bitrate": "128k"},
+        }
+
+    def _publish_preview(
+        self,
+        output_dir: Path,
+        variant: dict,
+        playlist: Path,
+        on_preview: Callable[["HLSResult"], None],
+    ) -> None:
+        """Hand a single-rendition master playlist to the preview callback."""
+        segments = list(output_dir.glob(f"{variant['name']}_*.ts"))
+        if not segments:
+            logger.warning("Preview rendition failed, skipping early publish")
+            return
+        entry = self._variant_entry(variant, playlist)
+        on_preview(HLSResult(
+            output_dir=output_dir,
+            master_playlist=self._generate_master_playlist(output_dir, [entry]),
+            variants=[entry],
+            segment_count=len(segments),
+        ))
+
+    @staticmethod
+    def _variant_entry(variant: dict, playlist: Path) -> dict:
+        return {
+            "name": variant["name"],
+            "playlist": playlist,
+            "bandwidth": int(variant["bitrate"].replace("k", "000")),
+            "resolution": f"{variant['width']}x{variant['height']}",
+        }
+
+    def _largest_variant(self) -> dict:
+        return max(self.variants, key=lambda v: v["width"] * v["height"])
+
+    def _result_from_cache(self, work_dir: Path, manifest: dict) -> HLSResult:
+        """Build an HLSResult for output restored from the transcode cache."""
+        output_dir = work_dir / "hls"
+        variants = [
+            {**v, "playlist": output_dir / v["playlist"]} for v in manifest["variants"]
+        ]
+        thumbnail = manifest.get("thumbnail")
+        return HLSResult(
+            output_dir=output_dir,
+            master_playlist=output_dir / "master.m3u8",
+            variants=variants,
+            segment_count=manifest["segment_count"],
+            encoding={**manifest["encoding"], "cache_hit": True},
+            thumbnail_path=work_dir / "images" / thumbnail if thumbnail else None,
+            images_dir=work_dir / "images",
         )
 
     def _generate_variant(
@@ -74,18 +280,29 @@ class HLSBuilder:
         video_path: Path,
         output_dir: Path,
         variant: dict,
+        budget: ThreadBudget,
+        policy: EncodingPolicy,
+        duration: float | None = None,
+        progress: ThrottledProgress | None = None,
+        extra_outputs: list[str] | None = None,
     ) -> Path:
-        """Generate a single variant playlist."""
+        """
+        Generate a single variant playlist.
+
+        ``extra_outputs`` are appended as additional ffmpeg outputs, so they
+        share this encode's decode of the source.
+        """
         variant_name = variant["name"]
         playlist_path = output_dir / f"{variant_name}.m3u8"
 
         # FFmpeg command for HLS transcoding
         cmd = [
-            "ffmpeg",
+            "ffmpeg", "-y",
             "-i", str(video_path),
             "-c:v", "libx264",
-            "-preset", "fast",
-            "-b:v", variant["bitrate"],
+            "-preset", policy.preset,
+            *budget.ffmpeg_args(),
+            "-crf", str(policy.crf),
             "-maxrate", variant["bitrate"],
             "-bufsize", f"{int(variant['bitrate'].replace('k', '')) * 2}k",
             "-vf", f"scale={variant['width']}:{variant['height']}",
@@ -96,12 +313,22 @@ class HLSBuilder:
             "-hls_segment_filename", str(output_dir / f"{variant_name}_%03d.ts"),
             "-f", "hls",
             str(playlist_path),
+            *(extra_outputs or []),
         ]
 
+        on_progress = None
+        if progress:
+            def on_progress(p: FFmpegProgress) -> None:
+                progress.update(p.fraction(duration), key=variant_name)
+
         try:
-            subprocess.run(cmd, check=True, capture_output=True)
+            self.scheduler.run(cmd, budget, on_progress=on_progress, operation="hls")
+        except FFmpegStalledError:
+            raise  # killed mid-encode; the job must retry, never publish
         except subprocess.CalledProcessError as e:
-            logger.error("FFmpeg failed", error=e.stderr.decode())
+            logger.error("FFmpeg failed", variant=variant_name, error=e.stderr.decode())
+            if not settings.hls_placeholder_on_failure:
+                raise HLSEncodeError(f"ffmpeg failed encoding the {variant_name} rendition") from e
             # Create placeholder for development
             self._create_placeholder_playlist(playlist_path, variant_name)
 
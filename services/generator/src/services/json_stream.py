@@ -0,0 +1,72 @@
+"""
+JSON Stream - Incremental parsing of a streamed JSON object.
+
+Chat completions stream a JSON object a few characters at a time. This
+parser scans the text as it arrives and decodes each top-level member as
+soon as its value is complete, so callers can act on early fields while
+later ones are still being generated.
+"""
+
+from typing import Any
+import json
+
+
+class StreamingJSONObject:
+    """Collects the top-level fields of a JSON object from streamed text."""
+
+    def __init__(self):
+        self.text = ""
+        self.fields: dict[str, Any] = {}
+        self.closed = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._member_start: int | None = None
+
+    def feed(self, chunk: str) -> list[str]:
+        """
+        Add streamed text.
+
+        Returns:
+            Keys whose values were completed by this chunk, in order
+        """
+        self.text += chunk
+        completed = []
+        while self._pos < len(self.text) and not self.closed:
+            char = self.text[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start = self._pos + 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed += self._close_member()
+                    self.closed = True
+            elif char == "," and self._depth == 1:
+                completed += self._close_member()
+                self._member_start = self._pos + 1
+            self._pos += 1
+        return completed
+
+    def _close_member(self) -> list[str]:
+        """Decode the member that ends at the current position."""
+        member = self.text[self._member_start:self._pos].strip()
+        if not member:
+            return []
+        try:
+            decoded = json.loads("{" + member + "}")
+        except json.JSONDecodeError:
+            return []  # left for the final parse to report
+        self.fields.update(decoded)
+        return list(decoded)
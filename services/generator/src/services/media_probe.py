@@ -0,0 +1,121 @@
+"""
+Media Probe - One ffprobe pass for all stream metadata of a video.
+
+Reads format, stream and packet headers (demux only, no decode), giving real
+dimensions, codecs, frame rate, bitrate and keyframe positions in a single
+process spawn. Downstream stages reuse the resulting MediaInfo instead of
+probing the file again.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+import json
+import subprocess
+import structlog
+
+logger = structlog.get_logger()
+
+
+class MediaProbeError(Exception):
+    """Error while probing a media file."""
+    pass
+
+
+@dataclass
+class MediaInfo:
+    """Stream metadata of a media file."""
+    duration: float
+    width: int
+    height: int
+    video_codec: str
+    fps: float
+    bitrate: int  # bits per second, whole file
+    audio_codec: str | None = None
+    keyframes: list[float] = field(default_factory=list)  # seconds
+    video_stream: dict = field(default_factory=dict)  # raw ffprobe stream entries
+    audio_stream: dict | None = None
+
+    @property
+    def has_audio(self) -> bool:
+        return self.audio_stream is not None
+
+    def to_dict(self) -> dict:
+        """Summary suitable for job results and logs."""
+        return {
+            "duration": self.duration,
+            "width": self.width,
+            "height": self.height,
+            "video_codec": self.video_codec,
+            "audio_codec": self.audio_codec,
+            "fps": self.fps,
+            "bitrate": self.bitrate,
+            "keyframe_count": len(self.keyframes),
+        }
+
+
+def _rate(value: str | None) -> float:
+    """Parse an ffprobe rational such as '24000/1001'."""
+    if not value or value == "0/0":
+        return 0.0
+    num, _, den = value.partition("/")
+    try:
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def probe_media(source: str | Path, keyframes: bool = True) -> MediaInfo:
+    """
+    Probe a local file or URL.
+
+    Args:
+        source: Path or URL of the media
+        keyframes: Also read packet headers to locate video keyframes
+
+    Returns:
+        MediaInfo for the first video and audio streams
+    """
+    entries = (
+        "format=duration,bit_rate"
+        ":stream=index,codec_type,codec_name,profile,width,height,pix_fmt,"
+        "r_frame_rate,avg_frame_rate,sample_rate,channels"
+    )
+    if keyframes:
+        entries += ":packet=stream_index,pts_time,flags"
+
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", entries, "-of", "json", str(source)],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise MediaProbeError(f"ffprobe failed: {result.stderr.strip()}")
+
+    data = json.loads(result.stdout)
+    streams = data.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    if video is None:
+        raise MediaProbeError(f"No video stream in {source}")
+
+    fmt = data.get("format", {})
+    keyframe_times = [
+        float(p["pts_time"])
+        for p in data.get("packets", [])
+        if p.get("stream_index") == video.get("index")
+        and "K" in p.get("flags", "")
+        and p.get("pts_time") not in (None, "N/A")
+    ]
+
+    return MediaInfo(
+        duration=float(fmt.get("duration") or 0.0),
+        width=int(video.get("width") or 0),
+        height=int(video.get("height") or 0),
+        video_codec=video.get("codec_name", ""),
+        fps=round(_rate(video.get("avg_frame_rate")) or _rate(video.get("r_frame_rate")), 3),
+        bitrate=int(fmt.get("bit_rate") or 0),
+        audio_codec=audio.get("codec_name") if audio else None,
+        keyframes=sorted(keyframe_times),
+        video_stream=video,
+        audio_stream=audio,
+    )
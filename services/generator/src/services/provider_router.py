@@ -0,0 +1,333 @@
+"""
+Provider Router - Chooses, falls back between and hedges video providers.
+
+Providers are listed in preference order (best quality first, faster tiers
+after). Each request's latency and outcome is recorded in a per-provider
+rolling window in Redis, shared by all workers; samples older than the
+maximum age are ignored. A provider whose p95 latency exceeds the SLO, or
+whose error rate is too high, is skipped in favour of the next tier, except
+for a small share of probe requests that keep its statistics current.
+Failed requests fall through to the next provider, and with hedging enabled
+a duplicate request is sent to the next tier once the first has run past
+the hedge deadline; whichever finishes first wins. Providers whose circuit
+breaker is open are skipped without a request; when all of them are open
+the router raises CircuitOpenError so the job can be parked. A caller's
+cancel event abandons every request still running.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+import json
+import random
+import threading
+import time
+import redis
+import structlog
+
+from src.config import get_settings
+from src.metrics import PROVIDER_HEDGES, PROVIDER_LATENCY, PROVIDER_REQUESTS
+from src.services.circuit_breaker import CircuitOpenError, get_breaker, require_any
+from src.services.video_providers import (
+    GenerationCancelled,
+    GenerationOutput,
+    ProviderError,
+    VideoProvider,
+    VideoRequest,
+)
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+MIN_SAMPLES = 5  # below this a provider is assumed healthy
+CANCEL_POLL_SECONDS = 1.0  # how often a running attempt checks the caller's cancel
+
+
+@dataclass
+class ProviderHealth:
+    """Rolling statistics of one provider."""
+    provider: str
+    samples: int
+    p95_seconds: float | None
+    error_rate: float
+
+    def healthy(self, slo_seconds: float, max_error_rate: float) -> bool:
+        if self.samples < MIN_SAMPLES:
+            return True
+        if self.error_rate > max_error_rate:
+            return False
+        return self.p95_seconds is None or self.p95_seconds <= slo_seconds
+
+
+class ProviderStats:
+    """Per-provider rolling window of (time, latency, ok) samples in Redis."""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        window: int | None = None,
+        max_age: float | None = None,
+    ):
+        self.redis = redis_client
+        self.window = window or settings.provider_stats_window
+        self.max_age = max_age or settings.provider_stats_max_age_seconds
+
+    def record(self, provider: str, seconds: float, ok: bool, abandoned: bool = False) -> None:
+        """
+        Add a sample to the provider's window.
+
+        An abandoned request (a hedged primary that lost) is recorded as a
+        success with its elapsed time, a lower bound on its latency, so a
+        provider that is always hedged around still shows up as slow.
+        """
+        key = self._key(provider)
+        pipe = self.redis.pipeline()
+        pipe.lpush(key, json.dumps([round(time.time(), 1), round(seconds, 2), ok]))
+        pipe.ltrim(key, 0, self.window - 1)
+        pipe.expire(key, int(self.max_age))
+        pipe.execute()
+        PROVIDER_LATENCY.labels(provider=provider).observe(seconds)
+        outcome = "cancelled" if abandoned else "success" if ok else "error"
+        PROVIDER_REQUESTS.labels(provider=provider, outcome=outcome).inc()
+
+    def health(self, provider: str) -> ProviderHealth:
+        cutoff = time.time() - self.max_age
+        samples = [
+            (seconds, ok)
+            for at, seconds, ok in (
+                json.loads(raw) for raw in self.redis.lrange(self._key(provider), 0, -1)
+            )
+            if at >= cutoff
+        ]
+        latencies = sorted(seconds for seconds, ok in samples if ok)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None
+        errors = sum(1 for _, ok in samples if not ok)
+        return ProviderHealth(
+            provider=provider,
+            samples=len(samples),
+            p95_seconds=p95,
+            error_rate=errors / len(samples) if samples else 0.0,
+        )
+
+    @staticmethod
+    def _key(provider: str) -> str:
+        return f"provider-stats:v2:{provider}"  # v1 samples had no timestamp
+
+
+class ProviderRouter:
+    """Routes generation requests across providers by health."""
+
+    def __init__(
+        self,
+        providers: list[VideoProvider],
+        stats: ProviderStats,
+        slo_seconds: float | None = None,
+        max_error_rate: float | None = None,
+        hedge_after: float | None = None,
+        probe_rate: float | None = None,
+    ):
+        if not providers:
+            raise ValueError("ProviderRouter needs at least one provider")
+        self.providers = providers
+        self.breakers = {p.name: get_breaker(p.name) for p in providers}
+        self.stats = stats
+        self.slo_seconds = slo_seconds or settings.provider_latency_slo_seconds
+        self.max_error_rate = (
+            max_error_rate if max_error_rate is not None else settings.provider_max_error_rate
+        )
+        self.hedge_after = (
+            hedge_after if hedge_after is not None else settings.provider_hedge_after_seconds
+        )
+        self.probe_rate = probe_rate if probe_rate is not None else settings.provider_probe_rate
+
+    def ranked(self) -> list[VideoProvider]:
+        """
+        Healthy providers in preference order, then unhealthy ones by p95.
+
+        With probability ``probe_rate`` a random unhealthy provider is moved
+        to the front instead, so it gets fresh samples and can recover; the
+        healthy ones remain as fallbacks.
+        """
+        health = {p.name: self.stats.health(p.name) for p in self.providers}
+        healthy = [
+            p for p in self.providers
+            if health[p.name].healthy(self.slo_seconds, self.max_error_rate)
+        ]
+        degraded = sorted(
+            (p for p in self.providers if p not in healthy),
+            key=lambda p: (health[p.name].error_rate, health[p.name].p95_seconds or 0),
+        )
+        if degraded:
+            logger.info(
+                "Providers outside SLO",
+                providers=[p.name for p in degraded],
+                slo_seconds=self.slo_seconds,
+            )
+            if random.random() < self.probe_rate:
+                probe = random.choice(degraded)
+                logger.info("Probing provider outside SLO", provider=probe.name)
+                return [probe] + healthy + [p for p in degraded if p is not probe]
+        return healthy + degraded
+
+    def generate(
+        self,
+        request: VideoRequest,
+        video_path: Path,
+        cancel: threading.Event | None = None,
+    ) -> GenerationOutput:
+        """
+        Render a clip with the best available provider.
+
+        Args:
+            request: What to render
+            video_path: File to write the clip to
+            cancel: Set by the caller to abandon the generation; running
+                requests stop at their next poll and are waited for
+
+        Raises:
+            CircuitOpenError: Every provider's circuit is open
+            GenerationCancelled: ``cancel`` was set
+            ProviderError: Every provider failed
+        """
+        cancel = cancel or threading.Event()
+        require_any(list(self.breakers.values()))
+        candidates = self.ranked()
+        tried: set[str] = set()
+        errors = []
+        while candidates:
+            if cancel.is_set():
+                raise GenerationCancelled("Video generation cancelled")
+            primary = candidates.pop(0)
+            if primary.name in tried:
+                continue
+            if not self.breakers[primary.name].allows():
+                logger.info("Skipping provider with open circuit", provider=primary.name)
+                continue
+            candidates = [p for p in candidates if self.breakers[p.name].allows()]
+            hedge = candidates[0] if candidates and self.hedge_after > 0 else None
+            try:
+                return self._attempt(primary, hedge, request, video_path, tried, cancel)
+            except GenerationCancelled:
+                raise
+            except ProviderError as e:
+                errors.append(str(e))
+                logger.warning("Provider failed, falling back", provider=primary.name, error=str(e))
+        # Circuits may have opened while we were trying
+        require_any(list(self.breakers.values()))
+        raise ProviderError(f"All video providers failed: {'; '.join(errors)}")
+
+    def _attempt(
+        self,
+        primary: VideoProvider,
+        hedge: VideoProvider | None,
+        request: VideoRequest,
+        video_path: Path,
+        tried: set[str],
+        job_cancel: threading.Event,
+    ) -> GenerationOutput:
+        """Run primary; start hedge after the deadline; first success wins."""
+        cancel = {primary.name: threading.Event()}
+        tried.add(primary.name)
+        # Not a context manager: returning must not wait for the abandoned request
+        pool = ThreadPoolExecutor(max_workers=2)
+        # Each request writes its own file, so an abandoned one finishing a
+        # download cannot overwrite the winner
+        paths = {
+            name: video_path.with_name(f"{video_path.stem}_{role}{video_path.suffix}")
+            for name, role in [(primary.name, "primary"), (hedge.name if hedge else "", "hedge")]
+        }
+        try:
+            futures: dict[Future, VideoProvider] = {
+                pool.submit(
+                    self._run, primary, request, paths[primary.name], cancel[primary.name],
+                    job_cancel, True,
+                ): primary,
+            }
+            hedge_at = time.monotonic() + self.hedge_after if hedge else None
+
+            error = None
+            pending = set(futures)
+            while pending:
+                timeout = CANCEL_POLL_SECONDS
+                if hedge_at is not None:
+                    timeout = min(timeout, max(0.0, hedge_at - time.monotonic()))
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if job_cancel.is_set():
+                    for event in cancel.values():
+                        event.set()
+                    # The requests write into the caller's directory; let them stop first
+                    wait(futures)
+                    raise GenerationCancelled("Video generation cancelled")
+                for future in done:
+                    try:
+                        output = future.result()
+                    except ProviderError as e:
+                        error = e
+                        continue
+                    for event in cancel.values():
+                        event.set()  # abandon the other request
+                    output.video_path.replace(video_path)
+                    output.video_path = video_path
+                    return output
+                if pending and hedge_at is not None and time.monotonic() >= hedge_at:
+                    hedge_at = None
+                    PROVIDER_HEDGES.labels(provider=hedge.name).inc()
+                    logger.info("Hedging slow request", primary=primary.name, hedge=hedge.name)
+                    cancel[hedge.name] = threading.Event()
+                    tried.add(hedge.name)
+                    future = pool.submit(
+                        self._run, hedge, request, paths[hedge.name], cancel[hedge.name],
+                        job_cancel,
+                    )
+                    futures[future] = hedge
+                    pending.add(future)
+            raise error or ProviderError(f"{primary.name} produced no output")
+        finally:
+            pool.shutdown(wait=False)
+
+    def _run(
+        self,
+        provider: VideoProvider,
+        request: VideoRequest,
+        video_path: Path,
+        cancel: threading.Event,
+        job_cancel: threading.Event,
+        record_abandoned: bool = False,
+    ) -> GenerationOutput:
+        """
+        One provider request, recorded with its breaker and stats.
+
+        ``record_abandoned`` is set for a hedged primary: if the hedge wins,
+        the time it had already taken still counts towards its latency.
+        Requests abandoned because the caller cancelled are not recorded.
+        """
+        breaker = self.breakers[provider.name]
+        try:
+            breaker.before_call()
+        except CircuitOpenError as e:
+            raise ProviderError(str(e)) from e
+
+        started = time.monotonic()
+        try:
+            output = provider.generate(request, video_path, cancel)
+        except GenerationCancelled:
+            breaker.release()
+            if record_abandoned and not job_cancel.is_set():
+                self.stats.record(
+                    provider.name, time.monotonic() - started, ok=True, abandoned=True
+                )
+            else:
+                PROVIDER_REQUESTS.labels(provider=provider.name, outcome="cancelled").inc()
+            raise
+        except Exception as e:
+            if provider.is_outage(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            self.stats.record(provider.name, time.monotonic() - started, ok=False)
+            if isinstance(e, ProviderError):
+                raise
+            raise ProviderError(f"{provider.name}: {e}") from e
+        breaker.record_success()
+        self.stats.record(provider.name, time.monotonic() - started, ok=True)
+        return output
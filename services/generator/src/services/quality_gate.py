@@ -0,0 +1,200 @@
+"""
+Quality Gate - Rejects black, frozen or flickering clips before publishing.
+
+ffmpeg decodes a small grayscale rawvideo stream which is read in fixed-size
+chunks into NumPy arrays, so memory stays bounded regardless of clip length.
+Per-frame statistics are computed vectorized over each chunk:
+
+- black frames: mean luma below a threshold
+- frozen runs: consecutive frames with almost no pixel change
+- flicker: large global luminance jumps without structural change
+- scene cuts: large structural change between frames
+
+The same statistics pick the best thumbnail frame instead of frame 0.
+"""
+
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+import subprocess
+import numpy as np
+import structlog
+
+from src.config import get_settings
+from src.services.media_probe import MediaInfo
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+CHUNK_FRAMES = 64
+
+
+@dataclass
+class QualityReport:
+    """Frame-quality scores for a clip."""
+    frames: int
+    black_ratio: float
+    longest_freeze_seconds: float
+    flicker_ratio: float
+    scene_cuts: int
+    best_frame_time: float
+    failures: list[str] = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        return not self.failures
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "passed": self.passed}
+
+
+class QualityGateError(Exception):
+    """A generated clip failed the quality gate."""
+
+    def __init__(self, report: QualityReport):
+        super().__init__(f"Video failed quality gate: {', '.join(report.failures)}")
+        self.report = report
+
+
+class FrameQualityAnalyzer:
+    """Scores decoded frames of a clip against configurable thresholds."""
+
+    def __init__(self):
+        self.width = settings.quality_analysis_width
+        self.black_luma = settings.quality_black_luma
+        self.freeze_delta = settings.quality_freeze_delta
+        self.flicker_delta = settings.quality_flicker_delta
+        self.cut_delta = settings.quality_cut_delta
+        self.max_black_ratio = settings.quality_max_black_ratio
+        self.max_freeze_seconds = settings.quality_max_freeze_seconds
+        self.max_flicker_ratio = settings.quality_max_flicker_ratio
+
+    def analyze(self, video_path: Path, media: MediaInfo | None = None) -> QualityReport:
+        """
+        Decode a downscaled luma stream and score it.
+
+        Args:
+            video_path: Clip to analyze
+            media: Probe of the clip, for aspect ratio and frame rate
+
+        Returns:
+            QualityReport; ``failures`` lists every threshold exceeded
+        """
+        width = self.width
+        height = 36
+        if media and media.width and media.height:
+            height = max(2, round(width * media.height / media.width / 2) * 2)
+        fps = media.fps if media and media.fps else 24.0
+        frame_bytes = width * height
+
+        process = subprocess.Popen(
+            [
+                "ffmpeg", "-v", "error",
+                "-i", str(video_path),
+                "-vf", f"scale={width}:{height}:flags=area,format=gray",
+                "-f", "rawvideo",
+                "pipe:1",
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+        means: list[np.ndarray] = []
+        diffs: list[np.ndarray] = []  # mean absolute change vs. previous frame
+        shifts: list[np.ndarray] = []  # mean signed change (global brightness)
+        detail: list[np.ndarray] = []  # per-frame gradient energy, for thumbnails
+        previous: np.ndarray | None = None
+
+        try:
+            while True:
+                data = process.stdout.read(frame_bytes * CHUNK_FRAMES)
+                count = len(data) // frame_bytes
+                if count == 0:
+                    break
+                frames = np.frombuffer(data[:count * frame_bytes], dtype=np.uint8)
+                frames = frames.reshape(count, height, width).astype(np.float32)
+
+                means.append(frames.mean(axis=(1, 2)))
+                detail.append(
+                    np.abs(np.diff(frames, axis=2)).mean(axis=(1, 2))
+                    + np.abs(np.diff(frames, axis=1)).mean(axis=(1, 2))
+                )
+
+                stacked = frames if previous is None else np.concatenate([previous, frames])
+                delta = stacked[1:] - stacked[:-1]
+                diffs.append(np.abs(delta).mean(axis=(1, 2)))
+                shifts.append(delta.mean(axis=(1, 2)))
+                previous = frames[-1:]
+        finally:
+            process.stdout.close()
+            process.wait()
+
+        if process.returncode != 0 or not means:
+            logger.warning("Quality analysis could not decode video", path=str(video_path))
+            return QualityReport(0, 0.0, 0.0, 0.0, 0, 0.0, failures=["undecodable"])
+
+        return self._score(
+            np.concatenate(means),
+            np.concatenate(diffs),
+            np.concatenate(shifts),
+            np.concatenate(detail),
+            fps,
+        )
+
+    def _score(
+        self,
+        means: np.ndarray,
+        diffs: np.ndarray,
+        shifts: np.ndarray,
+        detail: np.ndarray,
+        fps: float,
+    ) -> QualityReport:
+        frame_count = len(means)
+        black = means < self.black_luma
+        black_ratio = float(black.mean())
+
+        # Change not explained by a global brightness shift is structural
+        structural = np.clip(diffs - np.abs(shifts), 0, None)
+        cuts = structural > self.cut_delta
+        flicker = (np.abs(shifts) > self.flicker_delta) & ~cuts
+        flicker_ratio = float(flicker.mean()) if len(flicker) else 0.0
+
+        frozen = diffs < self.freeze_delta
+        longest_freeze = self._longest_run(frozen) / fps
+
+        # Best thumbnail: most detail, not black, not adjacent to a cut
+        score = detail.copy()
+        score[black] = -1
+        near_cut = np.zeros(frame_count, dtype=bool)
+        cut_frames = np.flatnonzero(cuts) + 1
+        for offset in (-1, 0, 1):
+            near_cut[np.clip(cut_frames + offset, 0, frame_count - 1)] = True
+        score[near_cut] = -1
+        best_frame = int(np.argmax(score))
+
+        failures = []
+        if black_ratio > self.max_black_ratio:
+            failures.append("black")
+        if longest_freeze > self.max_freeze_seconds:
+            failures.append("frozen")
+        if flicker_ratio > self.max_flicker_ratio:
+            failures.append("flicker")
+
+        return QualityReport(
+            frames=frame_count,
+            black_ratio=round(black_ratio, 4),
+            longest_freeze_seconds=round(longest_freeze, 3),
+            flicker_ratio=round(flicker_ratio, 4),
+            scene_cuts=int(cuts.sum()),
+            best_frame_time=round(best_frame / fps, 3),
+            failures=failures,
+        )
+
+    @staticmethod
+    def _longest_run(mask: np.ndarray) -> int:
+        """Length of the longest run of True values."""
+        if not mask.any():
+            return 0
+        padded = np.concatenate([[False], mask, [False]]).astype(np.int8)
+        edges = np.flatnonzero(np.diff(padded))
+        return int((edges[1::2] - edges[::2]).max())
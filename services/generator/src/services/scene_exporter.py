@@ -0,0 +1,260 @@
+"""
+Scene Exporter - Compiles completed segments into a single downloadable MP4.
+
+Segments are joined with ffmpeg's concat demuxer using stream copy whenever
+every input shares the same codec parameters, so an export costs little more
+than the bytes it moves. Mismatched inputs fall back to a single normalizing
+encode. Inputs are read straight from S3 through signed URLs instead of being
+staged on local disk first.
+
+Exports are incremental: a manifest next to the export records which segments
+it contains, so appending segment N+1 only concatenates the previous export
+with the new segment.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+import hashlib
+import subprocess
+import structlog
+
+from src.services.ffmpeg_progress import concat_quote, run_ffmpeg
+from src.services.media_probe import MediaInfo, probe_media
+from src.services.storage import StorageService
+from src.services.workspace import WorkspaceManager
+
+logger = structlog.get_logger()
+
+# Protocols the concat demuxer may open when its entries are signed S3 URLs
+CONCAT_PROTOCOLS = "file,http,https,tcp,tls,crypto"
+
+
+@dataclass
+class ExportResult:
+    """Result of a scene export."""
+    export_url: str
+    export_key: str
+    segment_ids: list[str]
+    duration: float
+    mode: str  # unchanged, append, copy, normalize
+
+
+class SceneExportError(Exception):
+    """Error during scene export."""
+    pass
+
+
+class SceneExporter:
+    """Builds a full-scene MP4 from the source videos of completed segments."""
+
+    def __init__(self, storage: StorageService | None = None):
+        self.storage = storage or StorageService()
+        self.workspaces = WorkspaceManager()
+        self.url_expiration = 3600  # seconds
+
+    def export(self, scene_id: str, segments: list[dict]) -> ExportResult:
+        """
+        Export a scene as a single MP4.
+
+        Args:
+            scene_id: Scene ID
+            segments: Completed segments in playback order
+
+        Returns:
+            ExportResult describing the uploaded export
+        """
+        if not segments:
+            raise SceneExportError(f"Scene {scene_id} has no completed segments")
+
+        segment_ids = [s["id"] for s in segments]
+        manifest_key = f"scenes/{scene_id}/export/manifest.json"
+        manifest = self.storage.get_json(manifest_key)
+
+        if manifest and manifest.get("segment_ids") == segment_ids:
+            logger.info("Scene export is up to date", scene_id=scene_id)
+            return self._result_from_manifest(manifest, "unchanged")
+
+        urls = {
+            segment_id: self.storage.get_signed_url(
+                self.storage.segment_source_key(scene_id, segment_id),
+                self.url_expiration,
+            )
+            for segment_id in segment_ids
+        }
+        probes = {
+            segment_id: probe_media(urls[segment_id], keyframes=False)
+            for segment_id in segment_ids
+        }
+        signatures = [self._signature(probes[segment_id]) for segment_id in segment_ids]
+
+        workspace = self.workspaces.create(f"export-{scene_id}")
+        work_dir = workspace.path
+        output_path = work_dir / "full.mp4"
+
+        try:
+            if self._can_append(manifest, segment_ids, signatures):
+                previous_ids = manifest["segment_ids"]
+                inputs = [self.storage.get_signed_url(manifest["export_key"], self.url_expiration)]
+                inputs.extend(urls[segment_id] for segment_id in segment_ids[len(previous_ids):])
+                self._concat_copy(inputs, output_path, work_dir)
+                mode = "append"
+            elif all(signature == signatures[0] for signature in signatures):
+                self._concat_copy([urls[s] for s in segment_ids], output_path, work_dir)
+                mode = "copy"
+            else:
+                self._concat_normalize(
+                    [urls[s] for s in segment_ids],
+                    [probes[s] for s in segment_ids],
+                    output_path,
+                )
+                mode = "normalize"
+
+            output_probe = probe_media(output_path, keyframes=False)
+            digest = hashlib.sha256("\n".join(segment_ids).encode()).hexdigest()[:12]
+            export_key = f"scenes/{scene_id}/export/full_{len(segment_ids)}_{digest}.mp4"
+            export_url = self.storage.upload_file(output_path, export_key)
+        finally:
+            self.workspaces.release(workspace)
+
+        new_manifest = {
+            "scene_id": scene_id,
+            "segment_ids": segment_ids,
+            "export_key": export_key,
+            "export_url": export_url,
+            "duration": output_probe.duration,
+            "signature": self._signature(output_probe),
+            "mode": mode,
+        }
+        self.storage.put_json(manifest_key, new_manifest)
+
+        # Export objects are immutable; drop the one this export supersedes
+        if manifest and manifest.get("export_key") != export_key:
+            self.storage.delete_object(manifest["export_key"])
+
+        logger.info(
+            "Scene exported",
+            scene_id=scene_id,
+            segments=len(segment_ids),
+            mode=mode,
+            duration=new_manifest["duration"],
+        )
+        return self._result_from_manifest(new_manifest, mode)
+
+    def _can_append(
+        self,
+        manifest: dict | None,
+        segment_ids: list[str],
+        signatures: list[dict],
+    ) -> bool:
+        """Check whether the previous export can be extended by stream copy."""
+        if not manifest:
+            return False
+        previous_ids = manifest.get("segment_ids", [])
+        if not previous_ids or segment_ids[:len(previous_ids)] != previous_ids:
+            return False
+        if len(previous_ids) == len(segment_ids):
+            return False
+        new_signatures = signatures[len(previous_ids):]
+        return all(signature == manifest.get("signature") for signature in new_signatures)
+
+    def _concat_copy(self, inputs: list[str], output_path: Path, work_dir: Path) -> None:
+        """Join inputs with the concat demuxer without re-encoding."""
+        list_path = work_dir / "concat.txt"
+        list_path.write_text("".join(f"file {concat_quote(url)}\n" for url in inputs))
+
+        cmd = [
+            "ffmpeg", "-y",
+            "-f", "concat",
+            "-safe", "0",
+            "-protocol_whitelist", CONCAT_PROTOCOLS,
+            "-i", str(list_path),
+            "-c", "copy",
+            "-movflags", "+faststart",
+            str(output_path),
+        ]
+        self._run(cmd)
+
+    def _concat_normalize(
+        self,
+        inputs: list[str],
+        probes: list[MediaInfo],
+        output_path: Path,
+    ) -> None:
+        """Join inputs with differing parameters in a single normalizing encode."""
+        width, height = probes[0].width, probes[0].height
+        fps = probes[0].video_stream.get("r_frame_rate") or "24/1"
+
+        cmd = ["ffmpeg", "-y"]
+        for url in inputs:
+            cmd += ["-i", url]
+
+        # Segments without audio get a silent track so concat sees uniform streams
+        silent_inputs = []
+        silent_count = 0
+        filters = []
+        concat_pads = ""
+        for index, probe in enumerate(probes):
+            filters.append(
+                f"[{index}:v:0]scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={fps},"
+                f"format=yuv420p[v{index}]"
+            )
+            if probe.has_audio:
+                filters.append(
+                    f"[{index}:a:0]aresample=48000,aformat=channel_layouts=stereo[a{index}]"
+                )
+            else:
+                silent_index = len(inputs) + silent_count
+                silent_count += 1
+                silent_inputs += [
+                    "-f", "lavfi",
+                    "-t", f"{probe.duration:.3f}",
+                    "-i", "anullsrc=r=48000:cl=stereo",
+                ]
+                filters.append(f"[{silent_index}:a]anull[a{index}]")
+            concat_pads += f"[v{index}][a{index}]"
+
+        filters.append(f"{concat_pads}concat=n={len(inputs)}:v=1:a=1[v][a]")
+
+        cmd += silent_inputs
+        cmd += [
+            "-filter_complex", ";".join(filters),
+            "-map", "[v]",
+            "-map", "[a]",
+            "-c:v", "libx264",
+            "-preset", "fast",
+            "-crf", "20",
+            "-c:a", "aac",
+            "-b:a", "128k",
+            "-movflags", "+faststart",
+            str(output_path),
+        ]
+        self._run(cmd)
+
+    def _signature(self, media: MediaInfo) -> dict:
+        """Codec parameters that must match for stream-copy concatenation."""
+        video_keys = ("codec_name", "profile", "width", "height", "pix_fmt", "r_frame_rate")
+        audio_keys = ("codec_name", "sample_rate", "channels")
+        audio = media.audio_stream
+        return {
+            "video": {key: media.video_stream.get(key) for key in video_keys},
+            "audio": {key: audio.get(key) for key in audio_keys} if audio else None,
+        }
+
+    def _run(self, cmd: list[str]) -> None:
+        """Run ffmpeg, raising SceneExportError on failure."""
+        try:
+            run_ffmpeg(cmd, operation="export")
+        except subprocess.CalledProcessError as e:
+            logger.error("FFmpeg export failed", error=e.stderr.decode())
+            raise SceneExportError("ffmpeg failed while exporting scene")
+
+    @staticmethod
+    def _result_from_manifest(manifest: dict, mode: str) -> ExportResult:
+        return ExportResult(
+            export_url=manifest["export_url"],
+            export_key=manifest["export_key"],
+            segment_ids=manifest["segment_ids"],
+            duration=manifest["duration"],
+            mode=mode,
+        )
@@ -0,0 +1,93 @@
+"""
+Scene Summary - Rolling digest of a scene's story so far.
+
+Instead of pasting raw scripts of earlier segments into every expansion,
+each finished segment is folded into a compact summary stored with the
+scene: the plot so far, the current state of each character and the open
+threads. Folding is incremental (previous summary + new script in, new
+summary out), so its cost does not grow with the scene, and the summary is
+held to a fixed token budget.
+"""
+
+from typing import Any
+import structlog
+
+from src.config import get_settings
+from src.services.circuit_breaker import get_breaker
+from src.services.clients import openai_client
+from src.services.script_expander import OPENAI_OUTAGES
+from src.services.token_budget import estimate_tokens, truncate_tail_to_tokens, truncate_to_tokens
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+SUMMARY_PROMPT = """You maintain the running summary of a serialized video story.
+
+You are given the current summary and the script of the segment that just finished. Rewrite
+the summary so it also covers the new segment. Use exactly these sections:
+
+## Plot
+What has happened, oldest events compressed the most.
+
+## Characters
+One line per character: where they are, what they look like now, what they want.
+
+## Open Threads
+Unresolved questions, promises and set-ups later segments should pay off.
+
+Keep it under {budget} tokens. Drop details that no longer matter for continuity. Respond with
+the summary only."""
+
+
+class SceneSummarizer:
+    """Folds finished segments into a scene's rolling summary."""
+
+    def __init__(self):
+        self.client = openai_client()
+        self.model = settings.openai_model
+        self.breaker = get_breaker("openai")
+        self.budget = settings.scene_summary_max_tokens
+
+    def fold(self, summary: str | None, segment: dict[str, Any]) -> str:
+        """
+        Summary updated with one more segment.
+
+        Args:
+            summary: Current summary, or None for the first segment
+            segment: Finished segment with order_index, prompt and expanded_script
+
+        Returns:
+            The new summary, within the token budget
+        """
+        script = segment.get("expanded_script") or segment.get("prompt") or ""
+        user_message = (
+            f"## Current Summary\n{summary or '(none yet - this is the first segment)'}\n\n"
+            f"## New Segment {segment.get('order_index', '')}\n"
+            f"{truncate_tail_to_tokens(script, settings.scene_summary_script_tokens)}"
+        )
+
+        with self.breaker.guard(failures=OPENAI_OUTAGES):
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": SUMMARY_PROMPT.format(budget=self.budget)},
+                    {"role": "user", "content": user_message},
+                ],
+                temperature=0.2,
+                max_tokens=self.budget * 2,
+            )
+
+        new_summary = (response.choices[0].message.content or "").strip()
+        if not new_summary:
+            raise ValueError("Empty summary returned")
+        tokens = estimate_tokens(new_summary)
+        if tokens > self.budget:
+            logger.warning("Summary over budget, truncating", tokens=tokens, budget=self.budget)
+            new_summary = truncate_to_tokens(new_summary, self.budget)
+
+        logger.info(
+            "Scene summary updated",
+            order_index=segment.get("order_index"),
+            tokens=min(tokens, self.budget),
+        )
+        return new_summary
@@ -4,19 +4,114 @@ Script Expander - Transforms user prompts into detailed video scripts using Open
 This service takes user-submitted prompts and expands them into detailed
 video scripts that include scene descriptions, character details, camera
 directions, and visual notes suitable for video generation.
+
+In streaming mode the fields video generation needs are requested first and
+handed over as soon as they are complete, while the rest of the script is
+still being written.
+
+Prompts are laid out for provider-side prompt caching: a static instruction
+block first, then the scene bible (built once per scene and bible version),
+then the per-request context.
 """
 
-from dataclasses import dataclass
-from typing import Any
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable
 import json
+import threading
 import openai
 import structlog
 
 from src.config import get_settings
+from src.metrics import EXPANSION_TOKENS
+from src.services.circuit_breaker import get_breaker
+from src.services.clients import openai_client
+from src.services.expansion_cache import ExpansionCache
+from src.services.json_stream import StreamingJSONObject
+from src.services.token_budget import estimate_tokens, truncate_tail_to_tokens, truncate_to_tokens
 
 logger = structlog.get_logger()
 settings = get_settings()
 
+# Errors that mean OpenAI is unavailable, as opposed to rejecting the request
+OPENAI_OUTAGES = (
+    openai.APIConnectionError,  # includes timeouts
+    openai.InternalServerError,
+    openai.RateLimitError,
+)
+
+# Leading fields of the response schema; enough to plan and start the video
+EARLY_FIELDS = ("video_prompt", "duration_estimate", "camera_directions", "actions")
+
+# Instructions shared by every request. Kept byte-identical and first so the
+# provider can serve it from its prompt cache; anything that varies follows.
+SYSTEM_PROMPT = """You are an expert screenwriter and video director specializing in AI-generated video content.
+
+Your task is to transform brief story prompts into detailed, vivid scene descriptions optimized for AI video generation (Google Veo 3).
+
+## Guidelines
+
+1. **Visual Clarity**: Write descriptions that are visually specific and unambiguous
+2. **Continuity**: Maintain character appearances and settings consistent with the scene bible
+3. **Cinematic Language**: Use professional film terminology for camera directions
+4. **Duration**: Aim for 15-30 second video segments
+5. **Action Focus**: Prioritize visual action over internal thoughts
+6. **Present Tense**: Always write in present tense, active voice
+
+## Output Format
+
+You MUST respond with a valid JSON object containing these fields, in this order:
+
+{
+    "video_prompt": "Optimized 200-word prompt for video generation API",
+    "duration_estimate": 20,
+    "camera_directions": ["Opening shot type", "Mid-scene camera movement", "Closing shot"],
+    "actions": ["Action 1", "Action 2", "Action 3"],
+    "full_script": "Complete narrative script with all details",
+    "scene_description": "Detailed description of the setting, lighting, atmosphere",
+    "character_descriptions": {
+        "character_name": "Visual description for this scene"
+    },
+    "dialogue": [
+        {"character": "Name", "line": "What they say"}
+    ],
+    "visual_notes": "Special effects, transitions, visual style notes",
+    "mood_and_atmosphere": "Overall emotional tone and visual atmosphere"
+}
+
+## Video Prompt Optimization
+
+The "video_prompt" field should be a condensed, highly visual prompt optimized for AI video generation:
+- Lead with the most important visual elements
+- Include character appearances in the prompt
+- Specify lighting, color palette, and atmosphere
+- Describe motion and action clearly
+- Keep under 200 words for best results
+"""
+
+BATCH_INSTRUCTIONS = """## Batch Request
+The prompt above is {count} consecutive segments of the scene, in order. Expand every one of
+them; each segment continues directly from the one before it.
+Respond with ONLY a JSON object of the form {{"segments": [...]}} holding one object per prompt,
+in the same order, each with the fields of the output format."""
+
+SCRIPT_MAX_TOKENS = 3000  # completion budget of one expanded script
+
+# Completion-token limits of OpenAI models; the longest matching prefix wins
+MODEL_OUTPUT_TOKENS = {
+    "gpt-4-turbo": 4096,
+    "gpt-4-0125-preview": 4096,
+    "gpt-4-1106-preview": 4096,
+    "gpt-4o": 16384,
+    "gpt-4o-mini": 16384,
+    "gpt-4.1": 32768,
+}
+DEFAULT_OUTPUT_TOKENS = 4096
+
+SCENE_BLOCK_CACHE_SIZE = 256
+_scene_blocks: OrderedDict[tuple[str, Any], str] = OrderedDict()
+_scene_blocks_lock = threading.Lock()
+
 
 @dataclass
 class ExpandedScript:
@@ -32,6 +127,7 @@ class ExpandedScript:
     duration_estimate: float  # in seconds
     video_prompt: str  # optimized prompt for video generation
     raw_response: str = ""
+    usage: dict[str, int] = field(default_factory=dict)  # token counts reported by the API
 
 
 @dataclass
@@ -43,6 +139,16 @@ class PreviousSegment:
     video_url: str | None
 
 
+def max_output_tokens(model: str) -> int:
+    """Completion-token limit of a model, unless overridden in settings."""
+    if settings.openai_max_output_tokens:
+        return settings.openai_max_output_tokens
+    prefixes = [prefix for prefix in MODEL_OUTPUT_TOKENS if model.startswith(prefix)]
+    if not prefixes:
+        return DEFAULT_OUTPUT_TOKENS
+    return MODEL_OUTPUT_TOKENS[max(prefixes, key=len)]
+
+
 class ScriptExpander:
     """
     Expands user prompts into detailed video scripts using OpenAI ChatGPT.
@@ -54,9 +160,13 @@ class ScriptExpander:
     - The overall scene context
     """
 
-    def __init__(self):
-        self.client = openai.OpenAI(api_key=settings.openai_api_key)
+    def __init__(self, cache: ExpansionCache | None = None):
+        self.client = openai_client()
         self.model = settings.openai_model
+        self.max_output_tokens = max_output_tokens(self.model)
+        self.temperature = 0.7
+        self.breaker = get_breaker("openai")
+        self.cache = cache
 
     def expand(
         self,
@@ -64,6 +174,7 @@ class ScriptExpander:
         scene_context: dict[str, Any],
         scene_bible: dict[str, Any] | None = None,
         previous_segments: list[PreviousSegment] | None = None,
+        refresh: bool = False,
     ) -> ExpandedScript:
         """
         Expand a user prompt into a detailed video script.
@@ -73,6 +184,7 @@ class ScriptExpander:
             scene_context: Context about the scene (title, description, topic)
             scene_bible: Existing Scene Bible with characters, locations, timeline
             previous_segments: List of previous segments for continuity
+            refresh: Skip the expansion cache and write a new script
             
         Returns:
             ExpandedScript with all details needed for video generation
@@ -84,41 +196,31 @@ class ScriptExpander:
             num_previous=len(previous_segments) if previous_segments else 0,
         )
 
-        system_prompt = self._build_system_prompt(scene_bible)
-        user_message = self._build_user_message(
-            user_prompt, scene_context, scene_bible, previous_segments
-        )
+        messages = self._build_messages(user_prompt, scene_context, scene_bible, previous_segments)
+        cache_key = self._cache_key(messages)
+        cached = self._cached(cache_key, refresh)
+        if cached:
+            return cached
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message},
-                ],
-                temperature=0.7,
-                max_tokens=3000,
-                response_format={"type": "json_object"},
-            )
+            with self.breaker.guard(failures=OPENAI_OUTAGES):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=self.temperature,
+                    max_tokens=min(SCRIPT_MAX_TOKENS, self.max_output_tokens),
+                    response_format={"type": "json_object"},
+                )
 
             raw_response = response.choices[0].message.content or "{}"
             result = json.loads(raw_response)
             
             logger.info("Script expansion complete", result_keys=list(result.keys()))
 
-            return ExpandedScript(
-                full_script=result.get("full_script", ""),
-                scene_description=result.get("scene_description", ""),
-                character_descriptions=result.get("character_descriptions", {}),
-                actions=result.get("actions", []),
-                dialogue=result.get("dialogue", []),
-                visual_notes=result.get("visual_notes", ""),
-                camera_directions=result.get("camera_directions", []),
-                mood_and_atmosphere=result.get("mood_and_atmosphere", ""),
-                duration_estimate=float(result.get("duration_estimate", 15.0)),
-                video_prompt=result.get("video_prompt", ""),
-                raw_response=raw_response,
-            )
+            expanded = self._to_script(result, raw_response)
+            expanded.usage = self._record_usage(response.usage)
+            self._remember(cache_key, expanded)
+            return expanded
 
         except json.JSONDecodeError as e:
             logger.error("Failed to parse script expansion response", error=str(e))
@@ -128,88 +230,367 @@ class ScriptExpander:
             logger.error("Script expansion failed", error=str(e))
             raise
 
-    def _build_system_prompt(self, scene_bible: dict[str, Any] | None) -> str:
-        """Build the system prompt for ChatGPT."""
-        
-        prompt = """You are an expert screenwriter and video director specializing in AI-generated video content.
+    def expand_streaming(
+        self,
+        user_prompt: str,
+        scene_context: dict[str, Any],
+        scene_bible: dict[str, Any] | None = None,
+        previous_segments: list[PreviousSegment] | None = None,
+        on_early: Callable[[ExpandedScript], None] | None = None,
+        refresh: bool = False,
+    ) -> ExpandedScript:
+        """
+        Expand a prompt, streaming the completion.
 
-Your task is to transform brief story prompts into detailed, vivid scene descriptions optimized for AI video generation (Google Veo 3).
+        ``on_early`` is called once, from the streaming thread, with a
+        partial ExpandedScript as soon as the EARLY_FIELDS are complete. It
+        should hand work off rather than block, since the rest of the
+        script is read after it returns.
 
-## Guidelines
+        Args:
+            (as for ``expand``)
+            on_early: Receives the partial script with the video fields
 
-1. **Visual Clarity**: Write descriptions that are visually specific and unambiguous
-2. **Continuity**: Maintain character appearances and settings consistent with the scene bible
-3. **Cinematic Language**: Use professional film terminology for camera directions
-4. **Duration**: Aim for 15-30 second video segments
-5. **Action Focus**: Prioritize visual action over internal thoughts
-6. **Present Tense**: Always write in present tense, active voice
+        Returns:
+            The complete ExpandedScript
+        """
+        logger.info(
+            "Expanding script (streaming)",
+            prompt_length=len(user_prompt),
+            has_bible=scene_bible is not None,
+            num_previous=len(previous_segments) if previous_segments else 0,
+        )
 
-## Output Format
+        messages = self._build_messages(user_prompt, scene_context, scene_bible, previous_segments)
+        cache_key = self._cache_key(messages)
+        cached = self._cached(cache_key, refresh)
+        if cached:
+            if on_early:
+                on_early(cached)
+            return cached
 
-You MUST respond with a valid JSON object containing these fields:
+        parser = StreamingJSONObject()
+        early_sent = False
+        usage = None
 
-{
-    "full_script": "Complete narrative script with all details",
-    "scene_description": "Detailed description of the setting, lighting, atmosphere",
-    "character_descriptions": {
-        "character_name": "Visual description for this scene"
-    },
-    "actions": ["Action 1", "Action 2", "Action 3"],
-    "dialogue": [
-        {"character": "Name", "line": "What they say"}
-    ],
-    "visual_notes": "Special effects, transitions, visual style notes",
-    "camera_directions": ["Opening shot type", "Mid-scene camera movement", "Closing shot"],
-    "mood_and_atmosphere": "Overall emotional tone and visual atmosphere",
-    "duration_estimate": 20,
-    "video_prompt": "Optimized 200-word prompt for video generation API"
-}
+        try:
+            with self.breaker.guard(failures=OPENAI_OUTAGES):
+                stream = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=self.temperature,
+                    max_tokens=min(SCRIPT_MAX_TOKENS, self.max_output_tokens),
+                    response_format={"type": "json_object"},
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                for chunk in stream:
+                    if chunk.usage:
+                        usage = chunk.usage  # sent in a final chunk without choices
+                    if not chunk.choices or not chunk.choices[0].delta.content:
+                        continue
+                    parser.feed(chunk.choices[0].delta.content)
+                    if (
+                        not early_sent
+                        and on_early
+                        and all(name in parser.fields for name in EARLY_FIELDS)
+                    ):
+                        early_sent = True
+                        logger.info("Video fields ready", received_chars=len(parser.text))
+                        on_early(self._to_script(parser.fields, ""))
+        except Exception as e:
+            logger.error("Script expansion failed", error=str(e))
+            raise
 
-## Video Prompt Optimization
+        raw_response = parser.text or "{}"
+        try:
+            result = json.loads(raw_response)
+        except json.JSONDecodeError as e:
+            logger.error("Failed to parse script expansion response", error=str(e))
+            fallback = self._fallback_expand(user_prompt, scene_context)
+            if not early_sent:
+                return fallback
+            # A video is already running from the streamed fields: keep those
+            # so the script matches it, and fill in what never arrived
+            expanded = self._to_script({**asdict(fallback), **parser.fields}, raw_response)
+            expanded.usage = self._record_usage(usage)
+            return expanded
+
+        logger.info("Script expansion complete", result_keys=list(result.keys()))
+        expanded = self._to_script(result, raw_response)
+        expanded.usage = self._record_usage(usage)
+        self._remember(cache_key, expanded)
+        return expanded
+
+    def _cache_key(self, messages: list[dict[str, str]]) -> str | None:
+        if not self.cache:
+            return None
+        return self.cache.key(self.model, self.temperature, messages)
+
+    def _cached(self, cache_key: str | None, refresh: bool) -> ExpandedScript | None:
+        """A previously expanded script for the same request, if any."""
+        if not cache_key or refresh:
+            return None
+        try:
+            fields = self.cache.get(cache_key)
+        except Exception as e:
+            logger.warning("Expansion cache lookup failed", error=str(e))
+            return None
+        if fields is None:
+            return None
+        return ExpandedScript(**{**fields, "usage": {}})  # no tokens spent
+
+    def _remember(self, cache_key: str | None, expanded: ExpandedScript) -> None:
+        if not cache_key:
+            return
+        try:
+            self.cache.store(cache_key, asdict(expanded))
+        except Exception as e:
+            logger.warning("Could not cache expanded script", error=str(e))
 
-The "video_prompt" field should be a condensed, highly visual prompt optimized for AI video generation:
-- Lead with the most important visual elements
-- Include character appearances in the prompt
-- Specify lighting, color palette, and atmosphere
-- Describe motion and action clearly
-- Keep under 200 words for best results
-"""
+    def expand_batch(
+        self,
+        user_prompts: list[str],
+        scene_context: dict[str, Any],
+        scene_bible: dict[str, Any] | None = None,
+        previous_segments: list[PreviousSegment] | None = None,
+    ) -> list[ExpandedScript]:
+        """
+        Expand consecutive prompts of one scene with one request per batch.
+
+        The entry point for seeding a scene or backfilling its scripts: call
+        it once with all the scene's prompts instead of ``expand`` per
+        prompt. The instructions, scene bible and context are then sent once
+        per batch instead of once per prompt. A batch holds up to
+        ``expansion_batch_size`` prompts, fewer if the model's completion
+        limit can't fit that many full scripts. When only one fits (any
+        4096-token model), each prompt goes through ``expand`` instead, which
+        also uses the expansion cache. Each batch sees the scripts of the
+        batches before it as previous segments.
+
+        Args:
+            user_prompts: Prompts of consecutive segments, in order
+            (remaining arguments as for ``expand``)
+
+        Returns:
+            One ExpandedScript per prompt, in order; items the model
+            omitted or malformed get ``_fallback_expand``
+        """
+        previous = list(previous_segments or [])
+        next_index = max((s.order_index for s in previous), default=-1) + 1
+        results: list[ExpandedScript] = []
+        # As many prompts as fit the model's completion limit at full length
+        size = max(1, min(
+            settings.expansion_batch_size, self.max_output_tokens // SCRIPT_MAX_TOKENS
+        ))
+
+        for start in range(0, len(user_prompts), size):
+            batch = user_prompts[start:start + size]
+            if size == 1:
+                expanded = [self.expand(batch[0], scene_context, scene_bible, previous)]
+            else:
+                expanded = self._expand_batch(batch, scene_context, scene_bible, previous)
+            results.extend(expanded)
+            for prompt, script in zip(batch, expanded):
+                previous.append(PreviousSegment(
+                    order_index=next_index,
+                    prompt=prompt,
+                    expanded_script=script.full_script,
+                    video_url=None,
+                ))
+                next_index += 1
+
+        return results
+
+    def _expand_batch(
+        self,
+        user_prompts: list[str],
+        scene_context: dict[str, Any],
+        scene_bible: dict[str, Any] | None,
+        previous_segments: list[PreviousSegment],
+    ) -> list[ExpandedScript]:
+        """One structured request expanding several prompts."""
+        logger.info("Expanding script batch", count=len(user_prompts))
 
+        combined = "\n\n".join(
+            f"### Prompt {i + 1}\n{prompt}" for i, prompt in enumerate(user_prompts)
+        )
+        messages = self._build_messages(combined, scene_context, scene_bible, previous_segments)
+        messages[-1]["content"] += "\n\n" + BATCH_INSTRUCTIONS.format(count=len(user_prompts))
+
+        try:
+            with self.breaker.guard(failures=OPENAI_OUTAGES):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=self.temperature,
+                    max_tokens=min(
+                        SCRIPT_MAX_TOKENS * len(user_prompts), self.max_output_tokens
+                    ),
+                    response_format={"type": "json_object"},
+                )
+        except Exception as e:
+            logger.error("Script batch expansion failed", error=str(e))
+            raise
+
+        raw_response = response.choices[0].message.content or "{}"
+        usage = self._record_usage(response.usage)
+        try:
+            items = json.loads(raw_response).get("segments")
+        except (json.JSONDecodeError, AttributeError) as e:
+            logger.error("Failed to parse batch expansion response", error=str(e))
+            items = None
+        if not isinstance(items, list):
+            items = []
+
+        results = []
+        for i, prompt in enumerate(user_prompts):
+            item = items[i] if i < len(items) else None
+            try:
+                if not isinstance(item, dict) or not item.get("full_script"):
+                    raise ValueError("missing or empty item")
+                script = self._to_script(item, json.dumps(item))
+            except (TypeError, ValueError) as e:
+                logger.warning("Batch item fell back to simple expansion", index=i, error=str(e))
+                script = self._fallback_expand(prompt, scene_context)
+            results.append(script)
+
+        shares = self._split_usage(usage, [len(script.raw_response) for script in results])
+        for script, share in zip(results, shares):
+            script.usage = {**share, "batch_size": len(user_prompts)}
+        return results
+
+    @staticmethod
+    def _split_usage(usage: dict[str, int], weights: list[int]) -> list[dict[str, int]]:
+        """
+        Share a batch request's token counts among its items.
+
+        Completion tokens are split by weight (each item's response
+        length), prompt tokens evenly. Each count's shares add up to the
+        batch total, so summing per-item usage gives the real spend.
+        """
+        count = len(weights)
+        total_weight = sum(weights)
+        shares: list[dict[str, int]] = [{} for _ in weights]
+        for name, total in usage.items():
+            if name == "completion_tokens" and total_weight:
+                bounds = [0]
+                for weight in weights:
+                    bounds.append(bounds[-1] + weight)
+                cuts = [round(total * bound / total_weight) for bound in bounds]
+            else:
+                cuts = [round(total * i / count) for i in range(count + 1)]
+            for share, low, high in zip(shares, cuts, cuts[1:]):
+                share[name] = high - low
+        return shares
+
+    def _build_messages(
+        self,
+        user_prompt: str,
+        scene_context: dict[str, Any],
+        scene_bible: dict[str, Any] | None,
+        previous_segments: list[PreviousSegment] | None,
+    ) -> list[dict[str, str]]:
+        """Chat messages for one expansion request."""
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
         if scene_bible:
-            prompt += "\n\n## Scene Bible (Maintain Continuity)\n\n"
-            
-            # Add characters
-            characters = scene_bible.get("characters", {})
-            if characters:
-                prompt += "### Characters\n"
-                for char_id, char in characters.items():
-                    name = char.get("name", char_id)
-                    visual = char.get("visualPrompt", char.get("description", ""))
-                    traits = char.get("traits", [])
-                    prompt += f"- **{name}**: {visual}"
-                    if traits:
-                        prompt += f" (Traits: {', '.join(traits)})"
-                    prompt += "\n"
-            
-            # Add locations
-            locations = scene_bible.get("locations", {})
-            if locations:
-                prompt += "\n### Locations\n"
-                for loc_id, loc in locations.items():
-                    name = loc.get("name", loc_id)
-                    visual = loc.get("visualPrompt", loc.get("description", ""))
-                    prompt += f"- **{name}**: {visual}\n"
-            
-            # Add style guide
-            rules = scene_bible.get("rules", {})
-            if rules:
-                prompt += "\n### Style Guide\n"
-                if "visualStyle" in rules:
-                    prompt += f"- Visual Style: {rules['visualStyle']}\n"
-                if "colorPalette" in rules:
-                    prompt += f"- Color Palette: {', '.join(rules['colorPalette'])}\n"
-                if "mood" in rules:
-                    prompt += f"- Mood: {rules['mood']}\n"
+            messages.append({"role": "system", "content": self._scene_block(scene_bible)})
+        messages.append({
+            "role": "user",
+            "content": self._build_user_message(
+                user_prompt, scene_context, scene_bible, previous_segments
+            ),
+        })
+        return messages
+
+    def _scene_block(self, scene_bible: dict[str, Any]) -> str:
+        """Scene bible block, memoized per (scene_id, bible version)."""
+        if "scene_id" not in scene_bible or "version" not in scene_bible:
+            return self._build_scene_block(scene_bible)
+        key = (scene_bible["scene_id"], scene_bible["version"])
+        with _scene_blocks_lock:
+            if key in _scene_blocks:
+                _scene_blocks.move_to_end(key)
+                return _scene_blocks[key]
+        block = self._build_scene_block(scene_bible)
+        with _scene_blocks_lock:
+            _scene_blocks[key] = block
+            while len(_scene_blocks) > SCENE_BLOCK_CACHE_SIZE:
+                _scene_blocks.popitem(last=False)
+        return block
+
+    @staticmethod
+    def _record_usage(usage: Any) -> dict[str, int]:
+        """Log and export token usage, including prompt tokens served from cache."""
+        if usage is None:
+            return {}
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", None) or 0) if details else 0
+        counts = {
+            "prompt_tokens": usage.prompt_tokens,
+            "cached_prompt_tokens": cached,
+            "completion_tokens": usage.completion_tokens,
+        }
+        EXPANSION_TOKENS.labels(kind="prompt_cached").inc(cached)
+        EXPANSION_TOKENS.labels(kind="prompt_uncached").inc(usage.prompt_tokens - cached)
+        EXPANSION_TOKENS.labels(kind="completion").inc(usage.completion_tokens)
+        logger.info("Expansion token usage", **counts)
+        return counts
+
+    @staticmethod
+    def _to_script(result: dict[str, Any], raw_response: str) -> ExpandedScript:
+        """ExpandedScript from a (possibly partial) parsed response."""
+        return ExpandedScript(
+            full_script=result.get("full_script", ""),
+            scene_description=result.get("scene_description", ""),
+            character_descriptions=result.get("character_descriptions", {}),
+            actions=result.get("actions", []),
+            dialogue=result.get("dialogue", []),
+            visual_notes=result.get("visual_notes", ""),
+            camera_directions=result.get("camera_directions", []),
+            mood_and_atmosphere=result.get("mood_and_atmosphere", ""),
+            duration_estimate=float(result.get("duration_estimate", 15.0)),
+            video_prompt=result.get("video_prompt", ""),
+            raw_response=raw_response,
+        )
+
+    @staticmethod
+    def _build_scene_block(scene_bible: dict[str, Any]) -> str:
+        """Build the per-scene system message from the scene bible."""
+        prompt = "## Scene Bible (Maintain Continuity)\n\n"
+        
+        # Add characters
+        characters = scene_bible.get("characters", {})
+        if characters:
+            prompt += "### Characters\n"
+            for char_id, char in characters.items():
+                name = char.get("name", char_id)
+                visual = char.get("visualPrompt", char.get("description", ""))
+                traits = char.get("traits", [])
+                prompt += f"- **{name}**: {visual}"
+                if traits:
+                    prompt += f" (Traits: {', '.join(traits)})"
+                prompt += "\n"
+        
+        # Add locations
+        locations = scene_bible.get("locations", {})
+        if locations:
+            prompt += "\n### Locations\n"
+            for loc_id, loc in locations.items():
+                name = loc.get("name", loc_id)
+                visual = loc.get("visualPrompt", loc.get("description", ""))
+                prompt += f"- **{name}**: {visual}\n"
+        
+        # Add style guide
+        rules = scene_bible.get("rules", {})
+        if rules:
+            prompt += "\n### Style Guide\n"
+            if "visualStyle" in rules:
+                prompt += f"- Visual Style: {rules['visualStyle']}\n"
+            if "colorPalette" in rules:
+                prompt += f"- Color Palette: {', '.join(rules['colorPalette'])}\n"
+            if "mood" in rules:
+                prompt += f"- Mood: {rules['mood']}\n"
 
         return prompt
 
@@ -232,18 +613,32 @@ The "video_prompt" field should be a condensed, highly visual prompt optimized f
         if scene_context.get("topic"):
             message_parts.append(f"**Topic/Genre**: {scene_context['topic']}")
         
-        # Previous segments for continuity
-        if previous_segments:
+        # Story so far, then the latest segments it doesn't cover yet,
+        # all within a fixed token budget however long the scene is
+        budget = settings.expansion_context_max_tokens
+        summary = scene_context.get("summary")
+        if summary:
+            summary = truncate_to_tokens(summary, settings.scene_summary_max_tokens)
+            message_parts.append("\n## Story So Far")
+            message_parts.append(summary)
+            budget -= estimate_tokens(summary)
+
+        recent = self._recent_segments(previous_segments, scene_context.get("summary_through"))
+        if recent:
             message_parts.append("\n## Previous Segments (for continuity)")
-            for seg in previous_segments[-3:]:  # Last 3 segments max
-                message_parts.append(f"\n### Segment {seg.order_index}")
-                message_parts.append(f"**Prompt**: {seg.prompt}")
-                if seg.expanded_script:
-                    # Truncate long scripts
-                    script_preview = seg.expanded_script[:500]
-                    if len(seg.expanded_script) > 500:
-                        script_preview += "..."
-                    message_parts.append(f"**Script**: {script_preview}")
+            sections = []
+            for seg in recent:
+                section = [f"\n### Segment {seg.order_index}", f"**Prompt**: {seg.prompt}"]
+                budget -= estimate_tokens("\n".join(section))
+                if seg.expanded_script and budget > 0:
+                    # The end of a script matters most for what comes next
+                    script = truncate_tail_to_tokens(seg.expanded_script, budget)
+                    section.append(f"**Script**: {script}")
+                    budget -= estimate_tokens(script)
+                sections.insert(0, "\n".join(section))
+                if budget <= 0:
+                    break
+            message_parts.extend(sections)
         
         # Current user prompt
         message_parts.append("\n## User's New Prompt (expand this)")
@@ -259,6 +654,23 @@ The "video_prompt" field should be a condensed, highly visual prompt optimized f
         
         return "\n".join(message_parts)
 
+    @staticmethod
+    def _recent_segments(
+        previous_segments: list[PreviousSegment] | None,
+        summary_through: int | None,
+    ) -> list[PreviousSegment]:
+        """
+        Previous segments to include verbatim, newest first.
+
+        The immediate predecessor always; older ones only while they are
+        not yet covered by the scene summary.
+        """
+        if not previous_segments:
+            return []
+        newest_first = sorted(previous_segments, key=lambda s: s.order_index, reverse=True)
+        covered = summary_through if summary_through is not None else -1
+        return newest_first[:1] + [s for s in newest_first[1:] if s.order_index > covered]
+
     def _fallback_expand(
         self,
         user_prompt: str,
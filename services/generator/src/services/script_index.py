@@ -0,0 +1,67 @@
+"""
+Script Index - Word positions of a script for proximity lookups.
+
+Continuity rules ask questions like "is a hair colour within a few words of
+'hair', close to this character's mention?". The script is tokenized once
+per validation into lowercased words and a word -> positions index, and
+rules answer those questions with bisect lookups over the index instead of
+rescanning slices of text around each mention.
+"""
+
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Iterable
+import re
+
+from src.services.entity_matcher import WORD, EntityMention
+
+SENTENCE_END = re.compile(r"[.!?]+")
+
+
+class ScriptIndex:
+    """Lowercased words of a script and where each one occurs."""
+
+    def __init__(self, script: str):
+        self.script = script
+        self.matches = list(WORD.finditer(script))
+        self.words = [match.group().lower() for match in self.matches]
+        self.starts = [match.start() for match in self.matches]
+        self.positions: dict[str, list[int]] = defaultdict(list)
+        for i, word in enumerate(self.words):
+            self.positions[word].append(i)
+        self.sentence_ends = [match.start() for match in SENTENCE_END.finditer(script)]
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def span(self, mention: EntityMention) -> tuple[int, int]:
+        """First and last word index of a mention."""
+        return (
+            bisect_left(self.starts, mention.start),
+            bisect_left(self.starts, mention.end) - 1,
+        )
+
+    def find(self, words: Iterable[str], lo: int, hi: int) -> list[int]:
+        """
+        Positions of any of the words within a range, in order.
+
+        Args:
+            words: Lowercased words to look up
+            lo: First word index to include
+            hi: Word index to stop before
+        """
+        hits = []
+        for word in words:
+            positions = self.positions.get(word)
+            if positions:
+                hits.extend(positions[bisect_left(positions, lo):bisect_left(positions, hi)])
+        hits.sort()
+        return hits
+
+    def sentence(self, position: int) -> int:
+        """Number of the sentence a word is in."""
+        return bisect_left(self.sentence_ends, self.starts[position])
+
+    def text(self, position: int) -> str:
+        """A word as written in the script."""
+        return self.matches[position].group()
@@ -0,0 +1,157 @@
+"""
+Still Images - Posters and trickplay sprites produced alongside the HLS encode.
+
+Everything here is expressed as extra ffmpeg outputs that are appended to one
+rendition's transcode, so the source is decoded once for video and images
+alike. After the encode, a WebVTT index mapping timestamps to sprite tiles is
+written for scrubbing previews.
+
+Layout inside the images directory:
+
+- ``thumbnail.jpg``: full-size frame (kept for existing clients)
+- ``poster_{width}.{webp,avif}``: poster at each configured width
+- ``sprite_{n}.jpg`` + ``trickplay.vtt``: timeline sprite sheets and index
+"""
+
+from functools import lru_cache
+from pathlib import Path
+import math
+import subprocess
+import structlog
+
+from src.config import get_settings
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+# Poster format -> (required ffmpeg encoder, codec arguments)
+POSTER_CODECS = {
+    "webp": ("libwebp", ["-c:v", "libwebp", "-quality", "80"]),
+    "avif": ("libaom-av1", [
+        "-c:v", "libaom-av1", "-still-picture", "1",
+        "-crf", "32", "-cpu-used", "6", "-pix_fmt", "yuv420p",
+    ]),
+}
+
+
+@lru_cache
+def available_encoders() -> frozenset[str]:
+    """Encoders compiled into the local ffmpeg."""
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"],
+            capture_output=True,
+            text=True,
+        )
+    except OSError:
+        return frozenset()
+    return frozenset(
+        parts[1] for line in result.stdout.splitlines()
+        if len(parts := line.split()) > 1 and len(parts[0]) == 6
+    )
+
+
+class StillImageSet:
+    """Plans the image outputs of one encode and indexes them afterwards."""
+
+    def __init__(self, images_dir: Path, aspect_ratio: float):
+        self.images_dir = images_dir
+        self.poster_widths = settings.poster_widths
+        self.tile_width = settings.trickplay_width
+        self.tile_height = max(2, round(self.tile_width / aspect_ratio / 2) * 2)
+        self.interval = settings.trickplay_interval
+        self.columns = settings.trickplay_columns
+        self.rows = settings.trickplay_rows
+
+        encoders = available_encoders()
+        self.poster_formats = [
+            fmt for fmt in settings.poster_formats
+            if fmt in POSTER_CODECS and POSTER_CODECS[fmt][0] in encoders
+        ]
+        skipped = set(settings.poster_formats) - set(self.poster_formats)
+        if skipped:
+            logger.warning("Poster formats unsupported by ffmpeg", formats=sorted(skipped))
+
+    @property
+    def thumbnail_path(self) -> Path:
+        return self.images_dir / "thumbnail.jpg"
+
+    def config(self) -> dict:
+        """Everything that determines image output, for cache keying."""
+        return {
+            "poster_widths": self.poster_widths,
+            "poster_formats": self.poster_formats,
+            "trickplay": [
+                self.tile_width, self.tile_height, self.interval, self.columns, self.rows
+            ],
+        }
+
+    def ffmpeg_outputs(self, thumbnail_time: float) -> list[str]:
+        """Extra ffmpeg outputs reading the first input's video stream."""
+        select = f"select=gte(t\\,{thumbnail_time})"
+        outputs = [
+            "-map", "0:v:0",
+            "-vf", select,
+            "-frames:v", "1",
+            "-q:v", "2",
+            str(self.thumbnail_path),
+        ]
+        for width in self.poster_widths:
+            for fmt in self.poster_formats:
+                outputs += [
+                    "-map", "0:v:0",
+                    "-vf", f"{select},scale={width}:-2:flags=lanczos",
+                    "-frames:v", "1",
+                    *POSTER_CODECS[fmt][1],
+                    str(self.images_dir / f"poster_{width}.{fmt}"),
+                ]
+        if self.interval > 0:
+            outputs += [
+                "-map", "0:v:0",
+                "-vf", (
+                    f"fps=1/{self.interval},"
+                    f"scale={self.tile_width}:{self.tile_height}:flags=area,"
+                    f"tile={self.columns}x{self.rows}"
+                ),
+                "-fps_mode", "passthrough",
+                "-q:v", "5",
+                "-f", "image2",
+                "-start_number", "1",
+                str(self.images_dir / "sprite_%02d.jpg"),
+            ]
+        return outputs
+
+    def write_trickplay_index(self, duration: float | None) -> Path | None:
+        """Write the WebVTT index for the sprite sheets ffmpeg produced."""
+        sheets = sorted(self.images_dir.glob("sprite_*.jpg"))
+        if not sheets or not duration:
+            return None
+
+        per_sheet = self.columns * self.rows
+        lines = ["WEBVTT", ""]
+        for index in range(math.ceil(duration / self.interval)):
+            sheet_number, tile = divmod(index, per_sheet)
+            if sheet_number >= len(sheets):
+                break
+            row, column = divmod(tile, self.columns)
+            start = index * self.interval
+            end = min(duration, start + self.interval)
+            lines += [
+                f"{_timestamp(start)} --> {_timestamp(end)}",
+                f"{sheets[sheet_number].name}#xywh="
+                f"{column * self.tile_width},{row * self.tile_height},"
+                f"{self.tile_width},{self.tile_height}",
+                "",
+            ]
+
+        index_path = self.images_dir / "trickplay.vtt"
+        index_path.write_text("\n".join(lines))
+        return index_path
+
+
+def _timestamp(seconds: float) -> str:
+    millis = round(seconds * 1000)
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
@@ -2,39 +2,46 @@
 Storage Service - Handles S3 uploads and URL generation.
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-import boto3
-from botocore.config import Config
+from typing import Iterator
+import json
 import structlog
 
 from src.config import get_settings
+from src.services.clients import s3_client
 
 logger = structlog.get_logger()
 settings = get_settings()
 
+CONTENT_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+    ".mp4": "video/mp4",
+    ".jpg": "image/jpeg",
+    ".webp": "image/webp",
+    ".avif": "image/avif",
+    ".vtt": "text/vtt",
+}
+
 
 @dataclass
 class UploadResult:
     """Result of upload operation."""
     video_url: str
     hls_url: str
-    thumbnail_url: str
+    thumbnail_url: str | None
+    poster_urls: dict[str, str] = field(default_factory=dict)  # file name -> URL
+    trickplay_url: str | None = None
 
 
 class StorageService:
     """Handles file storage operations with S3."""
 
     def __init__(self):
-        self.s3 = boto3.client(
-            "s3",
-            endpoint_url=settings.s3_endpoint,
-            aws_access_key_id=settings.s3_access_key,
-            aws_secret_access_key=settings.s3_secret_key,
-            region_name=settings.s3_region,
-            config=Config(signature_version="s3v4"),
-        )
+        self.s3 = s3_client()
         self.bucket = settings.s3_bucket_videos
+        self.internal_bucket = settings.s3_bucket_internal
         self.cdn_url = settings.cdn_url
 
     def upload_segment(
@@ -43,7 +50,9 @@ class StorageService:
         scene_id: str,
         video_path: Path,
         hls_path: Path,
-        thumbnail_path: Path,
+        thumbnail_path: Path | None,
+        published_hls: set[str] | None = None,
+        images_dir: Path | None = None,
     ) -> UploadResult:
         """
         Upload all segment assets to S3.
@@ -54,6 +63,9 @@ class StorageService:
             video_path: Path to source video
             hls_path: Path to HLS directory
             thumbnail_path: Path to thumbnail
+            published_hls: HLS files already uploaded by an earlier
+                ``publish_hls`` call, skipped here
+            images_dir: Posters, sprite sheets and trickplay index
             
         Returns:
             UploadResult with CDN URLs
@@ -65,62 +77,163 @@ class StorageService:
         self._upload_file(video_path, video_key, "video/mp4")
 
         # Upload HLS files
-        hls_base = f"{base_path}/hls"
-        self._upload_directory(hls_path, hls_base)
+        hls_url = self.publish_hls(segment_id, scene_id, hls_path, published_hls)
 
         # Upload thumbnail
-        thumb_key = f"{base_path}/thumbnail.jpg"
-        self._upload_file(thumbnail_path, thumb_key, "image/jpeg")
+        thumbnail_url = None
+        if thumbnail_path:
+            thumb_key = f"{base_path}/thumbnail.jpg"
+            self._upload_file(thumbnail_path, thumb_key, "image/jpeg")
+            thumbnail_url = f"{self.cdn_url}/{thumb_key}"
+
+        # Upload posters and trickplay sprites; the index references
+        # sprites by relative name, so they share one prefix
+        poster_urls = {}
+        trickplay_url = None
+        if images_dir:
+            images_base = f"{base_path}/images"
+            for file_path in sorted(images_dir.iterdir()):
+                if not file_path.is_file() or file_path == thumbnail_path:
+                    continue
+                key = f"{images_base}/{file_path.name}"
+                self._upload_file(file_path, key, self._content_type(file_path))
+                if file_path.name.startswith("poster_"):
+                    poster_urls[file_path.name] = f"{self.cdn_url}/{key}"
+                elif file_path.suffix == ".vtt":
+                    trickplay_url = f"{self.cdn_url}/{key}"
 
         return UploadResult(
             video_url=f"{self.cdn_url}/{video_key}",
-            hls_url=f"{self.cdn_url}/{hls_base}/master.m3u8",
-            thumbnail_url=f"{self.cdn_url}/{thumb_key}",
+            hls_url=hls_url,
+            thumbnail_url=thumbnail_url,
+            poster_urls=poster_urls,
+            trickplay_url=trickplay_url,
+        )
+
+    def publish_hls(
+        self,
+        segment_id: str,
+        scene_id: str,
+        hls_path: Path,
+        published: set[str] | None = None,
+    ) -> str:
+        """
+        Upload HLS output so that the master playlist is always playable.
+
+        Variant playlists and media segments go first; the master playlist
+        is uploaded last and uncached, so replacing it with one listing more
+        renditions is a single atomic object swap for players. Can be called
+        repeatedly as renditions are added.
+
+        Args:
+            segment_id: Segment ID
+            scene_id: Scene ID for path organization
+            hls_path: Path to HLS directory
+            published: Names of files already uploaded; skipped, and updated
+                with the files uploaded by this call
+
+        Returns:
+            CDN URL of the master playlist
+        """
+        hls_base = f"scenes/{scene_id}/segments/{segment_id}/hls"
+        published = set() if published is None else published
+
+        master = hls_path / "master.m3u8"
+        for file_path in sorted(hls_path.iterdir()):
+            if file_path.is_file() and file_path != master and file_path.name not in published:
+                self._upload_file(
+                    file_path, f"{hls_base}/{file_path.name}", self._content_type(file_path)
+                )
+                published.add(file_path.name)
+
+        self._upload_file(
+            master,
+            f"{hls_base}/{master.name}",
+            "application/vnd.apple.mpegurl",
+            cache_control="no-cache",
         )
+        return f"{self.cdn_url}/{hls_base}/{master.name}"
 
     def _upload_file(
         self,
         local_path: Path,
         s3_key: str,
         content_type: str,
+        bucket: str | None = None,
+        cache_control: str = "max-age=31536000",  # 1 year for immutable content
     ) -> None:
         """Upload a single file to S3."""
         logger.debug("Uploading file", path=str(local_path), key=s3_key)
 
         self.s3.upload_file(
             str(local_path),
-            self.bucket,
+            bucket or self.bucket,
             s3_key,
             ExtraArgs={
                 "ContentType": content_type,
-                "CacheControl": "max-age=31536000",  # 1 year for immutable content
+                "CacheControl": cache_control,
             },
         )
 
-    def _upload_directory(self, local_dir: Path, s3_prefix: str) -> None:
+    def _upload_directory(
+        self,
+        local_dir: Path,
+        s3_prefix: str,
+        bucket: str | None = None,
+    ) -> None:
         """Upload all files in a directory to S3."""
         for file_path in local_dir.iterdir():
             if file_path.is_file():
                 s3_key = f"{s3_prefix}/{file_path.name}"
-                
-                # Determine content type
-                if file_path.suffix == ".m3u8":
-                    content_type = "application/vnd.apple.mpegurl"
-                elif file_path.suffix == ".ts":
-                    content_type = "video/mp2t"
-                else:
-                    content_type = "application/octet-stream"
-
-                self._upload_file(file_path, s3_key, content_type)
-
-    def get_signed_url(self, key: str, expiration: int = 3600) -> str:
+                self._upload_file(file_path, s3_key, self._content_type(file_path), bucket)
+
+    @staticmethod
+    def _content_type(file_path: Path) -> str:
+        return CONTENT_TYPES.get(file_path.suffix, "application/octet-stream")
+
+    def get_signed_url(
+        self,
+        key: str,
+        expiration: int = 3600,
+        bucket: str | None = None,
+    ) -> str:
         """Generate a signed URL for private content."""
         return self.s3.generate_presigned_url(
             "get_object",
-            Params={"Bucket": self.bucket, "Key": key},
+            Params={"Bucket": bucket or self.bucket, "Key": key},
             ExpiresIn=expiration,
         )
 
+    def segment_source_key(self, scene_id: str, segment_id: str) -> str:
+        """S3 key of a segment's source video."""
+        return f"scenes/{scene_id}/segments/{segment_id}/source.mp4"
+
+    def upload_private_file(self, local_path: Path, s3_key: str, bucket: str | None = None) -> None:
+        """Upload a processing artifact without public content headers."""
+        self.s3.upload_file(str(local_path), bucket or self.internal_bucket, s3_key)
+
+    def download_file(self, s3_key: str, local_path: Path, bucket: str | None = None) -> None:
+        """Download an object to a local file."""
+        self.s3.download_file(bucket or self.bucket, s3_key, str(local_path))
+
+    def get_json(self, key: str, bucket: str | None = None) -> dict | None:
+        """Read a JSON object, returning None if it does not exist."""
+        try:
+            response = self.s3.get_object(Bucket=bucket or self.bucket, Key=key)
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        return json.loads(response["Body"].read())
+
+    def put_json(self, key: str, data: dict, bucket: str | None = None) -> None:
+        """Write a JSON object (not cached, since it is mutable)."""
+        self.s3.put_object(
+            Bucket=bucket or self.bucket,
+            Key=key,
+            Body=json.dumps(data).encode(),
+            ContentType="application/json",
+            CacheControl="no-cache",
+        )
+
     def upload_file(self, local_path: str | Path, s3_key: str) -> str:
         """
         Upload a file to S3 and return the CDN URL.
@@ -161,16 +274,30 @@ class StorageService:
         
         return f"{self.cdn_url}/{s3_key}"
 
-    def delete_segment(self, segment_id: str, scene_id: str) -> None:
-        """Delete all files for a segment."""
-        prefix = f"scenes/{scene_id}/segments/{segment_id}/"
-        
+    def delete_object(self, key: str, bucket: str | None = None) -> None:
+        """Delete a single object."""
+        self.s3.delete_object(Bucket=bucket or self.bucket, Key=key)
+
+    def list_objects(self, prefix: str, bucket: str | None = None) -> Iterator[dict]:
+        """Iterate over all objects under a prefix."""
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket or self.bucket, Prefix=prefix):
+            yield from page.get("Contents", [])
+
+    def delete_prefix(self, prefix: str, bucket: str | None = None) -> None:
+        """Delete all objects under a prefix."""
+        bucket = bucket or self.bucket
+
         # List and delete all objects with prefix
         paginator = self.s3.get_paginator("list_objects_v2")
-        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
             if "Contents" in page:
                 objects = [{"Key": obj["Key"]} for obj in page["Contents"]]
                 self.s3.delete_objects(
-                    Bucket=self.bucket,
+                    Bucket=bucket,
                     Delete={"Objects": objects},
                 )
+
+    def delete_segment(self, segment_id: str, scene_id: str) -> None:
+        """Delete all files for a segment."""
+        self.delete_prefix(f"scenes/{scene_id}/segments/{segment_id}/")
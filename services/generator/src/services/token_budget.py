@@ -0,0 +1,54 @@
+"""
+Token Budget - Fast local estimate of prompt token counts.
+
+Prompt sections are trimmed to a token budget before each request. Exact
+counts would need the model's tokenizer; this estimate follows BPE
+tokenizers closely enough for budgeting (one token per short word or
+punctuation mark, longer words split into ~4-character pieces) and costs
+one regex pass.
+"""
+
+import math
+import re
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate number of tokens in text."""
+    return sum(math.ceil(len(piece) / 4) for piece in _PIECES.findall(text))
+
+
+def truncate_to_tokens(text: str, budget: int, marker: str = "...") -> str:
+    """
+    Cut text to fit a token budget, keeping the beginning.
+
+    Args:
+        text: Text to cut
+        budget: Maximum estimated tokens
+        marker: Appended when text was cut
+
+    Returns:
+        text unchanged if it fits, else its longest fitting prefix plus marker
+    """
+    if budget <= 0:
+        return ""
+    used = 0
+    for match in _PIECES.finditer(text):
+        used += math.ceil(len(match.group()) / 4)
+        if used > budget:
+            return text[:match.start()].rstrip() + marker
+    return text
+
+
+def truncate_tail_to_tokens(text: str, budget: int, marker: str = "...") -> str:
+    """Like ``truncate_to_tokens`` but keeps the end of the text."""
+    if budget <= 0:
+        return ""
+    used = 0
+    pieces = list(_PIECES.finditer(text))
+    for match in reversed(pieces):
+        used += math.ceil(len(match.group()) / 4)
+        if used > budget:
+            return marker + text[match.end():].lstrip()
+    return text
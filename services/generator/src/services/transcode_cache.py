@@ -0,0 +1,263 @@
+"""
+Transcode Cache - Content-addressed cache of HLS transcode output.
+
+Entries are keyed by a hash of the source file bytes plus the encoding
+config (ladder, segment duration, images), so identical bytes are only
+transcoded once. The x264 quality tier (``EncodingPolicy.tier``) moves with
+queue load, so it is not part of the key: each tier is stored as its own
+immutable entry, and a lookup is served by the requested tier or any better
+(slower preset) one. The shared tier lives in the internal bucket; a local
+LRU directory in front of it serves repeat hits on the same box without
+touching S3.
+"""
+
+from pathlib import Path
+import hashlib
+import json
+import os
+import shutil
+import time
+import structlog
+
+from src.config import get_settings
+from src.metrics import (
+    TRANSCODE_CACHE_EVICTIONS,
+    TRANSCODE_CACHE_LOCAL_BYTES,
+    TRANSCODE_CACHE_LOOKUPS,
+)
+from src.services.storage import StorageService
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+CACHE_PREFIX = "transcode-cache"
+MANIFEST_NAME = "manifest.json"
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: Path) -> str:
+    """SHA-256 of a file, read in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TranscodeCache:
+    """Two-tier (local disk LRU + S3) cache of HLS output directories."""
+
+    def __init__(
+        self,
+        storage: StorageService | None = None,
+        local_dir: str | Path | None = None,
+        max_bytes: int | None = None,
+        max_age_seconds: int | None = None,
+    ):
+        self.storage = storage or StorageService()
+        self.bucket = self.storage.internal_bucket
+        self.local_dir = Path(local_dir or settings.transcode_cache_dir)
+        self.local_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes if max_bytes is not None else settings.transcode_cache_max_bytes
+        self.max_remote_bytes = settings.transcode_cache_remote_max_bytes
+        self.max_age_seconds = (
+            max_age_seconds
+            if max_age_seconds is not None
+            else settings.transcode_cache_max_age_days * 86400
+        )
+
+    def key(self, video_path: Path, config: dict) -> str:
+        """Cache key for a source file encoded with the given config."""
+        payload = json.dumps(config, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(f"{hash_file(video_path)}:{payload}".encode()).hexdigest()
+
+    def fetch(self, key: str, root_dir: Path, max_tier: int) -> dict | None:
+        """
+        Materialize a cached entry's files under root_dir.
+
+        Args:
+            key: Cache key from ``key()``
+            root_dir: Directory to copy the entry's files into
+            max_tier: Quality tier requested; entries at this tier or a
+                better (lower) one are used, best first
+
+        Returns:
+            The entry's manifest, or None on a miss
+        """
+        tiers = range(max_tier + 1)
+        for tier in tiers:
+            manifest = self._fetch_local(self._entry_name(key, tier), root_dir)
+            if manifest:
+                return manifest
+        for tier in tiers:
+            manifest = self._fetch_remote(self._entry_name(key, tier), root_dir)
+            if manifest:
+                return manifest
+
+        TRANSCODE_CACHE_LOOKUPS.labels(result="miss").inc()
+        return None
+
+    def store(
+        self,
+        key: str,
+        tier: int,
+        root_dir: Path,
+        files: list[str],
+        metadata: dict,
+    ) -> None:
+        """
+        Add a finished transcode to both cache tiers.
+
+        Args:
+            key: Cache key from ``key()``
+            tier: Quality tier the output was encoded at
+            root_dir: Directory the file paths are relative to
+            files: Output files, relative to root_dir
+            metadata: Extra manifest fields returned on a hit
+        """
+        name = self._entry_name(key, tier)
+        manifest = {**metadata, "files": files, "tier": tier, "created_at": time.time()}
+
+        staging_dir = self.local_dir / f".{name}.{os.getpid()}"
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            self._copy_entry(root_dir, staging_dir, files)
+            (staging_dir / MANIFEST_NAME).write_text(json.dumps(manifest))
+            self._install(staging_dir, self.local_dir / name)
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+        # Upload the manifest last so readers never see a partial entry
+        for file_name in files:
+            self.storage.upload_private_file(
+                root_dir / file_name, f"{CACHE_PREFIX}/{name}/{file_name}", self.bucket
+            )
+        self.storage.put_json(f"{CACHE_PREFIX}/{name}/{MANIFEST_NAME}", manifest, self.bucket)
+
+        self.evict_local()
+        logger.info("Transcode cached", key=key, tier=tier, files=len(files))
+
+    def _fetch_local(self, name: str, root_dir: Path) -> dict | None:
+        entry_dir = self.local_dir / name
+        manifest = self._read_local_manifest(entry_dir)
+        if not manifest or self._expired(manifest):
+            return None
+        os.utime(entry_dir)  # mark as recently used
+        self._copy_entry(entry_dir, root_dir, manifest["files"])
+        TRANSCODE_CACHE_LOOKUPS.labels(result="hit_local").inc()
+        logger.info("Transcode cache hit", tier="local", entry=name)
+        return manifest
+
+    def _fetch_remote(self, name: str, root_dir: Path) -> dict | None:
+        manifest = self.storage.get_json(f"{CACHE_PREFIX}/{name}/{MANIFEST_NAME}", self.bucket)
+        if not manifest or self._expired(manifest):
+            return None
+        entry_dir = self.local_dir / name
+        staging_dir = self.local_dir / f".{name}.{os.getpid()}"
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            for file_name in manifest["files"]:
+                (staging_dir / file_name).parent.mkdir(parents=True, exist_ok=True)
+                self.storage.download_file(
+                    f"{CACHE_PREFIX}/{name}/{file_name}", staging_dir / file_name, self.bucket
+                )
+            (staging_dir / MANIFEST_NAME).write_text(json.dumps(manifest))
+            self._install(staging_dir, entry_dir)
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        self._copy_entry(entry_dir, root_dir, manifest["files"])
+        self.evict_local()
+        TRANSCODE_CACHE_LOOKUPS.labels(result="hit_remote").inc()
+        logger.info("Transcode cache hit", tier="remote", entry=name)
+        return manifest
+
+    def evict_local(self) -> None:
+        """Drop expired entries, then least recently used ones over the size cap."""
+        entries = []
+        for entry_dir in self.local_dir.iterdir():
+            if not entry_dir.is_dir() or entry_dir.name.startswith("."):
+                continue
+            manifest = self._read_local_manifest(entry_dir)
+            if manifest is None or self._expired(manifest):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                TRANSCODE_CACHE_EVICTIONS.labels(tier="local", reason="age").inc()
+                continue
+            size = sum(p.stat().st_size for p in entry_dir.rglob("*") if p.is_file())
+            entries.append((entry_dir.stat().st_mtime, size, entry_dir))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            TRANSCODE_CACHE_EVICTIONS.labels(tier="local", reason="size").inc()
+
+        TRANSCODE_CACHE_LOCAL_BYTES.set(total)
+
+    def evict_remote(self) -> int:
+        """
+        Delete shared entries past the max age, then the oldest ones over the
+        remote size cap. Returns the number of entries removed.
+        """
+        entries: dict[str, dict] = {}
+        for obj in self.storage.list_objects(f"{CACHE_PREFIX}/", self.bucket):
+            prefix, _, name = obj["Key"].rpartition("/")
+            entry = entries.setdefault(prefix, {"size": 0, "created": None})
+            entry["size"] += obj["Size"]
+            if name == MANIFEST_NAME:
+                entry["created"] = obj["LastModified"].timestamp()
+
+        cutoff = time.time() - self.max_age_seconds
+        removed = 0
+        kept = []
+        for prefix, entry in entries.items():
+            # Entries without a manifest are in-flight uploads; leave them
+            if entry["created"] is None:
+                continue
+            if entry["created"] < cutoff:
+                self.storage.delete_prefix(f"{prefix}/", self.bucket)
+                TRANSCODE_CACHE_EVICTIONS.labels(tier="remote", reason="age").inc()
+                removed += 1
+            else:
+                kept.append((entry["created"], entry["size"], prefix))
+
+        total = sum(size for _, size, _ in kept)
+        for _, size, prefix in sorted(kept):
+            if total <= self.max_remote_bytes:
+                break
+            self.storage.delete_prefix(f"{prefix}/", self.bucket)
+            total -= size
+            TRANSCODE_CACHE_EVICTIONS.labels(tier="remote", reason="size").inc()
+            removed += 1
+
+        return removed
+
+    @staticmethod
+    def _entry_name(key: str, tier: int) -> str:
+        return f"{key}-q{tier}"
+
+    def _expired(self, manifest: dict) -> bool:
+        return time.time() - manifest.get("created_at", 0) > self.max_age_seconds
+
+    @staticmethod
+    def _read_local_manifest(entry_dir: Path) -> dict | None:
+        try:
+            return json.loads((entry_dir / MANIFEST_NAME).read_text())
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _install(staging_dir: Path, entry_dir: Path) -> None:
+        """Atomically move a staged entry into place, unless another process won."""
+        try:
+            staging_dir.rename(entry_dir)
+        except OSError:
+            pass  # entry already present
+
+    @staticmethod
+    def _copy_entry(src_dir: Path, dst_dir: Path, files: list[str]) -> None:
+        """Copy the listed files; entries must not share inodes with job output."""
+        for name in files:
+            (dst_dir / name).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(src_dir / name, dst_dir / name)
@@ -0,0 +1,138 @@
+"""
+Transcode Scheduler - Runs renditions in parallel within a CPU thread budget.
+
+Each worker process owns an equal share of the machine's cores (based on
+``worker_concurrency``). Within a job, that share is split across renditions
+in proportion to their pixel count, every ffmpeg gets an explicit thread
+count, and, where the platform allows it, is pinned to its own cores so
+concurrent encodes do not fight over the same CPUs.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, TypeVar
+import os
+
+from src.config import get_settings
+from src.services.ffmpeg_progress import FFmpegProgress, run_ffmpeg
+
+settings = get_settings()
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class ThreadBudget:
+    """CPU allocation for a single ffmpeg process."""
+    threads: int
+    cpus: list[int] = field(default_factory=list)
+
+    @property
+    def lookahead_threads(self) -> int:
+        return max(1, self.threads // 4)
+
+    def ffmpeg_args(self) -> list[str]:
+        """Output options applying this budget to an x264 encode."""
+        return [
+            "-threads", str(self.threads),
+            "-x264-params", f"threads={self.threads}:lookahead-threads={self.lookahead_threads}",
+        ]
+
+
+def _available_cpus() -> list[int]:
+    """CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _worker_slot() -> int:
+    """Index of this worker process within the Celery pool."""
+    try:
+        from billiard.process import current_process
+        return int(getattr(current_process(), "index", 0) or 0)
+    except ImportError:
+        return 0
+
+
+class TranscodeScheduler:
+    """
+    Plans thread budgets and runs transcodes concurrently.
+
+    Parallelism comes from the ffmpeg child processes themselves; a thread
+    pool only dispatches and waits on them, which also works inside daemonic
+    Celery pool processes that may not fork a multiprocessing pool.
+    """
+
+    def __init__(
+        self,
+        concurrent_jobs: int | None = None,
+        slot: int | None = None,
+        pin_cpus: bool | None = None,
+    ):
+        self.concurrent_jobs = max(1, concurrent_jobs or settings.worker_concurrency)
+        self.slot = _worker_slot() if slot is None else slot
+        self.pin_cpus = settings.transcode_pin_cpus if pin_cpus is None else pin_cpus
+        self.cpus = self._job_cpus()
+
+    def _job_cpus(self) -> list[int]:
+        """Cores reserved for the job running in this worker slot."""
+        cpus = _available_cpus()
+        if settings.transcode_threads > 0:
+            per_job = min(len(cpus), settings.transcode_threads)
+        else:
+            per_job = max(1, len(cpus) // self.concurrent_jobs)
+        start = (self.slot * per_job) % len(cpus)
+        return [cpus[(start + i) % len(cpus)] for i in range(per_job)]
+
+    def plan(self, variants: list[dict]) -> list[ThreadBudget]:
+        """
+        Split this job's cores across renditions by output pixel count.
+
+        Every rendition gets at least one thread. When there are more
+        renditions than cores, they share the job's cores unpinned.
+        """
+        total = len(self.cpus)
+        if len(variants) > total:
+            return [ThreadBudget(threads=1, cpus=list(self.cpus)) for _ in variants]
+
+        weights = [v["width"] * v["height"] for v in variants]
+        weight_sum = sum(weights) or 1
+        shares = [max(1, int(total * w / weight_sum)) for w in weights]
+
+        # Hand cores lost to rounding to the heaviest renditions
+        order = sorted(range(len(variants)), key=lambda i: weights[i], reverse=True)
+        i = 0
+        while sum(shares) < total:
+            shares[order[i % len(order)]] += 1
+            i += 1
+        while sum(shares) > total:
+            j = max(range(len(shares)), key=lambda k: shares[k])
+            shares[j] -= 1
+
+        budgets = []
+        offset = 0
+        for share in shares:
+            budgets.append(ThreadBudget(threads=share, cpus=self.cpus[offset:offset + share]))
+            offset += share
+        return budgets
+
+    def map(self, fn: Callable[[T], R], items: Iterable[T]) -> list[R]:
+        """Run ``fn`` over items concurrently, preserving order."""
+        items = list(items)
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=len(items), thread_name_prefix="transcode") as pool:
+            return list(pool.map(fn, items))
+
+    def run(
+        self,
+        cmd: list[str],
+        budget: ThreadBudget,
+        on_progress: Callable[[FFmpegProgress], None] | None = None,
+        operation: str = "transcode",
+    ) -> FFmpegProgress:
+        """Run an ffmpeg command pinned to the budget's CPUs."""
+        cpus = budget.cpus if self.pin_cpus else None
+        return run_ffmpeg(cmd, on_progress=on_progress, cpus=cpus, operation=operation)
@@ -0,0 +1,167 @@
+"""
+Video Download - Streams generated videos to disk in fixed-size chunks.
+
+The SDK's download-then-save path holds the whole clip in memory. Here the
+response body is written chunk by chunk while being hashed, so memory per
+download is one chunk regardless of clip length. Interrupted transfers are
+resumed with HTTP range requests, the final size is checked against the
+server's length, and an MD5 advertised in ``x-goog-hash`` is verified.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+import base64
+import hashlib
+import time
+import httpx
+import structlog
+
+from src.config import get_settings
+from src.services.clients import http_client
+from src.metrics import VIDEO_DOWNLOAD_RESUMES, VIDEO_DOWNLOAD_THROUGHPUT
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+
+@dataclass
+class DownloadResult:
+    """Outcome of a streamed download."""
+    path: Path
+    size: int
+    sha256: str
+    seconds: float
+    resumes: int
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second."""
+        return self.size / self.seconds if self.seconds else 0.0
+
+
+class VideoDownloadError(Exception):
+    """Download failed, or the received file did not verify."""
+    pass
+
+
+def _expected_md5(response: httpx.Response) -> str | None:
+    """Hex MD5 from a ``x-goog-hash: crc32c=...,md5=...`` header."""
+    for part in response.headers.get("x-goog-hash", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name == "md5" and value:
+            return base64.b64decode(value).hex()
+    return None
+
+
+def _total_size(response: httpx.Response, offset: int) -> int | None:
+    """Full object size from Content-Range (206) or Content-Length (200)."""
+    content_range = response.headers.get("content-range", "")
+    if "/" in content_range and not content_range.endswith("/*"):
+        return int(content_range.rsplit("/", 1)[1])
+    length = response.headers.get("content-length")
+    return offset + int(length) if length else None
+
+
+def download_video(
+    url: str,
+    destination: Path,
+    headers: dict[str, str] | None = None,
+    on_chunk: Callable[[bytes], None] | None = None,
+    chunk_size: int | None = None,
+    max_resumes: int | None = None,
+) -> DownloadResult:
+    """
+    Stream a URL to a local file, resuming after interruptions.
+
+    Args:
+        url: Media URL
+        destination: File to write
+        headers: Extra request headers (e.g. the API key)
+        on_chunk: Called with each chunk as it is written, for stages that
+            consume the stream directly
+        chunk_size: Bytes per read (defaults to settings)
+        max_resumes: Range requests allowed after failures (defaults to settings)
+
+    Returns:
+        DownloadResult with size, SHA-256 and timing
+
+    Raises:
+        VideoDownloadError: Retries exhausted, or size/checksum mismatch
+    """
+    chunk_size = chunk_size or settings.download_chunk_bytes
+    max_resumes = settings.download_max_resumes if max_resumes is None else max_resumes
+    headers = {"Accept-Encoding": "identity", **(headers or {})}
+
+    sha256 = hashlib.sha256()
+    md5 = hashlib.md5()
+    expected_md5 = None
+    total = None
+    written = 0
+    resumes = 0
+    started = time.monotonic()
+
+    client = http_client()
+    with open(destination, "wb") as out:
+        while True:
+            request_headers = dict(headers)
+            if written:
+                request_headers["Range"] = f"bytes={written}-"
+            try:
+                with client.stream(
+                    "GET", url, headers=request_headers, timeout=settings.download_timeout
+                ) as response:
+                    response.raise_for_status()
+                    if written and response.status_code != 206:
+                        # Server ignored the range; start over
+                        logger.warning("Range not honoured, restarting download", offset=written)
+                        out.seek(0)
+                        out.truncate()
+                        sha256, md5, written = hashlib.sha256(), hashlib.md5(), 0
+                    total = _total_size(response, written) or total
+                    expected_md5 = _expected_md5(response) or expected_md5
+
+                    for chunk in response.iter_bytes(chunk_size):
+                        out.write(chunk)
+                        sha256.update(chunk)
+                        md5.update(chunk)
+                        written += len(chunk)
+                        if on_chunk:
+                            on_chunk(chunk)
+                if total is None or written >= total:
+                    break
+                raise httpx.ReadError(f"Connection closed at {written}/{total} bytes")
+            except httpx.HTTPStatusError as e:
+                raise VideoDownloadError(f"Download failed: HTTP {e.response.status_code}") from e
+            except httpx.TransportError as e:
+                if resumes >= max_resumes:
+                    raise VideoDownloadError(
+                        f"Download failed after {resumes} resumes: {e}"
+                    ) from e
+                resumes += 1
+                VIDEO_DOWNLOAD_RESUMES.inc()
+                logger.warning("Download interrupted, resuming", offset=written, error=str(e))
+
+    if total is not None and written != total:
+        raise VideoDownloadError(f"Size mismatch: got {written} bytes, expected {total}")
+    # A resumed download's MD5 still covers the whole body, since it is
+    # computed over every byte written
+    if expected_md5 and md5.hexdigest() != expected_md5:
+        raise VideoDownloadError("Checksum mismatch on downloaded video")
+
+    result = DownloadResult(
+        path=destination,
+        size=written,
+        sha256=sha256.hexdigest(),
+        seconds=time.monotonic() - started,
+        resumes=resumes,
+    )
+    VIDEO_DOWNLOAD_THROUGHPUT.observe(result.throughput)
+    logger.info(
+        "Video downloaded",
+        bytes=result.size,
+        seconds=round(result.seconds, 2),
+        resumes=resumes,
+        verified=bool(expected_md5 or total),
+    )
+    return result
@@ -5,18 +5,24 @@ This service takes expanded scripts and generates video content
 using Google's Veo 3 video generation model via the GenAI SDK.
 """
 
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 import tempfile
-import time
+import threading
+import uuid
 import subprocess
 import structlog
 
-from google import genai
-from google.genai import types
-
 from src.config import get_settings
+from src.services.clients import redis_client
+from src.services.clip_planner import Shot, stitch_clips
+from src.services.generation_cache import GenerationCache
+from src.services.media_probe import MediaInfo, MediaProbeError, probe_media
+from src.services.provider_router import ProviderRouter, ProviderStats
+from src.services.video_download import DownloadResult
+from src.services.video_providers import ProviderError, VideoRequest, provider_from_spec
 
 logger = structlog.get_logger()
 settings = get_settings()
@@ -32,6 +38,11 @@ class VideoResult:
     height: int
     generation_id: str
     model_used: str
+    media: MediaInfo | None = None  # full probe of the downloaded video
+    download: DownloadResult | None = None
+    cache_key: str | None = None  # generation cache entry holding this video
+    cache_hit: bool = False
+    shots: list["VideoResult"] = field(default_factory=list)  # clips stitched into this one
 
 
 class VideoGenerationError(Exception):
@@ -43,12 +54,21 @@ class VideoGenerator:
     """
     Generates video using Google AI Studio Veo 3 API.
     
-    Uses the official google-genai SDK for video generation.
+    Requests go through a ProviderRouter, which picks the Veo model tier
+    (or a configured stub provider) by rolling latency and error rate.
     """
 
-    def __init__(self):
-        self.client = genai.Client(api_key=settings.google_ai_api_key)
-        self.model = "veo-3.1-generate-preview"  # Use Veo 3.1 model
+    def __init__(
+        self,
+        cache: GenerationCache | None = None,
+        router: ProviderRouter | None = None,
+    ):
+        self.router = router or ProviderRouter(
+            [provider_from_spec(spec) for spec in settings.video_providers],
+            ProviderStats(redis_client()),
+        )
+        self.model = self.router.providers[0].name  # preferred model, for cache keys
+        self.cache = cache
 
     def generate(
         self,
@@ -57,6 +77,12 @@ class VideoGenerator:
         aspect_ratio: str = "16:9",
         duration_seconds: int = 8,
         style_preset: str | None = None,
+        thumbnail: bool = True,
+        start_frame: Path | None = None,
+        reference_frames: list[Path] | None = None,
+        work_dir: Path | None = None,
+        reroll: bool = False,
+        cancel: threading.Event | None = None,
     ) -> VideoResult:
         """
         Generate video from a prompt using Veo 3.
@@ -67,6 +93,18 @@ class VideoGenerator:
             aspect_ratio: Video aspect ratio ("16:9" or "9:16")
             duration_seconds: Target video duration (4, 6, or 8 seconds)
             style_preset: Optional style preset
+            thumbnail: Extract a thumbnail here; pipelines that transcode to
+                HLS get it from the encode instead
+            start_frame: Image the clip should open on, typically the last
+                frame of the previous segment
+            reference_frames: Asset reference images for visual consistency;
+                Veo only sends them when there is no start_frame
+            work_dir: Directory to download into (a job workspace); a fresh
+                temporary directory if omitted
+            reroll: Skip the generation cache to get a fresh take; the new
+                video replaces the cached one
+            cancel: Set to abandon the generation, e.g. when the job has
+                already failed; provider requests stop at their next poll
             
         Returns:
             VideoResult with local file paths and metadata
@@ -76,6 +114,7 @@ class VideoGenerator:
             prompt_length=len(video_prompt),
             aspect_ratio=aspect_ratio,
             duration=duration_seconds,
+            conditioned=start_frame is not None,
         )
 
         # Enhance prompt with style
@@ -84,58 +123,162 @@ class VideoGenerator:
         # Validate duration (Veo supports 4, 6, or 8 seconds)
         if duration_seconds not in [4, 6, 8]:
             duration_seconds = 8
-        
-        try:
-            # Start video generation
-            logger.info("Calling Veo 3.1 API", model=self.model)
-            
-            operation = self.client.models.generate_videos(
+
+        temp_dir = work_dir or Path(tempfile.mkdtemp())
+        video_path = temp_dir / f"video_{uuid.uuid4().hex[:12]}.mp4"
+
+        # Identical requests reuse the stored video instead of calling Veo
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.key(
                 model=self.model,
                 prompt=enhanced_prompt,
-                config=types.GenerateVideosConfig(
-                    aspect_ratio=aspect_ratio,
-                ),
-            )
-            
-            # Poll for completion
-            logger.info("Waiting for video generation", operation_name=operation.name)
-            while not operation.done:
-                time.sleep(10)
-                operation = self.client.operations.get(operation)
-                logger.info("Still generating...", done=operation.done)
-            
-            # Get the generated video
-            generated_video = operation.response.generated_videos[0]
-            
-            # Download the video
-            self.client.files.download(file=generated_video.video)
-            
-            # Save to temp file
-            temp_dir = Path(tempfile.mkdtemp())
-            video_path = temp_dir / f"video_{int(time.time() * 1000)}.mp4"
-            generated_video.video.save(str(video_path))
-            
-            logger.info("Video downloaded", path=str(video_path))
-            
-            # Generate thumbnail
-            thumbnail_path = self._generate_thumbnail(video_path)
-            
-            # Get duration
-            duration = self._get_video_duration(video_path)
-            
-            return VideoResult(
-                video_path=video_path,
-                thumbnail_path=thumbnail_path,
-                duration=duration,
-                width=1920 if aspect_ratio == "16:9" else 1080,
-                height=1080 if aspect_ratio == "16:9" else 1920,
-                generation_id=operation.name,
-                model_used=self.model,
+                aspect_ratio=aspect_ratio,
+                duration_seconds=duration_seconds,
+                conditioning=[p for p in [start_frame, *(reference_frames or [])[:3]] if p],
             )
-            
-        except Exception as e:
+            cached = None if reroll else self.cache.fetch(cache_key, video_path)
+            if cached:
+                return self._result(
+                    video_path,
+                    aspect_ratio,
+                    thumbnail,
+                    generation_id=cached["generation_id"],
+                    model_used=cached.get("model", self.model),
+                    cache_key=cache_key,
+                    cache_hit=True,
+                )
+
+        request = VideoRequest(
+            prompt=enhanced_prompt,
+            aspect_ratio=aspect_ratio,
+            duration_seconds=duration_seconds,
+            start_frame=start_frame,
+            reference_frames=list(reference_frames or []),
+        )
+        try:
+            output = self.router.generate(request, video_path, cancel=cancel)
+        except ProviderError as e:
             logger.error("Video generation failed", error=str(e))
-            raise VideoGenerationError(f"Veo 3 API error: {str(e)}")
+            raise VideoGenerationError(f"Video provider error: {str(e)}")
+
+        if cache_key:
+            try:
+                self.cache.store(cache_key, video_path, {
+                    "generation_id": output.generation_id,
+                    "model": output.provider,
+                })
+            except Exception as e:
+                logger.warning("Could not cache generated video", error=str(e))
+                cache_key = None
+
+        return self._result(
+            video_path,
+            aspect_ratio,
+            thumbnail,
+            generation_id=output.generation_id,
+            model_used=output.provider,
+            download=output.download,
+            cache_key=cache_key,
+        )
+
+    def generate_shots(
+        self,
+        shots: list[Shot],
+        scene_bible: dict[str, Any] | None = None,
+        aspect_ratio: str = "16:9",
+        thumbnail: bool = True,
+        start_frame: Path | None = None,
+        reference_frames: list[Path] | None = None,
+        work_dir: Path | None = None,
+        reroll: bool = False,
+        cancel: threading.Event | None = None,
+    ) -> VideoResult:
+        """
+        Generate a multi-shot segment, requesting all shots concurrently.
+
+        Only the first shot is conditioned on ``start_frame``; chaining each
+        shot on the previous one would serialize the requests. Reference
+        frames apply to every shot.
+
+        Args:
+            shots: Planned shots in playback order
+            (remaining arguments as for ``generate``)
+
+        Returns:
+            VideoResult for the stitched video, with per-shot results in
+            ``shots``
+        """
+        def generate_shot(shot: Shot) -> VideoResult:
+            return self.generate(
+                video_prompt=shot.prompt,
+                scene_bible=scene_bible,
+                aspect_ratio=aspect_ratio,
+                duration_seconds=shot.duration,
+                thumbnail=thumbnail and len(shots) == 1,
+                start_frame=start_frame if shot.index == 0 else None,
+                reference_frames=reference_frames,
+                work_dir=work_dir,
+                reroll=reroll,
+                cancel=cancel,
+            )
+
+        if len(shots) == 1:
+            return generate_shot(shots[0])
+
+        workers = max(1, min(len(shots), settings.max_parallel_shots))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(generate_shot, shots))
+
+        temp_dir = work_dir or results[0].video_path.parent
+        video_path = stitch_clips(
+            [r.video_path for r in results],
+            temp_dir / f"video_{uuid.uuid4().hex[:12]}_stitched.mp4",
+        )
+        logger.info("Shots stitched", shots=len(results), path=str(video_path))
+
+        result = self._result(
+            video_path,
+            aspect_ratio,
+            thumbnail,
+            generation_id=",".join(r.generation_id for r in results),
+            model_used=",".join(sorted({r.model_used for r in results})),
+            cache_hit=all(r.cache_hit for r in results),
+        )
+        result.shots = results
+        return result
+
+    def _result(
+        self,
+        video_path: Path,
+        aspect_ratio: str,
+        thumbnail: bool,
+        generation_id: str,
+        model_used: str,
+        download: DownloadResult | None = None,
+        cache_key: str | None = None,
+        cache_hit: bool = False,
+    ) -> VideoResult:
+        """Probe a local video and describe it as a VideoResult."""
+        # Generate thumbnail
+        thumbnail_path = self._generate_thumbnail(video_path) if thumbnail else None
+
+        # Probe real duration, dimensions and codecs in one pass
+        media = self._probe(video_path)
+
+        return VideoResult(
+            video_path=video_path,
+            thumbnail_path=thumbnail_path,
+            duration=media.duration if media else 8.0,
+            width=media.width if media else (1920 if aspect_ratio == "16:9" else 1080),
+            height=media.height if media else (1080 if aspect_ratio == "16:9" else 1920),
+            generation_id=generation_id,
+            model_used=model_used,
+            media=media,
+            download=download,
+            cache_key=cache_key,
+            cache_hit=cache_hit,
+        )
 
     def _enhance_prompt(
         self,
@@ -204,27 +347,13 @@ class VideoGenerator:
             logger.warning("Thumbnail generation failed", error=str(e))
             return None
 
-    def _get_video_duration(self, video_path: Path) -> float:
-        """Get video duration using ffprobe."""
+    def _probe(self, video_path: Path) -> MediaInfo | None:
+        """Probe the downloaded video, tolerating probe failures."""
         try:
-            result = subprocess.run(
-                [
-                    "ffprobe",
-                    "-v", "error",
-                    "-show_entries", "format=duration",
-                    "-of", "default=noprint_wrappers=1:nokey=1",
-                    str(video_path),
-                ],
-                capture_output=True,
-                text=True,
-            )
-            
-            if result.returncode == 0:
-                return float(result.stdout.strip())
-            
-            return 8.0  # Default duration
-        except Exception:
-            return 8.0
+            return probe_media(video_path)
+        except (MediaProbeError, OSError, ValueError) as e:
+            logger.warning("Media probe failed", error=str(e))
+            return None
 
 
 def generate_video(
@@ -0,0 +1,245 @@
+"""
+Video Providers - Interchangeable backends that turn a prompt into a clip.
+
+Each provider runs one generation to completion and writes the clip to a
+local path. Providers are described by spec strings such as
+``veo:veo-3.1-generate-preview`` or ``stub:fast?latency=2&failure_rate=0.1``
+so the routing order can be changed from settings. Stub providers render a
+local ffmpeg test pattern and let routing be exercised without API calls.
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+from urllib.parse import parse_qsl
+import random
+import shutil
+import subprocess
+import threading
+import structlog
+
+from google import genai
+from google.genai import errors, types
+
+from src.config import get_settings
+from src.services.clients import genai_client
+from src.services.video_download import DownloadResult, download_video
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+
+class ProviderError(Exception):
+    """A provider failed to produce a clip."""
+    pass
+
+
+class GenerationCancelled(ProviderError):
+    """The request was abandoned, e.g. because a hedged duplicate won."""
+    pass
+
+
+@dataclass
+class VideoRequest:
+    """Everything a provider needs to render one clip."""
+    prompt: str
+    aspect_ratio: str = "16:9"
+    duration_seconds: int = 8
+    start_frame: Path | None = None
+    reference_frames: list[Path] = field(default_factory=list)
+
+
+@dataclass
+class GenerationOutput:
+    """A clip written by a provider."""
+    video_path: Path
+    generation_id: str
+    provider: str
+    download: DownloadResult | None = None
+
+
+class VideoProvider(ABC):
+    """Base class for video generation backends."""
+
+    name: str
+
+    @abstractmethod
+    def generate(
+        self,
+        request: VideoRequest,
+        video_path: Path,
+        cancel: threading.Event,
+    ) -> GenerationOutput:
+        """
+        Render a clip to video_path, blocking until done.
+
+        Implementations should check ``cancel`` while waiting and raise
+        GenerationCancelled once it is set.
+        """
+
+    def is_outage(self, error: Exception) -> bool:
+        """Whether a failure counts against the provider's circuit breaker."""
+        return True
+
+
+class VeoProvider(VideoProvider):
+    """Google Veo via the GenAI SDK."""
+
+    def __init__(self, model: str, client: genai.Client | None = None):
+        self.name = model
+        self.model = model
+        self.client = client or genai_client()
+        self.poll_interval = 10  # seconds
+
+    def generate(
+        self,
+        request: VideoRequest,
+        video_path: Path,
+        cancel: threading.Event,
+    ) -> GenerationOutput:
+        config = types.GenerateVideosConfig(
+            aspect_ratio=request.aspect_ratio,
+            duration_seconds=request.duration_seconds,
+        )
+        # Only one kind of conditioning per request: a first frame and
+        # reference images together are not a documented Veo combination.
+        # The first frame wins, since continuing the previous shot is what
+        # keeps consecutive segments seamless.
+        if request.reference_frames and not request.start_frame:
+            config.reference_images = [
+                types.VideoGenerationReferenceImage(
+                    image=self._load_image(path),
+                    reference_type="asset",
+                )
+                for path in request.reference_frames[:3]
+            ]
+
+        logger.info("Calling Veo API", model=self.model)
+        operation = self.client.models.generate_videos(
+            model=self.model,
+            prompt=request.prompt,
+            image=self._load_image(request.start_frame) if request.start_frame else None,
+            config=config,
+        )
+
+        logger.info("Waiting for video generation", operation_name=operation.name)
+        while not operation.done:
+            if cancel.wait(self.poll_interval):
+                raise GenerationCancelled(f"{self.model} request abandoned")
+            operation = self.client.operations.get(operation)
+            logger.info("Still generating...", done=operation.done)
+
+        if operation.error:
+            raise ProviderError(f"{self.model} failed: {operation.error}")
+        if not operation.response or not operation.response.generated_videos:
+            raise ProviderError(f"{self.model} returned no video")
+
+        video = operation.response.generated_videos[0].video
+        download = None
+        if video.video_bytes:
+            video_path.write_bytes(video.video_bytes)
+        elif video.uri:
+            download = download_video(
+                video.uri,
+                video_path,
+                headers={"x-goog-api-key": settings.google_ai_api_key},
+            )
+        else:
+            raise ProviderError("Generated video has neither bytes nor a URI")
+
+        return GenerationOutput(
+            video_path=video_path,
+            generation_id=operation.name,
+            provider=self.name,
+            download=download,
+        )
+
+    def is_outage(self, error: Exception) -> bool:
+        """Rejected requests (bad input, filtered output) mean Veo is up."""
+        if isinstance(error, errors.ClientError):
+            return error.code == 429
+        return not isinstance(error, ProviderError)
+
+    @staticmethod
+    def _load_image(path: Path) -> types.Image:
+        """Inline a local JPEG frame as a conditioning image."""
+        return types.Image(image_bytes=path.read_bytes(), mime_type="image/jpeg")
+
+
+class StubProvider(VideoProvider):
+    """Local stand-in with configurable latency and failure rate."""
+
+    def __init__(
+        self,
+        name: str,
+        latency: float = 1.0,
+        failure_rate: float = 0.0,
+        source: str | None = None,
+    ):
+        self.name = f"stub:{name}"
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.source = Path(source) if source else None
+
+    def generate(
+        self,
+        request: VideoRequest,
+        video_path: Path,
+        cancel: threading.Event,
+    ) -> GenerationOutput:
+        if cancel.wait(self.latency):
+            raise GenerationCancelled(f"{self.name} request abandoned")
+        if random.random() < self.failure_rate:
+            raise ProviderError(f"{self.name} simulated failure")
+
+        if self.source:
+            shutil.copyfile(self.source, video_path)
+        else:
+            width, height = (1280, 720) if request.aspect_ratio == "16:9" else (720, 1280)
+            result = subprocess.run(
+                [
+                    "ffmpeg", "-y", "-v", "error",
+                    "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate=24",
+                    "-f", "lavfi", "-i", "sine=frequency=440",
+                    "-t", str(request.duration_seconds),
+                    "-c:v", "libx264", "-preset", "ultrafast",
+                    "-c:a", "aac", "-shortest",
+                    str(video_path),
+                ],
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode != 0:
+                raise ProviderError(f"{self.name} could not render: {result.stderr[-300:]}")
+
+        return GenerationOutput(
+            video_path=video_path,
+            generation_id=f"{self.name}:{video_path.stem}",
+            provider=self.name,
+        )
+
+
+PROVIDER_FACTORIES: dict[str, Callable[..., VideoProvider]] = {
+    "veo": lambda name, **options: VeoProvider(name),
+    "stub": lambda name, **options: StubProvider(
+        name,
+        latency=float(options.get("latency", 1.0)),
+        failure_rate=float(options.get("failure_rate", 0.0)),
+        source=options.get("source"),
+    ),
+}
+
+
+def register_provider(kind: str, factory: Callable[..., VideoProvider]) -> None:
+    """Make a provider kind available to ``provider_from_spec``."""
+    PROVIDER_FACTORIES[kind] = factory
+
+
+def provider_from_spec(spec: str) -> VideoProvider:
+    """Build a provider from ``kind:name[?option=value&...]``."""
+    kind, _, rest = spec.partition(":")
+    name, _, query = rest.partition("?")
+    if kind not in PROVIDER_FACTORIES or not name:
+        raise ValueError(f"Unknown video provider spec: {spec}")
+    return PROVIDER_FACTORIES[kind](name, **dict(parse_qsl(query)))
@@ -0,0 +1,172 @@
+"""
+Visual Continuity - Scores whether a segment visually continues the previous one.
+
+For the first and last frame of each segment a compact signature is kept:
+a normalized 8x8x8 RGB color histogram and a 64-bit DCT perceptual hash.
+Signatures are stored in the internal bucket next to the segment's other
+processing artifacts, so scoring a new segment against its predecessor only
+decodes the new clip and costs milliseconds of NumPy work.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+import subprocess
+import numpy as np
+import structlog
+
+from src.config import get_settings
+from src.services.storage import StorageService
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+FRAME_SIZE = 64  # frames are decoded as FRAME_SIZE x FRAME_SIZE RGB
+HASH_SIZE = 32  # DCT input size for the perceptual hash
+HIST_BINS = 8  # per channel
+
+
+class VisualContinuityError(Exception):
+    """Error extracting signatures, or a segment failing the continuity gate."""
+    pass
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II basis."""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT = _dct_matrix(HASH_SIZE)
+
+
+@dataclass
+class FrameSignature:
+    """Compact visual fingerprint of one frame."""
+    histogram: np.ndarray  # HIST_BINS**3 floats summing to 1
+    phash: int  # 64-bit perceptual hash
+
+    @classmethod
+    def from_frame(cls, frame: np.ndarray) -> "FrameSignature":
+        """Build a signature from an RGB uint8 frame."""
+        quantized = (frame // (256 // HIST_BINS)).astype(np.int32)
+        bins = (quantized[..., 0] * HIST_BINS + quantized[..., 1]) * HIST_BINS + quantized[..., 2]
+        histogram = np.bincount(bins.ravel(), minlength=HIST_BINS**3).astype(np.float32)
+        histogram /= histogram.sum()
+
+        gray = frame.astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        step = FRAME_SIZE // HASH_SIZE
+        gray = gray.reshape(HASH_SIZE, step, HASH_SIZE, step).mean(axis=(1, 3))
+        low = (_DCT @ gray @ _DCT.T)[:8, :8].ravel()
+        bits = low > np.median(low[1:])
+        phash = int("".join("1" if b else "0" for b in bits), 2)
+
+        return cls(histogram=histogram, phash=phash)
+
+    def similarity(self, other: "FrameSignature") -> float:
+        """Similarity in [0, 1]: mean of histogram intersection and hash agreement."""
+        hist_score = float(np.minimum(self.histogram, other.histogram).sum())
+        hash_score = 1 - bin(self.phash ^ other.phash).count("1") / 64
+        return (hist_score + hash_score) / 2
+
+    def to_dict(self) -> dict:
+        return {
+            "histogram": [round(float(v), 5) for v in self.histogram],
+            "phash": f"{self.phash:016x}",
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FrameSignature":
+        return cls(
+            histogram=np.asarray(data["histogram"], dtype=np.float32),
+            phash=int(data["phash"], 16),
+        )
+
+
+class VisualContinuityChecker:
+    """Extracts, stores and compares boundary-frame signatures of segments."""
+
+    def __init__(self, storage: StorageService | None = None):
+        self.storage = storage or StorageService()
+        self._cache: dict[str, dict[str, FrameSignature]] = {}
+
+    def extract(self, source: str | Path) -> dict[str, FrameSignature]:
+        """Signatures of the first and last frame of a local file or URL."""
+        return {
+            "first": FrameSignature.from_frame(self._decode_frame(source, from_end=False)),
+            "last": FrameSignature.from_frame(self._decode_frame(source, from_end=True)),
+        }
+
+    def save(self, scene_id: str, segment_id: str, signatures: dict[str, FrameSignature]) -> None:
+        """Store a segment's signatures next to its other artifacts."""
+        self.storage.put_json(
+            self._key(scene_id, segment_id),
+            {name: sig.to_dict() for name, sig in signatures.items()},
+            self.storage.internal_bucket,
+        )
+        self._cache[segment_id] = signatures
+
+    def load(self, scene_id: str, segment_id: str) -> dict[str, FrameSignature]:
+        """
+        Signatures of a published segment.
+
+        Segments published before signatures existed are extracted from
+        their source video once and stored.
+        """
+        if segment_id in self._cache:
+            return self._cache[segment_id]
+
+        data = self.storage.get_json(self._key(scene_id, segment_id), self.storage.internal_bucket)
+        if data:
+            signatures = {name: FrameSignature.from_dict(sig) for name, sig in data.items()}
+            self._cache[segment_id] = signatures
+            return signatures
+
+        source = self.storage.get_signed_url(
+            self.storage.segment_source_key(scene_id, segment_id)
+        )
+        signatures = self.extract(source)
+        self.save(scene_id, segment_id, signatures)
+        return signatures
+
+    def score(
+        self,
+        previous: dict[str, FrameSignature],
+        current: dict[str, FrameSignature],
+    ) -> float:
+        """How well the current segment's opening matches the previous ending."""
+        return round(previous["last"].similarity(current["first"]), 4)
+
+    @staticmethod
+    def _key(scene_id: str, segment_id: str) -> str:
+        return f"scenes/{scene_id}/segments/{segment_id}/signatures.json"
+
+    @staticmethod
+    def _decode_frame(source: str | Path, from_end: bool) -> np.ndarray:
+        """Decode the first or last frame as a small RGB array."""
+        cmd = ["ffmpeg", "-v", "error"]
+        if from_end:
+            cmd += ["-sseof", "-1"]
+        cmd += [
+            "-i", str(source),
+            "-vf", f"scale={FRAME_SIZE}:{FRAME_SIZE}:flags=area",
+            "-f", "rawvideo",
+            "-pix_fmt", "rgb24",
+        ]
+        if not from_end:
+            cmd += ["-frames:v", "1"]
+        cmd.append("pipe:1")
+
+        try:
+            result = subprocess.run(cmd, capture_output=True)
+        except OSError as e:
+            raise VisualContinuityError(f"Could not run ffmpeg: {e}") from e
+        frame_bytes = FRAME_SIZE * FRAME_SIZE * 3
+        if result.returncode != 0 or len(result.stdout) < frame_bytes:
+            raise VisualContinuityError(f"Could not decode frame: {result.stderr.decode()[-500:]}")
+
+        # With -sseof, every frame of the last second is emitted; keep the final one
+        data = result.stdout[-frame_bytes:] if from_end else result.stdout[:frame_bytes]
+        return np.frombuffer(data, dtype=np.uint8).reshape(FRAME_SIZE, FRAME_SIZE, 3)
@@ -0,0 +1,194 @@
+"""
+Workspace - Per-job scratch directories with quotas and guaranteed cleanup.
+
+Every job gets its own directory under the workspace root (or under a tmpfs
+root while it has room for a full job). Directories carry an owner marker
+with the creating PID, so those left behind by crashed or killed workers are
+recognised and removed by the orphan sweeper on worker start, or whenever
+the global quota is reached.
+"""
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+import json
+import os
+import shutil
+import socket
+import time
+import uuid
+import structlog
+
+from src.config import get_settings
+from src.metrics import (
+    WORKSPACE_ACTIVE,
+    WORKSPACE_BYTES,
+    WORKSPACE_FREE_BYTES,
+    WORKSPACE_ORPHANS_REMOVED,
+)
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+OWNER_FILE = ".owner"
+
+
+class WorkspaceQuotaError(Exception):
+    """A job or the worker exceeded its scratch space quota."""
+    pass
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+@dataclass
+class Workspace:
+    """Scratch directory owned by one job."""
+    path: Path
+    job_id: str
+    quota_bytes: int
+
+    def usage(self) -> int:
+        return _dir_size(self.path)
+
+    def check_quota(self) -> int:
+        """
+        Raise if the job has written more than its quota.
+
+        Returns:
+            Bytes currently used
+        """
+        used = self.usage()
+        if used > self.quota_bytes:
+            raise WorkspaceQuotaError(
+                f"Job {self.job_id} uses {used} bytes of scratch space "
+                f"(quota {self.quota_bytes})"
+            )
+        return used
+
+    def subdir(self, name: str) -> Path:
+        path = self.path / name
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+
+class WorkspaceManager:
+    """Allocates, meters and cleans up job scratch directories."""
+
+    def __init__(self):
+        self.root = Path(settings.workspace_dir)
+        tmpfs_dir = settings.workspace_tmpfs_dir
+        self.tmpfs_root = Path(tmpfs_dir) if tmpfs_dir else None
+        self.job_quota = settings.workspace_job_max_bytes
+        self.total_quota = settings.workspace_max_bytes
+        self.orphan_age = settings.workspace_orphan_age_hours * 3600
+        for root in self.roots():
+            root.mkdir(parents=True, exist_ok=True)
+
+    def roots(self) -> list[Path]:
+        return [r for r in (self.tmpfs_root, self.root) if r is not None]
+
+    def create(self, job_id: str) -> Workspace:
+        """
+        Allocate a scratch directory for a job.
+
+        Raises:
+            WorkspaceQuotaError: Live workspaces already use the global
+                quota, even after sweeping orphans
+        """
+        if self.usage() + self.job_quota > self.total_quota:
+            self.sweep_orphans()
+            if self.usage() + self.job_quota > self.total_quota:
+                raise WorkspaceQuotaError(
+                    f"Scratch space exhausted ({self.total_quota} bytes in use or reserved)"
+                )
+
+        path = self._pick_root() / f"{job_id}-{uuid.uuid4().hex[:8]}"
+        path.mkdir(parents=True)
+        (path / OWNER_FILE).write_text(json.dumps({
+            "job_id": job_id,
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "created": time.time(),
+        }))
+        WORKSPACE_ACTIVE.inc()
+        logger.debug("Workspace allocated", job_id=job_id, path=str(path))
+        return Workspace(path=path, job_id=job_id, quota_bytes=self.job_quota)
+
+    def release(self, workspace: Workspace) -> None:
+        """Delete a job's scratch directory."""
+        shutil.rmtree(workspace.path, ignore_errors=True)
+        WORKSPACE_ACTIVE.dec()
+        self.report()
+
+    @contextmanager
+    def allocate(self, job_id: str) -> Iterator[Workspace]:
+        """Scratch directory removed when the block exits, however it exits."""
+        workspace = self.create(job_id)
+        try:
+            yield workspace
+        finally:
+            self.release(workspace)
+
+    def usage(self) -> int:
+        return sum(_dir_size(root) for root in self.roots())
+
+    def sweep_orphans(self) -> int:
+        """
+        Remove workspaces whose owning process is gone or that are too old.
+
+        Returns:
+            Number of directories removed
+        """
+        removed = 0
+        host = socket.gethostname()
+        for root in self.roots():
+            for path in root.iterdir():
+                if path.is_dir() and self._is_orphan(path, host):
+                    shutil.rmtree(path, ignore_errors=True)
+                    WORKSPACE_ORPHANS_REMOVED.inc()
+                    removed += 1
+        if removed:
+            logger.info("Orphaned workspaces removed", count=removed)
+        self.report()
+        return removed
+
+    def report(self) -> None:
+        """Publish disk usage metrics."""
+        for root in self.roots():
+            WORKSPACE_BYTES.labels(root=str(root)).set(_dir_size(root))
+            WORKSPACE_FREE_BYTES.labels(root=str(root)).set(shutil.disk_usage(root).free)
+
+    def _pick_root(self) -> Path:
+        """tmpfs while it can hold a full job, disk otherwise."""
+        if self.tmpfs_root and shutil.disk_usage(self.tmpfs_root).free >= self.job_quota:
+            return self.tmpfs_root
+        return self.root
+
+    def _is_orphan(self, path: Path, host: str) -> bool:
+        try:
+            owner = json.loads((path / OWNER_FILE).read_text())
+        except (OSError, ValueError):
+            # No marker: legacy or half-created directory; judge by age
+            return time.time() - path.stat().st_mtime > self.orphan_age
+
+        if time.time() - owner.get("created", 0) > self.orphan_age:
+            return True
+        if owner.get("host") != host:
+            return False  # shared volume; only the owning host can tell
+        try:
+            os.kill(owner["pid"], 0)
+        except ProcessLookupError:
+            return True
+        except (PermissionError, KeyError, TypeError):
+            return False
+        return False
@@ -0,0 +1,71 @@
+"""
+Scene export task - compiles a scene's completed segments into one MP4.
+
+Queued by ``generate_segment`` and the BullMQ worker whenever a segment
+completes (see ``scene_export_on_complete``), and can be queued on demand
+with ``export_scene.delay(scene_id)``.
+"""
+
+from celery import shared_task
+from redis.exceptions import LockError
+import structlog
+
+from src.config import get_settings
+from src.services.database import DatabaseService
+from src.services.scene_exporter import SceneExporter
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+
+@shared_task(
+    bind=True,
+    max_retries=3,
+    default_retry_delay=60,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_jitter=True,
+)
+def export_scene(self, scene_id: str) -> dict:
+    """
+    Build or extend the full-scene MP4 export.
+
+    Re-running after a new segment completes appends it to the previous
+    export by stream copy instead of rebuilding the whole file. Exports of
+    one scene never run concurrently: while another is running the task is
+    re-queued, and that run picks up every segment completed by then.
+    """
+    log = logger.bind(scene_id=scene_id)
+    log.info("Starting scene export")
+
+    db = DatabaseService()
+    lock = db.redis.lock(f"scene-export:{scene_id}", timeout=settings.scene_export_lock_seconds)
+    if not lock.acquire(blocking=False):
+        log.info("Scene export already running, re-queueing")
+        export_scene.apply_async((scene_id,), countdown=settings.scene_export_busy_delay)
+        return {"success": False, "scene_id": scene_id, "reason": "busy"}
+
+    try:
+        segments = db.get_completed_segments(scene_id)
+        if not segments:
+            log.info("No completed segments to export")
+            return {"success": False, "scene_id": scene_id, "reason": "no_completed_segments"}
+
+        result = SceneExporter().export(scene_id, segments)
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            # Outlived the lock timeout; it has expired already
+            log.warning("Scene export lock expired before release")
+
+    log.info("Scene export finished", mode=result.mode, segments=len(result.segment_ids))
+
+    return {
+        "success": True,
+        "scene_id": scene_id,
+        "export_url": result.export_url,
+        "segment_count": len(result.segment_ids),
+        "duration": result.duration,
+        "mode": result.mode,
+    }
@@ -9,17 +9,34 @@ This task orchestrates the full video generation pipeline:
 5. Uploads to S3 storage
 """
 
+from concurrent.futures import ThreadPoolExecutor
+import random
+import threading
+import time
+
 from celery import shared_task
 from celery.exceptions import MaxRetriesExceededError
 import structlog
 
 from src.config import get_settings
+from src.metrics import JOBS_PARKED, SEGMENT_TIME_TO_PLAYABLE, StageTimer
 from src.services.database import DatabaseService
 from src.services.storage import StorageService
-from src.services.script_expander import ScriptExpander, PreviousSegment
+from src.services.script_expander import ExpandedScript, ScriptExpander, PreviousSegment
 from src.services.continuity import ContinuityValidator
-from src.services.video_generator import VideoGenerator
+from src.services.video_generator import VideoGenerator, VideoResult
 from src.services.hls_builder import HLSBuilder
+from src.services.encoding_policy import EncodingPolicyEngine
+from src.services.quality_gate import FrameQualityAnalyzer, QualityGateError
+from src.services.visual_continuity import VisualContinuityChecker, VisualContinuityError
+from src.services.frame_cache import BoundaryFrameCache, BoundaryFrames, FrameCacheError
+from src.services.workspace import WorkspaceManager
+from src.services.generation_cache import GenerationCache
+from src.services.expansion_cache import ExpansionCache
+from src.services.clip_planner import ClipPlanner
+from src.services.circuit_breaker import CircuitOpenError, require_any
+from src.services.scene_summary import SceneSummarizer
+from src.tasks.export import export_scene
 
 logger = structlog.get_logger()
 settings = get_settings()
@@ -30,6 +47,7 @@ settings = get_settings()
     max_retries=3,
     default_retry_delay=60,
     autoretry_for=(Exception,),
+    dont_autoretry_for=(CircuitOpenError,),
     retry_backoff=True,
     retry_jitter=True,
 )
@@ -38,6 +56,8 @@ def generate_segment(
     job_id: str,
     scene_id: str,
     segment_id: str,
+    reroll: bool = False,
+    parks: int = 0,
 ) -> dict:
     """
     Main task for generating a video segment.
@@ -49,14 +69,37 @@ def generate_segment(
     4. HLS Processing - Transcode to HLS format
     5. Upload - Upload to S3
     6. Finalization - Update database, notify client
+
+    ``reroll`` requests a fresh take even when an identical generation
+    request is cached. While OpenAI or every video provider has an open
+    circuit the job is parked: re-queued with a delay instead of occupying
+    the worker, at most ``circuit_max_parks`` times (counted in ``parks``).
     """
     log = logger.bind(job_id=job_id, scene_id=scene_id, segment_id=segment_id)
     log.info("Starting segment generation")
 
     db = DatabaseService()
     storage = StorageService()
+    timer = StageTimer()
+    workspaces = WorkspaceManager()
+    workspace = None
+    # Video generation runs here so it can start mid-expansion
+    video_pool = ThreadPoolExecutor(max_workers=1)
+    video_cancel = threading.Event()  # stops it if the job fails first
 
     try:
+        expander = ScriptExpander(
+            cache=ExpansionCache(db.redis) if settings.expansion_cache_enabled else None
+        )
+        generation_cache = (
+            GenerationCache(storage, db.redis) if settings.generation_cache_enabled else None
+        )
+        generator = VideoGenerator(cache=generation_cache)
+
+        # Fail fast while a provider we depend on is known to be down
+        require_any([expander.breaker])
+        require_any(list(generator.router.breakers.values()))
+
         # Get job and segment data
         job = db.get_job(job_id)
         segment = db.get_segment(segment_id)
@@ -65,6 +108,9 @@ def generate_segment(
         if not all([job, segment, scene]):
             raise ValueError("Missing job, segment, or scene data")
 
+        # Scratch space for the video, HLS output and images
+        workspace = workspaces.create(job_id)
+
         # Get scene bible for continuity
         scene_bible = db.get_scene_bible(scene_id)
         
@@ -79,25 +125,59 @@ def generate_segment(
             )
             for s in previous_segments
         ]
+        previous_id = next(
+            (s["id"] for s in reversed(previous_segments) if s.get("status") == "COMPLETED"),
+            None,
+        )
 
         # Build scene context
         scene_context = {
             "title": scene.get("title", ""),
             "description": scene.get("description", ""),
             "topic": scene.get("topic", {}).get("title", "") if scene.get("topic") else "",
+            "summary": scene.get("summary"),
+            "summary_through": scene.get("summary_through"),
         }
 
+        # Condition on the previous segment's cached boundary frames
+        frame_cache = BoundaryFrameCache(storage) if settings.frame_cache_enabled else None
+        reference = get_reference_frames(frame_cache, scene_id, previous_id)
+
+        video_job: dict = {}  # planned shots and the running generation
+
+        def start_video(script: ExpandedScript) -> None:
+            # Segments longer than one Veo clip are generated as concurrent shots
+            video_job["shots"] = ClipPlanner().plan(script)
+            video_job["future"] = video_pool.submit(
+                generator.generate_shots,
+                video_job["shots"],
+                scene_bible=scene_bible,
+                aspect_ratio="16:9",
+                thumbnail=False,  # taken from the HLS encode instead
+                start_frame=reference.last_frame if reference else None,
+                reference_frames=reference.keyframes if reference else None,
+                work_dir=workspace.path,
+                reroll=reroll,
+                cancel=video_cancel,
+            )
+
         # Stage 1: Script Expansion via OpenAI ChatGPT
         log.info("Stage 1: Script expansion via OpenAI")
+        timer.start("script_expansion")
         update_progress(db, job_id, 10, "script_expanding")
 
-        expander = ScriptExpander()
-        expanded = expander.expand(
-            user_prompt=segment["prompt"],
-            scene_context=scene_context,
-            scene_bible=scene_bible,
-            previous_segments=prev_segment_objs,
-        )
+        expansion_args = {
+            "user_prompt": segment["prompt"],
+            "scene_context": scene_context,
+            "scene_bible": scene_bible,
+            "previous_segments": prev_segment_objs,
+            "refresh": reroll,  # a re-roll asks for a new take on the script too
+        }
+        if settings.script_streaming_enabled:
+            # The video starts as soon as its fields have streamed in
+            expanded = expander.expand_streaming(**expansion_args, on_early=start_video)
+        else:
+            expanded = expander.expand(**expansion_args)
 
         # Save expanded script and video prompt
         db.update_segment(segment_id, {
@@ -113,6 +193,7 @@ def generate_segment(
 
         # Stage 2: Continuity Validation
         log.info("Stage 2: Continuity validation")
+        timer.start("continuity")
         update_progress(db, job_id, 30, "continuity_checking")
 
         validator = ContinuityValidator()
@@ -137,75 +218,186 @@ def generate_segment(
 
         # Stage 3: Video Generation via Google Veo 3
         log.info("Stage 3: Video generation via Google Veo 3")
+        timer.start("video_generation")
         update_progress(db, job_id, 45, "generating_video")
 
-        generator = VideoGenerator()
-        video_result = generator.generate(
-            video_prompt=expanded.video_prompt or expanded.full_script[:500],
-            scene_bible=scene_bible,
-            aspect_ratio="16:9",
-            duration_seconds=int(expanded.duration_estimate) or 8,
-        )
+        if "future" in video_job:
+            log.info("Video generation started during script expansion")
+        else:
+            start_video(expanded)
+        shots = video_job["shots"]
+        video_result = video_job["future"].result()
+        workspace.check_quota()
 
         update_progress(db, job_id, 70, "video_generated")
+        generated_at = time.monotonic()
         
         log.info(
             "Video generated",
             duration=video_result.duration,
             model=video_result.model_used,
+            shots=len(shots),
+            cache_hit=video_result.cache_hit,
         )
 
+        # Quality gate: reject black/frozen/flickering clips before transcoding
+        quality = None
+        if settings.quality_gate_enabled:
+            timer.start("quality_check")
+            update_progress(db, job_id, 72, "quality_checking")
+            quality = FrameQualityAnalyzer().analyze(video_result.video_path, video_result.media)
+            log.info("Quality analysis", **quality.to_dict())
+            if not quality.passed:
+                forget_generation(generation_cache, video_result)
+                raise QualityGateError(quality)
+
+        # Visual continuity: compare our opening frame with the previous ending
+        continuity_checker = None
+        visual_signatures = None
+        visual_score = None
+        if settings.visual_continuity_enabled:
+            continuity_checker = VisualContinuityChecker(storage)
+            try:
+                visual_signatures = continuity_checker.extract(video_result.video_path)
+            except VisualContinuityError as e:
+                # An optional check; never worth regenerating the video over
+                log.warning("Could not extract visual signatures, skipping score", error=str(e))
+            previous_signatures = None
+            if visual_signatures and previous_id:
+                try:
+                    previous_signatures = continuity_checker.load(scene_id, previous_id)
+                except VisualContinuityError as e:
+                    log.warning("Previous segment signatures unavailable", error=str(e))
+            if previous_signatures:
+                visual_score = continuity_checker.score(previous_signatures, visual_signatures)
+                log.info("Visual continuity scored", score=visual_score, previous=previous_id)
+                if visual_score < settings.visual_continuity_min_score:
+                    forget_generation(generation_cache, video_result)
+                    raise VisualContinuityError(
+                        f"Visual continuity score {visual_score} below "
+                        f"{settings.visual_continuity_min_score}"
+                    )
+
         # Stage 4: HLS Processing
         log.info("Stage 4: HLS processing")
+        timer.start("hls")
         update_progress(db, job_id, 75, "processing_hls")
 
+        policy = EncodingPolicyEngine(db.redis).choose(priority=job.get("priority") or 0)
+
+        # Make the segment playable from the lowest rendition while the
+        # rest of the ladder encodes; the master playlist is swapped later
+        published_hls: set[str] = set()
+        preview_url = None
+
+        def publish_preview(preview) -> None:
+            nonlocal preview_url
+            try:
+                preview_url = storage.publish_hls(
+                    segment_id, scene_id, preview.output_dir, published_hls
+                )
+                db.update_segment(segment_id, {"hls_url": preview_url})
+                SEGMENT_TIME_TO_PLAYABLE.observe(time.monotonic() - generated_at)
+                update_progress(db, job_id, 78, "preview_ready")
+                log.info("Preview rendition published", hls_url=preview_url)
+            except Exception as e:
+                log.warning("Preview publish failed", error=str(e))
+
         hls_builder = HLSBuilder()
         hls_result = hls_builder.process(
-            video_path=video_result.local_path,
+            video_path=video_result.video_path,
             segment_id=segment_id,
+            policy=policy,
+            media=video_result.media,
+            on_progress=lambda fraction: update_progress(
+                db, job_id, 75 + int(fraction * 10), "processing_hls"
+            ),
+            thumbnail_time=quality.best_frame_time if quality else 0.0,
+            on_preview=publish_preview if settings.progressive_publish_enabled else None,
         )
 
+        workspace.check_quota()
         update_progress(db, job_id, 85, "hls_processed")
 
         # Stage 5: Upload to S3
         log.info("Stage 5: Uploading to S3")
+        timer.start("upload")
         update_progress(db, job_id, 90, "uploading")
 
         upload_result = storage.upload_segment(
             segment_id=segment_id,
             scene_id=scene_id,
-            video_path=video_result.local_path,
+            video_path=video_result.video_path,
             hls_path=hls_result.output_dir,
-            thumbnail_path=video_result.thumbnail_path,
+            thumbnail_path=hls_result.thumbnail_path,
+            published_hls=published_hls,
+            images_dir=hls_result.images_dir,
         )
+        if preview_url is None:
+            SEGMENT_TIME_TO_PLAYABLE.observe(time.monotonic() - generated_at)
 
         # Stage 6: Finalization
         log.info("Stage 6: Finalizing")
+        timer.start("finalize")
         update_progress(db, job_id, 95, "finalizing")
 
+        if continuity_checker and visual_signatures:
+            continuity_checker.save(scene_id, segment_id, visual_signatures)
+        if frame_cache:
+            try:
+                frame_cache.store(scene_id, segment_id, video_result.video_path)
+            except FrameCacheError as e:
+                log.warning("Could not cache boundary frames", error=str(e))
+
         # Update segment with URLs
         db.update_segment(segment_id, {
-            "status": "completed",
+            "status": "COMPLETED",
             "video_url": upload_result.video_url,
             "hls_url": upload_result.hls_url,
             "thumbnail_url": upload_result.thumbnail_url,
             "duration": video_result.duration,
+            "continuity_hash": (
+                f"{visual_signatures['last'].phash:016x}" if visual_signatures else None
+            ),
         })
 
+        # Follow-up work on the scene; queued first so nothing below can skip it
+        if settings.scene_export_on_complete:
+            try:
+                export_scene.delay(scene_id)
+            except Exception as e:
+                log.warning("Could not queue scene export", error=str(e))
+        if settings.scene_summary_enabled:
+            try:
+                update_scene_summary.delay(scene_id)
+            except Exception as e:
+                log.warning("Could not queue scene summary update", error=str(e))
+
         # Update scene
         db.update_scene_stats(scene_id)
 
         # Update Scene Bible with new content
-        bible_updates = validator.extract_bible_updates(expanded_script)
+        bible_updates = validator.extract_bible_updates(expanded.full_script)
         if bible_updates:
             db.update_scene_bible(scene_id, bible_updates)
 
+        timer.stop()
+
         # Mark job complete
         db.complete_job(job_id, {
             "segment_id": segment_id,
             "video_url": upload_result.video_url,
             "hls_url": upload_result.hls_url,
             "duration": video_result.duration,
+            "poster_urls": upload_result.poster_urls,
+            "trickplay_url": upload_result.trickplay_url,
+            "encoding": hls_result.encoding,
+            "media": video_result.media.to_dict() if video_result.media else None,
+            "generation_cache_hit": video_result.cache_hit,
+            "expansion_usage": expanded.usage,
+            "quality": quality.to_dict() if quality else None,
+            "visual_continuity": visual_score,
+            "stage_seconds": timer.timings,
         })
 
         log.info("Segment generation completed successfully")
@@ -216,10 +408,39 @@ def generate_segment(
             "video_url": upload_result.video_url,
         }
 
+    except CircuitOpenError as e:
+        if parks >= settings.circuit_max_parks:
+            log.error("Provider still unavailable, giving up", provider=e.provider, parks=parks)
+            db.fail_job(job_id, str(e))
+            db.update_segment(segment_id, {"status": "FAILED"})
+            raise
+
+        # Jitter so parked jobs don't all probe the provider at once
+        countdown = e.retry_after + random.uniform(0, settings.circuit_reset_seconds / 4)
+        log.warning(
+            "Provider circuit open, parking job",
+            provider=e.provider,
+            countdown=round(countdown),
+            parks=parks + 1,
+        )
+        update_progress(db, job_id, 0, "waiting_for_provider")
+        self.apply_async(
+            args=(job_id, scene_id, segment_id),
+            kwargs={"reroll": reroll, "parks": parks + 1},
+            countdown=countdown,
+        )
+        JOBS_PARKED.inc()
+        return {
+            "success": False,
+            "segment_id": segment_id,
+            "parked": True,
+            "retry_after": round(countdown),
+        }
+
     except MaxRetriesExceededError:
         log.error("Max retries exceeded")
         db.fail_job(job_id, "Max retries exceeded")
-        db.update_segment(segment_id, {"status": "failed"})
+        db.update_segment(segment_id, {"status": "FAILED"})
         raise
 
     except Exception as e:
@@ -230,23 +451,90 @@ def generate_segment(
             raise self.retry(exc=e)
         
         db.fail_job(job_id, str(e))
-        db.update_segment(segment_id, {"status": "failed"})
+        db.update_segment(segment_id, {"status": "FAILED"})
         raise
 
+    finally:
+        # A generation still running after a failure would keep billing and
+        # write into the workspace; stop it and wait before releasing that
+        video_cancel.set()
+        video_pool.shutdown(wait=True, cancel_futures=True)
+        if workspace:
+            workspaces.release(workspace)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def update_scene_summary(self, scene_id: str) -> dict:
+    """
+    Fold completed segments that the scene summary doesn't cover into it.
+
+    Segments are folded one at a time in order, storing the summary after
+    each, so a failure loses at most one step and the next run catches up.
+    Failed segments are skipped. Folding stops at the first segment that
+    is still pending or generating: the summary always covers a contiguous
+    prefix of the scene, so a segment that completes after its successor
+    is still folded in once it does.
+    """
+    log = logger.bind(scene_id=scene_id)
+    db = DatabaseService()
+    scene = db.get_scene(scene_id)
+    if not scene:
+        return {"updated": 0}
+
+    summary = scene.get("summary")
+    through = scene.get("summary_through")
+    pending = []
+    for segment in db.get_scene_segments(scene_id):
+        if through is not None and segment["order_index"] <= through:
+            continue
+        if segment["status"] == "FAILED":
+            continue
+        if segment["status"] != "COMPLETED":
+            break
+        pending.append(segment)
+
+    summarizer = SceneSummarizer()
+    folded = 0
+    try:
+        for segment in pending:
+            summary = summarizer.fold(summary, segment)
+            if not db.update_scene_summary(scene_id, summary, segment["order_index"]):
+                log.info("Scene summary already advanced elsewhere")
+                break
+            folded += 1
+    except CircuitOpenError as e:
+        raise self.retry(exc=e, countdown=e.retry_after)
+    except Exception as e:
+        log.error("Scene summary update failed", error=str(e), folded=folded)
+        raise self.retry(exc=e)
+
+    return {"updated": folded}
+
 
 def update_progress(db: DatabaseService, job_id: str, progress: int, stage: str) -> None:
     """Update job progress and publish to Redis for real-time updates."""
     db.update_job_progress(job_id, progress, stage)
 
 
-def get_reference_frames(db: DatabaseService, scene_id: str) -> list[str]:
-    """Get reference frames for character consistency."""
-    bible = db.get_scene_bible(scene_id)
-    if not bible:
-        return []
+def forget_generation(cache: GenerationCache | None, video_result: VideoResult) -> None:
+    """Keep a rejected video (or its shots) from being served to the retry."""
+    if not cache:
+        return
+    for result in [video_result, *video_result.shots]:
+        if result.cache_key:
+            cache.invalidate(result.cache_key)
 
-    frames = []
-    for character in bible.get("characters", {}).values():
-        frames.extend(character.get("reference_frames", []))
 
-    return frames[:10]  # Limit to 10 reference frames
+def get_reference_frames(
+    frame_cache: BoundaryFrameCache | None,
+    scene_id: str,
+    previous_id: str | None,
+) -> BoundaryFrames | None:
+    """Boundary frames of the previous completed segment, for conditioning."""
+    if not frame_cache or not previous_id:
+        return None
+    try:
+        return frame_cache.get(scene_id, previous_id)
+    except Exception as e:
+        logger.warning("Reference frames unavailable", previous_id=previous_id, error=str(e))
+        return None
@@ -0,0 +1,34 @@
+"""
+Maintenance tasks - periodic housekeeping for worker caches.
+"""
+
+from celery import shared_task
+import structlog
+
+from src.config import get_settings
+from src.services.clients import redis_client
+from src.services.generation_cache import GenerationCache
+from src.services.storage import StorageService
+from src.services.transcode_cache import TranscodeCache
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+
+@shared_task
+def sweep_transcode_cache() -> dict:
+    """Evict expired transcode cache entries from both tiers."""
+    cache = TranscodeCache()
+    cache.evict_local()
+    removed = cache.evict_remote()
+    logger.info("Transcode cache swept", remote_removed=removed)
+    return {"remote_removed": removed}
+
+
+@shared_task
+def sweep_generation_cache() -> dict:
+    """Evict expired and over-budget generation cache entries."""
+    cache = GenerationCache(StorageService(), redis_client())
+    removed = cache.evict()
+    logger.info("Generation cache swept", removed=removed)
+    return {"removed": removed}
@@ -1,5 +1,10 @@
+from billiard.process import current_process
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown, worker_ready
+from prometheus_client import start_http_server
 from src.config import get_settings
+from src.services import clients
+from src.services.workspace import WorkspaceManager
 
 settings = get_settings()
 
@@ -8,7 +13,7 @@ app = Celery(
     "storyforge-generator",
     broker=settings.redis_url,
     backend=settings.redis_url,
-    include=["src.tasks.generation"],
+    include=["src.tasks.generation", "src.tasks.export", "src.tasks.maintenance"],
 )
 
 # Configure Celery
@@ -41,8 +46,50 @@ app.conf.update(
     # Routing
     task_routes={
         "src.tasks.generation.*": {"queue": "generation"},
+        "src.tasks.export.*": {"queue": "export"},
+        "src.tasks.maintenance.*": {"queue": "maintenance"},
+    },
+
+    # Periodic tasks (run with celery beat)
+    beat_schedule={
+        "sweep-transcode-cache": {
+            "task": "src.tasks.maintenance.sweep_transcode_cache",
+            "schedule": 6 * 3600,
+        },
+        "sweep-generation-cache": {
+            "task": "src.tasks.maintenance.sweep_generation_cache",
+            "schedule": 3600,
+        },
     },
 )
 
+
+@worker_process_init.connect
+def start_metrics_server(**kwargs) -> None:
+    """Expose Prometheus metrics from each pool process on its own port."""
+    if not settings.metrics_port:
+        return
+    index = getattr(current_process(), "index", 0) or 0
+    start_http_server(settings.metrics_port + index)
+
+
+@worker_process_init.connect
+def warm_up_clients(**kwargs) -> None:
+    """Open provider connections before the pool process takes its first job."""
+    if settings.client_warmup_enabled:
+        clients.warm_up()
+
+
+@worker_process_shutdown.connect
+def close_clients(**kwargs) -> None:
+    clients.close_all()
+
+
+@worker_ready.connect
+def sweep_orphaned_workspaces(**kwargs) -> None:
+    """Reclaim scratch space left behind by workers that crashed or were killed."""
+    WorkspaceManager().sweep_orphans()
+
+
 if __name__ == "__main__":
     app.start()
@@ -0,0 +1,119 @@
+import pytest
+
+from src.services import circuit_breaker
+from src.services.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    require_any,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker, "time", clock)
+    return clock
+
+
+def open_breaker(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failure_threshold):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # resets the count
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.before_call()
+    assert excinfo.value.retry_after == pytest.approx(60)
+    assert not breaker.allows()
+
+
+def test_admits_one_probe_after_reset_timeout(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.retry_after() == pytest.approx(30)
+
+    clock.now += 30
+    assert breaker.allows()
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one probe at a time
+
+
+def test_successful_probe_closes(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    open_breaker(breaker)
+    clock.now += 60
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    open_breaker(breaker)
+    clock.now += 60
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.retry_after() == pytest.approx(60)
+
+
+def test_released_probe_can_be_retried(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    open_breaker(breaker)
+    clock.now += 60
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()
+
+
+def test_guard_counts_only_outage_errors(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+    with pytest.raises(ValueError):
+        with breaker.guard(failures=(ConnectionError,)):
+            raise ValueError("rejected request")
+    assert breaker.state == CLOSED
+
+    with pytest.raises(ConnectionError):
+        with breaker.guard(failures=(ConnectionError,)):
+            raise ConnectionError("down")
+    assert breaker.state == OPEN
+
+
+def test_require_any_reports_the_soonest_probe(clock):
+    first = CircuitBreaker("first", failure_threshold=1, reset_timeout=60)
+    second = CircuitBreaker("second", failure_threshold=1, reset_timeout=60)
+    open_breaker(first)
+    clock.now += 20
+    require_any([first, second])
+
+    open_breaker(second)
+    with pytest.raises(CircuitOpenError) as excinfo:
+        require_any([first, second])
+    assert excinfo.value.provider == "first"
+    assert excinfo.value.retry_after == pytest.approx(40)
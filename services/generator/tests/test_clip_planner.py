@@ -0,0 +1,29 @@
+import pytest
+
+from src.services.clip_planner import SHOT_DURATIONS, ClipPlanner
+
+
+@pytest.mark.parametrize("target, durations", [
+    (4, [4]),
+    (5, [6]),
+    (8, [8]),
+    (9, [8, 4]),
+    (15, [8, 8]),
+    (20, [8, 8, 4]),
+    (21.5, [8, 8, 6]),
+    (32, [8, 8, 8, 8]),
+])
+def test_durations(target, durations):
+    assert ClipPlanner._durations(target) == durations
+
+
+@pytest.mark.parametrize("target", [x / 2 for x in range(8, 65)])
+def test_durations_cover_target_with_fewest_valid_shots(target):
+    durations = ClipPlanner._durations(target)
+    assert all(d in SHOT_DURATIONS for d in durations)
+    assert sum(durations) >= target
+    assert len(durations) == -(-target // SHOT_DURATIONS[-1])
+    # Only the last shot is shortened, to the shortest that still fits
+    remainder = target - sum(durations[:-1])
+    assert durations[:-1] == [SHOT_DURATIONS[-1]] * (len(durations) - 1)
+    assert durations[-1] == min(d for d in SHOT_DURATIONS if d >= remainder)
@@ -0,0 +1,50 @@
+import pytest
+
+from src.services.continuity import ContinuityValidator
+
+BIBLE = {
+    "characters": {
+        "maya": {"name": "Maya", "physicalDescription": {"hairColor": "black"}},
+        "john": {"name": "John", "physicalDescription": {"hairColor": "red"}},
+    },
+}
+
+
+def hair_owners(script: str) -> list[str]:
+    """Characters flagged for a hair colour that contradicts the bible."""
+    result = ContinuityValidator().validate(script, BIBLE)
+    return [v.entity_id for v in result.violations if "hair" in v.message]
+
+
+@pytest.mark.parametrize("script", [
+    # A same-sentence mention beats one in the sentence before
+    "Maya enters. Red hair falls over John's face.",
+    "Maya enters. John turns, his red hair wet.",
+    "Maya smiles at John, whose hair is red.",
+    "Maya has black hair.",
+])
+def test_consistent_descriptions_are_not_flagged(script):
+    assert hair_owners(script) == []
+
+
+@pytest.mark.parametrize("script, owner", [
+    ("Maya has red hair.", "maya"),
+    # Without a mention in its own sentence, a description binds to the last one
+    ("Maya enters. Her hair is red.", "maya"),
+    ("John enters. His hair is black.", "john"),
+])
+def test_contradictions_are_attributed(script, owner):
+    assert hair_owners(script) == [owner]
+
+
+def test_distant_mention_in_earlier_sentence_is_ignored():
+    filler = " ".join(["word"] * 20)
+    assert hair_owners(f"Maya enters. {filler} and the hair is red.") == []
+
+
+def test_corrections_only_touch_the_attributed_character():
+    validator = ContinuityValidator()
+    script = "Maya enters. Her hair is red. Red hair falls over John's face."
+    result = validator.validate(script, BIBLE)
+    corrected = validator.apply_corrections(script, result.auto_corrections)
+    assert corrected == "Maya enters. Her hair is black. Red hair falls over John's face."
@@ -0,0 +1,52 @@
+from src.services.entity_matcher import EntityMatcher, get_matcher
+
+BIBLE = {
+    "characters": {
+        "maya": {"name": "Maya Chen", "aliases": ["Captain Chen", "Captain"]},
+        "john": {"name": "John"},
+    },
+    "locations": [
+        {"entityId": "bridge", "name": "The Bridge"},
+    ],
+    "objects": {},
+}
+
+
+def found(script: str, bible: dict = BIBLE) -> list[tuple[str, str]]:
+    return [(m.entity_id, m.text) for m in EntityMatcher(bible).find(script)]
+
+
+def test_longest_name_wins():
+    assert found("Captain Chen nods. The Captain leaves.") == [
+        ("maya", "Captain Chen"),
+        ("maya", "Captain"),
+    ]
+
+
+def test_only_whole_words_match():
+    assert found("Johnny greets John.") == [("john", "John")]
+
+
+def test_matching_ignores_case_and_keeps_offsets():
+    script = "on the bridge, MAYA CHEN waits"
+    mentions = EntityMatcher(BIBLE).find(script)
+    assert [(m.kind, m.entity_id) for m in mentions] == [
+        ("locations", "bridge"),
+        ("characters", "maya"),
+    ]
+    assert [script[m.start:m.end] for m in mentions] == ["the bridge", "MAYA CHEN"]
+
+
+def test_shared_name_reports_every_owner():
+    bible = {"characters": {"a": {"name": "Sam"}, "b": {"name": "Sam"}}}
+    assert found("Sam waves.", bible) == [("a", "Sam"), ("b", "Sam")]
+
+
+def test_empty_bible_finds_nothing():
+    assert found("Maya Chen", {}) == []
+
+
+def test_matchers_are_memoized_per_bible_version():
+    first = get_matcher({**BIBLE, "scene_id": "scene-test", "version": 1})
+    assert get_matcher({**BIBLE, "scene_id": "scene-test", "version": 1}) is first
+    assert get_matcher({**BIBLE, "scene_id": "scene-test", "version": 2}) is not first
@@ -0,0 +1,50 @@
+import json
+
+from src.services.json_stream import StreamingJSONObject
+
+DOCUMENT = {
+    "video_prompt": "A ship drifts, {lit} by \"red\" light, \\ slowly",
+    "duration_estimate": 20,
+    "camera_directions": ["wide", "close, then pull back"],
+    "character_descriptions": {"maya": {"hair": "black"}},
+    "full_script": "Maya enters.",
+}
+
+
+def feed_in_chunks(text: str, size: int) -> tuple[StreamingJSONObject, list[str]]:
+    parser = StreamingJSONObject()
+    completed = []
+    for i in range(0, len(text), size):
+        completed += parser.feed(text[i:i + size])
+    return parser, completed
+
+
+def test_fields_match_json_loads_for_any_chunking():
+    text = json.dumps(DOCUMENT, indent=2)
+    for size in (1, 3, 7, len(text)):
+        parser, completed = feed_in_chunks(text, size)
+        assert parser.fields == DOCUMENT
+        assert completed == list(DOCUMENT)
+        assert parser.closed
+
+
+def test_field_is_reported_once_its_value_is_complete():
+    parser = StreamingJSONObject()
+    assert parser.feed('{"video_prompt": "A ship, ') == []
+    assert parser.feed('adrift", "actions": ["flies"') == ["video_prompt"]
+    assert parser.fields == {"video_prompt": "A ship, adrift"}
+    assert parser.feed("]}") == ["actions"]
+    assert parser.fields["actions"] == ["flies"]
+
+
+def test_truncated_stream_keeps_only_complete_fields():
+    parser, _ = feed_in_chunks('{"video_prompt": "A ship", "duration_estimate": 16, "full_scr', 5)
+    assert parser.fields == {"video_prompt": "A ship", "duration_estimate": 16}
+    assert not parser.closed
+
+
+def test_text_after_the_object_is_ignored():
+    parser = StreamingJSONObject()
+    parser.feed('{"a": 1}\n{"b": 2}')
+    assert parser.fields == {"a": 1}
+    assert parser.closed
@@ -0,0 +1,31 @@
+from src.services.entity_matcher import EntityMention
+from src.services.script_index import ScriptIndex
+
+
+def test_words_are_lowercased_with_positions():
+    index = ScriptIndex("Maya sees Maya's ship.")
+    assert index.words == ["maya", "sees", "maya", "s", "ship"]
+    assert index.positions["maya"] == [0, 2]
+    assert len(index) == 5
+    assert index.text(0) == "Maya"
+
+
+def test_find_is_limited_to_range_and_ordered():
+    index = ScriptIndex("red hair, blue eyes, red coat, blue hat")
+    assert index.find(["red", "blue"], 0, len(index)) == [0, 2, 4, 6]
+    assert index.find(["red", "blue"], 1, 6) == [2, 4]
+    assert index.find(["green"], 0, len(index)) == []
+
+
+def test_sentence_numbers():
+    index = ScriptIndex("Maya enters. John waits! Is it over? Yes")
+    assert [index.sentence(i) for i in range(len(index))] == [0, 0, 1, 1, 2, 2, 2, 3]
+
+
+def test_span_of_multi_word_mention():
+    script = "Then Captain Maya Chen speaks."
+    index = ScriptIndex(script)
+    start = script.index("Captain")
+    end = script.index(" speaks")
+    mention = EntityMention("characters", "maya", script[start:end], start, end)
+    assert index.span(mention) == (1, 3)
@@ -0,0 +1,39 @@
+from src.services.token_budget import (
+    estimate_tokens,
+    truncate_tail_to_tokens,
+    truncate_to_tokens,
+)
+
+
+def test_estimate_counts_words_punctuation_and_long_words():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Maya runs.") == 3
+    assert estimate_tokens("extraordinarily") == 4  # 15 characters, ~4 per token
+
+
+def test_text_within_budget_is_unchanged():
+    text = "Maya enters the bridge."
+    assert truncate_to_tokens(text, estimate_tokens(text)) == text
+    assert truncate_tail_to_tokens(text, estimate_tokens(text)) == text
+
+
+def test_truncate_keeps_the_beginning():
+    assert truncate_to_tokens("one two six ten", 2) == "one two..."
+
+
+def test_truncate_tail_keeps_the_end():
+    assert truncate_tail_to_tokens("one two six ten", 2) == "...six ten"
+
+
+def test_truncated_text_fits_the_budget():
+    text = "The ship drifts through the nebula, its hull scarred. " * 20
+    for budget in (1, 10, 50):
+        head = truncate_to_tokens(text, budget, marker="")
+        tail = truncate_tail_to_tokens(text, budget, marker="")
+        assert 0 < estimate_tokens(head) <= budget
+        assert 0 < estimate_tokens(tail) <= budget
+
+
+def test_empty_budget_gives_empty_text():
+    assert truncate_to_tokens("Maya", 0) == ""
+    assert truncate_tail_to_tokens("Maya", -1) == ""